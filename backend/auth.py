@@ -1,4 +1,5 @@
 import os
+import secrets
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -7,11 +8,12 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from database import get_db
-from models import User
+from models import User, StreamTicket
 
 SECRET_KEY = os.getenv("SECRET_KEY", "insight-poc-dev-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480
+STREAM_TICKET_SECONDS = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -32,6 +34,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    return get_user_from_token(token, db)
+
+
+def get_user_from_token(token: str, db: Session) -> User:
+    """Resolve a bearer token to an active user."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -56,3 +63,36 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
+
+
+def issue_stream_ticket(db: Session, user: User) -> str:
+    """A single-use ticket for opening an event stream (EventSource can't send the
+    Authorization header). Valid for STREAM_TICKET_SECONDS; shared by every worker
+    through the database."""
+    now = datetime.utcnow()
+    db.query(StreamTicket).filter(StreamTicket.expires_at <= now).delete(synchronize_session=False)
+    ticket = secrets.token_urlsafe(32)
+    db.add(StreamTicket(ticket=ticket, user_id=user.id, expires_at=now + timedelta(seconds=STREAM_TICKET_SECONDS)))
+    db.commit()
+    return ticket
+
+
+def redeem_stream_ticket(ticket: str, db: Session) -> User:
+    """Consume a stream ticket and return its active user; 401 if it is unknown,
+    expired or already used."""
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid stream ticket")
+    user_id = (
+        db.query(StreamTicket.user_id)
+        .filter(StreamTicket.ticket == ticket, StreamTicket.expires_at > datetime.utcnow())
+        .scalar()
+    )
+    # Only the request whose delete removes the row gets the stream
+    used = db.query(StreamTicket).filter(StreamTicket.ticket == ticket).delete(synchronize_session=False)
+    db.commit()
+    if user_id is None or used != 1:
+        raise credentials_exception
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None or not user.is_active:
+        raise credentials_exception
+    return user
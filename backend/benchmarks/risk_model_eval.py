@@ -0,0 +1,71 @@
+"""
+Risk model evaluation — a time-based holdout for the EOY risk forecast.
+
+Trains on every academic year but the latest and scores the latest, reporting
+training and scoring time and the holdout log loss next to the log loss of simply
+predicting the training base rate. A model that can't beat the base rate has
+found no signal in the history. Reads the configured database (DATABASE_URL, by
+default the seeded insight.db) and writes nothing, from the backend directory:
+
+    python -m benchmarks.risk_model_eval [--ridge 100]
+
+On the generated seed data it should come out worse than the base rate: the
+generator draws each window's scores independently, so BOY/MOY results carry no
+information about EOY.
+"""
+import argparse
+import time
+import numpy as np
+from database import SessionLocal
+from services.risk_model import RIDGE, RiskModel, evaluate, fit_logistic, training_data
+
+
+def log_loss(y: np.ndarray, p: float) -> float:
+    p = min(max(p, 1e-12), 1 - 1e-12)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate the EOY risk model on a time-based holdout.")
+    parser.add_argument("--ridge", type=float, default=RIDGE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        data = training_data(db)
+        load_seconds = time.perf_counter() - started
+    finally:
+        db.close()
+    if data is None:
+        print("No assessment history to evaluate on.")
+        return
+    keys, X, y, years = data
+    holdout_year = max(years)
+    train, test = years != holdout_year, years == holdout_year
+    if not train.any():
+        print(f"Only {holdout_year} has labelled history; a holdout needs at least two academic years.")
+        return
+
+    started = time.perf_counter()
+    mean, scale, weights = fit_logistic(X[train], y[train], args.ridge)
+    train_seconds = time.perf_counter() - started
+    model = RiskModel(keys, mean, scale, weights, "holdout", {})
+
+    started = time.perf_counter()
+    holdout = evaluate(model, X[test], y[test])
+    score_seconds = time.perf_counter() - started
+
+    base_rate = float(y[train].mean())
+    baseline = log_loss(y[test], base_rate)
+    verdict = "better" if holdout["log_loss"] < baseline else "worse"
+
+    print(f"history:     {len(y):,} labelled student-years, {len(keys)} subtest targets, loaded in {load_seconds:.2f}s")
+    print(f"train:       {', '.join(sorted(set(years[train].tolist())))} ({int(train.sum()):,}) in {train_seconds:.3f}s")
+    print(f"holdout:     {holdout_year} ({holdout['examples']:,}) scored in {score_seconds * 1000:.1f}ms")
+    print(f"log loss:    {holdout['log_loss']:.4f} vs {baseline:.4f} for the base rate ({base_rate:.3f}), {verdict}")
+    print(f"accuracy:    {holdout['accuracy']:.4f} (holdout positive rate {holdout['positive_rate']:.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Roster import benchmark — streams a generated district roster through
+`import_roster` and reports throughput and statement count.
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set, from the
+backend directory:
+
+    python -m benchmarks.roster_import [--rows 100000] [--batch-size 1000]
+
+One row in every 10,000 is rejected by the database (via a trigger) to show that
+a failing batch is retried row by row and the import carries on.
+"""
+import os
+import tempfile
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/roster_bench.db"
+
+import argparse
+import io
+import time
+from sqlalchemy import event, func, text
+from database import SessionLocal, engine, Base
+from models import Organization, User, Student, user_students
+from services.roster import BATCH_SIZE, import_roster
+
+BAD_EVERY = 10_000
+TEACHERS = 200
+
+
+def roster_csv(rows: int) -> bytes:
+    out = io.StringIO()
+    out.write("first_name,last_name,grade,student_id,school,teacher_email\n")
+    for n in range(rows):
+        first = "REJECT" if n % BAD_EVERY == BAD_EVERY - 1 else f"First{n}"
+        out.write(f"{first},Last{n},{n % 9},BENCH-{n:07d},School {n % 40},teacher{n % (TEACHERS + 20)}@bench.test\n")
+    return out.getvalue().encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark streaming roster import.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    org = Organization(name="Roster Benchmark")
+    db.add(org)
+    db.flush()
+    db.add_all(
+        User(email=f"teacher{n}@bench.test", hashed_password="x", first_name="Teacher", last_name=str(n), organization_id=org.id)
+        for n in range(TEACHERS)
+    )
+    db.commit()
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS bench_reject_student BEFORE INSERT ON students "
+                "WHEN NEW.first_name = 'REJECT' BEGIN SELECT RAISE(ABORT, 'rejected by benchmark'); END"
+            ))
+
+    data = roster_csv(args.rows)
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        started = time.perf_counter()
+        dry = import_roster(db, io.BytesIO(data), org.id, dry_run=True, batch_size=args.batch_size)
+        dry_seconds = time.perf_counter() - started
+
+        statements = 0
+        started = time.perf_counter()
+        result = import_roster(db, io.BytesIO(data), org.id, batch_size=args.batch_size)
+        seconds = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+        if engine.dialect.name == "sqlite":
+            with engine.begin() as conn:
+                conn.execute(text("DROP TRIGGER IF EXISTS bench_reject_student"))
+
+    stored = db.query(func.count(Student.id)).filter(Student.organization_id == org.id).scalar()
+    links = db.query(func.count()).select_from(user_students).join(Student, Student.id == user_students.c.student_id).filter(
+        Student.organization_id == org.id
+    ).scalar()
+    db.close()
+
+    print(f"rows:        {args.rows:,} ({len(data) / 1e6:.1f} MB)")
+    print(f"dry run:     {dry_seconds:.2f}s, {dry['created']:,} valid")
+    print(f"import:      {seconds:.2f}s ({args.rows / seconds:,.0f} rows/s), {statements:,} statements")
+    print(f"created:     {result['created']:,} (stored {stored:,}, {links:,} teacher links)")
+    print(f"row errors:  {len(result['errors'])}, e.g. {result['errors'][:1]}")
+    print(f"warnings:    {len(result['warnings'])} (unknown teacher emails)")
+
+
+if __name__ == "__main__":
+    main()
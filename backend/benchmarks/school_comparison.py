@@ -0,0 +1,109 @@
+"""
+School comparison benchmark — counts the SQL statements and time taken by
+`GET /api/executive/school-comparison` for a district with one school and for one
+with many, to show the cost doesn't grow with the number of schools.
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set, from the
+backend directory:
+
+    python -m benchmarks.school_comparison [--schools 50] [--students 40]
+
+Each district is measured twice: on the first request, which builds today's
+snapshot on demand, and on a repeat request served from that snapshot.
+"""
+import os
+import tempfile
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/school_comparison_bench.db"
+
+import argparse
+import datetime
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from auth import create_access_token
+from database import SessionLocal, engine, Base
+from main import app
+from models import Organization, User, Student, TestSession, Score
+from services.snapshots import current_academic_year
+
+RISK_LEVELS = ("advanced", "benchmark", "moderate", "high")
+
+
+def seed_district(db, name: str, schools: int, students_per_school: int) -> User:
+    """An organization with an admin and `schools` schools of scored students."""
+    org = Organization(name=name)
+    db.add(org)
+    db.flush()
+    admin = User(email=f"admin@{name.lower().replace(' ', '-')}.test", hashed_password="x",
+                 first_name="Bench", last_name="Admin", role="admin", organization_id=org.id)
+    db.add(admin)
+    db.flush()
+    year = current_academic_year()
+    now = datetime.datetime.utcnow()
+    for s in range(schools):
+        for n in range(students_per_school):
+            student = Student(first_name=f"First{n}", last_name=f"Last{s}", grade=str(n % 9),
+                              school=f"School {s:03d}", organization_id=org.id)
+            db.add(student)
+            db.flush()
+            session = TestSession(student_id=student.id, examiner_id=admin.id, subtest="NLM_READING",
+                                  grade_at_test=student.grade, academic_year=year, time_of_year="BOY",
+                                  is_complete=n % 4 != 0, completed_at=now if n % 4 else None)
+            db.add(session)
+            db.flush()
+            db.add(Score(test_session_id=session.id, target="NLM_RETELL", raw_score=n % 20,
+                         risk_level=RISK_LEVELS[(n + s) % len(RISK_LEVELS)]))
+    db.commit()
+    return admin
+
+
+def measure(client: TestClient, token: str) -> tuple[int, float, int]:
+    """(statements, milliseconds, schools returned) for one request."""
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        started = time.perf_counter()
+        response = client.get("/api/executive/school-comparison", headers={"Authorization": f"Bearer {token}"})
+        elapsed = (time.perf_counter() - started) * 1000
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    response.raise_for_status()
+    return statements, elapsed, len(response.json())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the executive school comparison.")
+    parser.add_argument("--schools", type=int, default=50)
+    parser.add_argument("--students", type=int, default=40, help="students per school")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    districts = {
+        "one school": seed_district(db, "Single School District", 1, args.students),
+        f"{args.schools} schools": seed_district(db, "Many School District", args.schools, args.students),
+    }
+    tokens = {label: create_access_token({"sub": str(admin.id)}) for label, admin in districts.items()}
+    db.close()
+
+    with TestClient(app) as client:
+        print(f"{'district':<16}{'returned':>9}{'first request':>24}{'repeat request':>24}")
+        for label, token in tokens.items():
+            first = measure(client, token)
+            repeat = measure(client, token)
+            print(
+                f"{label:<16}{repeat[2]:>9}"
+                f"{first[0]:>10} stmts {first[1]:>7.1f}ms"
+                f"{repeat[0]:>10} stmts {repeat[1]:>7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import os
+from contextlib import contextmanager
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./insight.db")
@@ -16,3 +18,24 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def insert_ignore(table):
+    """INSERT ... ON CONFLICT DO NOTHING for the configured database."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table).on_conflict_do_nothing()
+
+
+@contextmanager
+def begin_immediate(bind: Engine):
+    """Like `bind.begin()`, but on SQLite the transaction takes the write lock before
+    its first read, so start-up steps that check and then write run one worker at a
+    time instead of racing."""
+    with bind.connect() as conn:
+        if bind.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()
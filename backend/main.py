@@ -22,8 +22,12 @@ from routers.sel_router import router as sel_router
 from routers.predictions_router import router as predictions_router
 from routers.assistant_router import router as assistant_router
 from routers.parent_router import router as parent_router
+from services.student_search import ensure_search_index
+from services.leaderboards import ensure_leaderboards
 
 Base.metadata.create_all(bind=engine)
+ensure_search_index(engine)
+ensure_leaderboards(engine)
 
 app = FastAPI(title="Insight POC", version="0.1.0", description="CUBED-3 Assessment Platform")
 
@@ -35,6 +39,7 @@ app.add_middleware(
     allow_credentials=len(cors_origins) > 0,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
 app.include_router(auth_router)
@@ -1,6 +1,6 @@
 import datetime
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Enum, Table
+    Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Enum, Table, Index
 )
 from sqlalchemy.orm import relationship
 import enum
@@ -37,6 +37,7 @@ user_students = Table(
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
     Column("student_id", Integer, ForeignKey("students.id"), primary_key=True),
+    Index("ix_user_students_student_id", "student_id"),
 )
 
 # Many-to-many: parent <-> student
@@ -53,6 +54,7 @@ workspace_members = Table(
     Base.metadata,
     Column("workspace_id", Integer, ForeignKey("workspaces.id"), primary_key=True),
     Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Index("ix_workspace_members_user_id", "user_id"),
 )
 
 # Many-to-many: custom_test <-> test_item
@@ -71,6 +73,15 @@ group_students = Table(
     Column("student_id", Integer, ForeignKey("students.id"), primary_key=True),
 )
 
+# Many-to-many: user <-> student (predictions watch list)
+student_watchlist = Table(
+    "student_watchlist",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("student_id", Integer, ForeignKey("students.id"), primary_key=True),
+    Column("created_at", DateTime, default=datetime.datetime.utcnow),
+)
+
 
 class Organization(Base):
     __tablename__ = "organizations"
@@ -129,6 +140,13 @@ class Student(Base):
     groups = relationship("Group", secondary=group_students, back_populates="students")
     test_sessions = relationship("TestSession", back_populates="student")
 
+    __table_args__ = (
+        # Roster sync matches incoming rows on the school-assigned ID
+        Index("ix_students_org_external_id", "organization_id", "student_id_external"),
+        # Keyset pagination of student lists on (last_name, id)
+        Index("ix_students_org_last_name", "organization_id", "last_name", "id"),
+    )
+
 
 class Group(Base):
     __tablename__ = "groups"
@@ -136,7 +154,7 @@ class Group(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     owner = relationship("User", back_populates="groups")
@@ -181,13 +199,17 @@ class TestSession(Base):
     examiner = relationship("User", back_populates="administered_tests")
     scores = relationship("Score", back_populates="test_session", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_test_sessions_student_subtest", "student_id", "subtest"),
+    )
+
 
 class Score(Base):
     """Individual target scores within a test session."""
     __tablename__ = "scores"
 
     id = Column(Integer, primary_key=True, index=True)
-    test_session_id = Column(Integer, ForeignKey("test_sessions.id"), nullable=False)
+    test_session_id = Column(Integer, ForeignKey("test_sessions.id"), nullable=False, index=True)
     target = Column(String, nullable=False)  # e.g. "NLM_RETELL", "NLM_QUESTIONS", "DECODING_FLUENCY"
     sub_target = Column(String, nullable=True)  # e.g. "NDC", "SC", "VC", "EC1", "EC2", "FACTUAL", etc.
     raw_score = Column(Float, nullable=True)
@@ -213,6 +235,28 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_notifications_user_unread", "user_id", "is_read"),
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+    )
+
+
+class NotificationCounter(Base):
+    """Per-user unread count, kept in step with inserts and reads so the bell never
+    has to count rows. Created from a COUNT the first time the user is seen."""
+    __tablename__ = "notification_counters"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+
+
+class StreamTicket(Base):
+    """Short-lived, single-use credential for opening a notification stream, so the
+    JWT never goes in a URL. Redeeming deletes the row."""
+    __tablename__ = "stream_tickets"
+    ticket = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 
 # ──────────────────────────────────────────────────────────────
 # #8 MTSS — Intervention Logging
@@ -345,7 +389,7 @@ class Workspace(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     ws_type = Column(String, default="plc")  # plc, grade_team, intervention, custom
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     members = relationship("User", secondary=workspace_members)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
@@ -390,6 +434,11 @@ class StudentBadge(Base):
     badge_id = Column(Integer, ForeignKey("badges.id"), nullable=False)
     earned_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        # One award per badge; batch awarding relies on it to skip concurrent duplicates
+        Index("ix_student_badges_student_badge", "student_id", "badge_id", unique=True),
+    )
+
 
 class ReadingStreak(Base):
     __tablename__ = "reading_streaks"
@@ -400,6 +449,22 @@ class ReadingStreak(Base):
     last_activity_date = Column(String, nullable=True)
 
 
+class LeaderboardEntry(Base):
+    __tablename__ = "leaderboard_entries"
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # "school:<organization_id>:<school>" or "group:<group_id>"
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    current_streak = Column(Integer, default=0)
+    longest_streak = Column(Integer, default=0)
+
+    __table_args__ = (
+        # A leaderboard read walks this index backwards from the top of its scope
+        Index("ix_leaderboard_scope_rank", "scope", "current_streak", "longest_streak", "student_id"),
+        Index("ix_leaderboard_student", "student_id"),
+        Index("ix_leaderboard_scope_student", "scope", "student_id", unique=True),
+    )
+
+
 # ──────────────────────────────────────────────────────────────
 # #21 SEL Integration
 # ──────────────────────────────────────────────────────────────
@@ -417,3 +482,128 @@ class SELScreening(Base):
     total_score = Column(Float, default=0)
     risk_level = Column(String, default="low")  # low, moderate, high
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+# ──────────────────────────────────────────────────────────────
+# #15 Executive Analytics — Daily Snapshots
+# ──────────────────────────────────────────────────────────────
+class OrgSnapshot(Base):
+    """Nightly rollup of one organization, partitioned by school, grade and student status.
+    Student counts are distinct per partition, so any coarser view is a SUM over rows."""
+    __tablename__ = "org_snapshots"
+    id = Column(Integer, primary_key=True, index=True)
+    snapshot_date = Column(String, nullable=False)  # YYYY-MM-DD
+    academic_year = Column(String, nullable=False)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    school = Column(String, nullable=True)
+    grade = Column(String, nullable=True)
+    status = Column(String, nullable=True)  # student status
+    total_students = Column(Integer, default=0)
+    tested_count = Column(Integer, default=0)
+    risk_advanced = Column(Integer, default=0)
+    risk_benchmark = Column(Integer, default=0)
+    risk_moderate = Column(Integer, default=0)
+    risk_high = Column(Integer, default=0)
+    tier1_count = Column(Integer, default=0)
+    tier2_count = Column(Integer, default=0)
+    tier3_count = Column(Integer, default=0)
+    # Per-window scored / at-or-above-benchmark counts, for BOY→EOY growth
+    boy_scored = Column(Integer, default=0)
+    boy_proficient = Column(Integer, default=0)
+    moy_scored = Column(Integer, default=0)
+    moy_proficient = Column(Integer, default=0)
+    eoy_scored = Column(Integer, default=0)
+    eoy_proficient = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_org_snapshots_org_date", "organization_id", "snapshot_date"),
+    )
+
+
+class RegionRollup(Base):
+    """Per-day sum of organization snapshots for a state or country.
+    Maintained incrementally as each organization's snapshot is (re)written."""
+    __tablename__ = "region_rollups"
+    id = Column(Integer, primary_key=True, index=True)
+    snapshot_date = Column(String, nullable=False)  # YYYY-MM-DD
+    level = Column(String, nullable=False)  # state, country
+    country = Column(String, nullable=False)
+    state = Column(String, nullable=True)  # None for country rows
+    organization_count = Column(Integer, default=0)
+    active_students = Column(Integer, default=0)
+    total_students = Column(Integer, default=0)
+    tested_count = Column(Integer, default=0)
+    risk_advanced = Column(Integer, default=0)
+    risk_benchmark = Column(Integer, default=0)
+    risk_moderate = Column(Integer, default=0)
+    risk_high = Column(Integer, default=0)
+    tier1_count = Column(Integer, default=0)
+    tier2_count = Column(Integer, default=0)
+    tier3_count = Column(Integer, default=0)
+    boy_scored = Column(Integer, default=0)
+    boy_proficient = Column(Integer, default=0)
+    moy_scored = Column(Integer, default=0)
+    moy_proficient = Column(Integer, default=0)
+    eoy_scored = Column(Integer, default=0)
+    eoy_proficient = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index("ix_region_rollups_level_date", "level", "snapshot_date", "country", "state"),
+    )
+
+
+class SnapshotRun(Base):
+    """Marks a snapshot date for which every organization has been snapshotted."""
+    __tablename__ = "snapshot_runs"
+    snapshot_date = Column(String, primary_key=True)  # YYYY-MM-DD
+    completed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+# ──────────────────────────────────────────────────────────────
+# #8 MTSS — Persisted Tier Assignments
+# ──────────────────────────────────────────────────────────────
+class StudentTier(Base):
+    """Current MTSS tier per student, refreshed when their sessions complete."""
+    __tablename__ = "student_tiers"
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), unique=True, nullable=False)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    tier = Column(Integer, nullable=False)
+    risk_levels_json = Column(Text, nullable=True)  # JSON list of contributing {subtest, target, risk_level}
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_student_tiers_org_tier", "organization_id", "tier"),
+    )
+
+
+# ──────────────────────────────────────────────────────────────
+# #24 Predictive Analytics — EOY Risk Forecasts
+# ──────────────────────────────────────────────────────────────
+class RiskForecast(Base):
+    """Model-predicted probability that a student ends the year at risk (Tier 2+),
+    written by the batch scoring job in services.risk_model."""
+    __tablename__ = "risk_forecasts"
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), unique=True, nullable=False)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    academic_year = Column(String, nullable=False)
+    probability = Column(Float, nullable=False)
+    model_version = Column(String, nullable=False)  # trained_at timestamp of the weights used
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_risk_forecasts_org_probability", "organization_id", "probability"),
+    )
+
+
+# ──────────────────────────────────────────────────────────────
+# #26 AI Teaching Assistant — Response Cache Versions
+# ──────────────────────────────────────────────────────────────
+class UserDataVersion(Base):
+    """Counter bumped whenever a user's students or their scores change, so cached
+    per-user responses can be validated with one primary-key lookup."""
+    __tablename__ = "user_data_versions"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -8,6 +8,10 @@ from schemas import TestSessionCreate, TestSessionOut, ScoreCreate, ScoreUpdate,
 from auth import get_current_user
 from services.scoring import classify_risk, get_recommendation, get_available_subtests, get_next_subtest_recommendation
 from services.intelliscore import save_audio, transcribe_audio, analyze_transcript
+from services.tiers import refresh_student_tier
+from services.risk_alerts import detect_risk_changes
+from services.response_cache import bump_for_students
+from services.streaks import record_activity
 
 router = APIRouter(prefix="/api/assessments", tags=["assessments"])
 
@@ -91,6 +95,9 @@ def add_score(
         notes=payload.notes,
     )
     db.add(score)
+    if session.is_complete:
+        refresh_student_tier(db, session.student)
+        bump_for_students(db, [session.student_id])
     db.commit()
     db.refresh(score)
     return ScoreOut.model_validate(score)
@@ -114,6 +121,9 @@ def update_score(
         subtest_key = _map_target_to_benchmark_key(session.subtest, score.target)
         if subtest_key:
             score.risk_level = classify_risk(subtest_key, session.grade_at_test, session.time_of_year, payload.raw_score)
+        if session.is_complete:
+            refresh_student_tier(db, session.student)
+            bump_for_students(db, [session.student_id])
 
     if payload.notes is not None:
         score.notes = payload.notes
@@ -132,8 +142,14 @@ def complete_test(
     session = db.query(TestSession).filter(TestSession.id == session_id).first()
     if not session:
         raise HTTPException(404, "Test session not found")
+    newly_completed = not session.is_complete
     session.is_complete = True
     session.completed_at = datetime.datetime.utcnow()
+    refresh_student_tier(db, session.student)
+    if newly_completed:
+        detect_risk_changes(db, session)
+        record_activity(db, session.student_id, session.completed_at.date())
+    bump_for_students(db, [session.student_id])
     db.commit()
     db.refresh(session)
     return TestSessionOut.model_validate(session)
@@ -244,6 +260,9 @@ def add_manual_scores(
         )
         db.add(score)
         created.append(score)
+    if session.is_complete:
+        refresh_student_tier(db, session.student)
+        bump_for_students(db, [session.student_id])
     db.commit()
     return [ScoreOut.model_validate(s) for s in created]
 
@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends
+import re
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from database import get_db
 from models import *
 from auth import get_current_user
+from services.student_search import search_students
+from services.response_cache import ResponseCache, data_version
+from services.manual_search import get_manual_index
 
 router = APIRouter(prefix="/api/assistant", tags=["assistant"])
 
+# Answers per (user, intent, param), valid until the user's students or scores change
+_response_cache = ResponseCache()
+
 
 class AskRequest(BaseModel):
     query: str
@@ -18,8 +26,11 @@ AVAILABLE_QUERIES = (
     "• \"Group students by [risk/grade/school]\" — view students grouped by category\n"
     "• \"Progress for [student name]\" — see a student's test history and risk levels\n"
     "• \"What to focus on\" — see your top 5 highest-risk students\n"
+    "• \"What does the manual say about [topic]?\" — search the CUBED-3 manual\n"
 )
 
+MANUAL_EXCERPT_CHARS = 400
+
 SKILL_TARGET_MAP = {
     "fluency": ["DECODING_FLUENCY", "FLUENCY"],
     "decoding": ["DECODING_FLUENCY", "DDM_DECODING"],
@@ -33,37 +44,56 @@ SKILL_TARGET_MAP = {
 }
 
 
-def _parse_intent(query: str) -> tuple[str, str | None]:
-    q = query.lower().strip()
-
-    if "which students need" in q or "who needs" in q:
-        for skill in SKILL_TARGET_MAP:
-            if skill in q:
-                return "students_need_skill", skill
-        return "students_need_skill", None
-
-    if "group" in q and "by" in q:
-        if "risk" in q:
-            return "group_by", "risk"
-        if "grade" in q:
-            return "group_by", "grade"
-        if "school" in q:
-            return "group_by", "school"
-        return "group_by", None
-
-    if "progress for" in q or "progress of" in q:
-        for prefix in ("progress for ", "progress of "):
-            if prefix in q:
-                name = q.split(prefix, 1)[1].strip().rstrip("?. ")
-                return "student_progress", name
-        return "student_progress", None
-
-    if "focus" in q or "priority" in q or "top" in q:
-        return "focus", None
+# (intent, pattern, choices) in priority order. Each pattern matches anywhere in the
+# lowercased query. Its "param" group, if it has one, is the parameter; otherwise
+# the parameter is the first of `choices` mentioned in the query, in the order
+# given rather than where it appears ("group by grade and risk" groups by risk).
+INTENT_PATTERNS = [
+    # Only explicit requests to look something up, so data questions that happen to
+    # mention the manual still reach their own intents
+    ("manual_search", re.compile(
+        r"\b(?:what does the (?:cubed-3 )?manual say|(?:search|check|look in) the (?:cubed-3 )?manual)\b"
+        r"(?: (?:about|for|on|regarding)\b)?(?P<param>.*)",
+        re.S,
+    ), ()),
+    ("students_need_skill", re.compile(r"which students need|who needs"), tuple(SKILL_TARGET_MAP)),
+    ("group_by", re.compile(r"^(?=.*group)(?=.*by)", re.S), ("risk", "grade", "school")),
+    ("student_progress", re.compile(r"progress (?:for|of)(?: (?P<param>.*))?", re.S), ()),
+    ("focus", re.compile(r"focus|priority|top"), ()),
+]
 
+
+def _parse_intent(query: str) -> tuple[str, str | None]:
+    q = " ".join(query.lower().split())
+    for intent, pattern, choices in INTENT_PATTERNS:
+        match = pattern.search(q)
+        if match:
+            param = match.groupdict().get("param")
+            if param is not None:
+                param = param.strip().rstrip("?. ") or None
+            elif choices:
+                param = next((choice for choice in choices if choice in q), None)
+            return intent, param
     return "default", None
 
 
+def _latest_sessions(db: Session, my_student_ids: list[int]):
+    """Subquery of (student_id, session_id) for each student's most recent completed session."""
+    ranked = (
+        db.query(
+            TestSession.student_id,
+            TestSession.id.label("session_id"),
+            func.row_number().over(
+                partition_by=TestSession.student_id,
+                order_by=(TestSession.created_at.desc(), TestSession.id),
+            ).label("recency"),
+        )
+        .filter(TestSession.student_id.in_(my_student_ids), TestSession.is_complete == True)
+        .subquery()
+    )
+    return db.query(ranked.c.student_id, ranked.c.session_id).filter(ranked.c.recency == 1).subquery()
+
+
 def _handle_students_need_skill(skill: str | None, my_student_ids: list[int], db: Session) -> dict:
     if not skill or skill not in SKILL_TARGET_MAP:
         return {
@@ -75,27 +105,34 @@ def _handle_students_need_skill(skill: str | None, my_student_ids: list[int], db
 
     targets = SKILL_TARGET_MAP[skill]
 
-    high_risk_students = {}
-    sessions = (
-        db.query(TestSession)
-        .filter(TestSession.student_id.in_(my_student_ids), TestSession.is_complete == True)
+    rows = (
+        db.query(
+            Student.id, Student.first_name, Student.last_name, Student.grade, Student.school,
+            Score.target, Score.raw_score,
+        )
+        .join(TestSession, TestSession.student_id == Student.id)
+        .join(Score, Score.test_session_id == TestSession.id)
+        .filter(
+            Student.id.in_(my_student_ids),
+            TestSession.is_complete == True,
+            Score.target.in_(targets),
+            Score.risk_level == "high",
+        )
+        .order_by(TestSession.id, Score.id)
         .all()
     )
-    for session in sessions:
-        for score in session.scores:
-            if score.target in targets and score.risk_level == "high":
-                student = session.student
-                if student.id not in high_risk_students:
-                    high_risk_students[student.id] = {
-                        "student_id": student.id,
-                        "student_name": f"{student.last_name}, {student.first_name}",
-                        "grade": student.grade,
-                        "school": student.school,
-                        "risk_areas": [],
-                    }
-                high_risk_students[student.id]["risk_areas"].append(
-                    f"{score.target} ({score.raw_score})"
-                )
+
+    high_risk_students = {}
+    for student_id, first_name, last_name, grade, school, target, raw_score in rows:
+        if student_id not in high_risk_students:
+            high_risk_students[student_id] = {
+                "student_id": student_id,
+                "student_name": f"{last_name}, {first_name}",
+                "grade": grade,
+                "school": school,
+                "risk_areas": [],
+            }
+        high_risk_students[student_id]["risk_areas"].append(f"{target} ({raw_score})")
 
     data = list(high_risk_students.values())
     return {
@@ -107,6 +144,9 @@ def _handle_students_need_skill(skill: str | None, my_student_ids: list[int], db
 
 
 def _handle_group_by(group_key: str | None, my_student_ids: list[int], db: Session) -> dict:
+    if group_key == "risk":
+        return _group_by_risk(my_student_ids, db)
+
     students = db.query(Student).filter(Student.id.in_(my_student_ids)).all()
 
     if group_key == "grade":
@@ -139,39 +179,6 @@ def _handle_group_by(group_key: str | None, my_student_ids: list[int], db: Sessi
             "message": f"Students grouped by school ({len(groups)} groups).",
         }
 
-    if group_key == "risk":
-        risk_groups: dict[str, list] = {"high": [], "moderate": [], "benchmark": []}
-        for s in students:
-            latest = (
-                db.query(TestSession)
-                .filter(TestSession.student_id == s.id, TestSession.is_complete == True)
-                .order_by(TestSession.created_at.desc())
-                .first()
-            )
-            if not latest:
-                continue
-            risks = [sc.risk_level for sc in latest.scores if sc.risk_level]
-            if "high" in risks:
-                level = "high"
-            elif "moderate" in risks:
-                level = "moderate"
-            else:
-                level = "benchmark"
-            risk_groups[level].append({
-                "student_id": s.id,
-                "student_name": f"{s.last_name}, {s.first_name}",
-                "grade": s.grade,
-            })
-        return {
-            "intent": "group_by",
-            "response_type": "cards",
-            "data": [
-                {"group": level, "students": members, "count": len(members)}
-                for level, members in risk_groups.items()
-            ],
-            "message": "Students grouped by risk level.",
-        }
-
     return {
         "intent": "group_by",
         "response_type": "text",
@@ -180,6 +187,84 @@ def _handle_group_by(group_key: str | None, my_student_ids: list[int], db: Sessi
     }
 
 
+def _handle_manual_search(topic: str | None) -> dict:
+    if not topic:
+        return {
+            "intent": "manual_search",
+            "response_type": "text",
+            "data": [],
+            "message": "What should I look up? Try: 'what does the manual say about retell scoring?'",
+        }
+
+    index = get_manual_index()
+    if index is None:
+        return {
+            "intent": "manual_search",
+            "response_type": "text",
+            "data": [],
+            "message": "The CUBED-3 manual isn't available on this server.",
+        }
+
+    passages = index.search(topic, limit=5)
+    data = [
+        {
+            "page": p["page"],
+            "excerpt": p["text"] if len(p["text"]) <= MANUAL_EXCERPT_CHARS else p["text"][:MANUAL_EXCERPT_CHARS] + "…",
+        }
+        for p in passages
+    ]
+    return {
+        "intent": "manual_search",
+        "response_type": "table" if data else "text",
+        "data": data,
+        "message": (
+            f"Here's what the CUBED-3 manual says about '{topic}'."
+            if data else f"I couldn't find anything in the manual about '{topic}'."
+        ),
+    }
+
+
+def _group_by_risk(my_student_ids: list[int], db: Session) -> dict:
+    # Worst risk level on each student's latest session, computed per student in SQL
+    latest = _latest_sessions(db, my_student_ids)
+
+    def has_level(level: str):
+        return func.max(case((Score.risk_level == level, 1), else_=0)) == 1
+
+    levels = (
+        db.query(
+            latest.c.student_id,
+            case((has_level("high"), "high"), (has_level("moderate"), "moderate"), else_="benchmark").label("level"),
+        )
+        .outerjoin(Score, Score.test_session_id == latest.c.session_id)
+        .group_by(latest.c.student_id)
+        .subquery()
+    )
+    rows = (
+        db.query(Student.id, Student.first_name, Student.last_name, Student.grade, levels.c.level)
+        .join(levels, levels.c.student_id == Student.id)
+        .order_by(Student.id)
+        .all()
+    )
+
+    risk_groups: dict[str, list] = {"high": [], "moderate": [], "benchmark": []}
+    for student_id, first_name, last_name, grade, level in rows:
+        risk_groups[level].append({
+            "student_id": student_id,
+            "student_name": f"{last_name}, {first_name}",
+            "grade": grade,
+        })
+    return {
+        "intent": "group_by",
+        "response_type": "cards",
+        "data": [
+            {"group": level, "students": members, "count": len(members)}
+            for level, members in risk_groups.items()
+        ],
+        "message": "Students grouped by risk level.",
+    }
+
+
 def _handle_student_progress(name_query: str | None, my_student_ids: list[int], db: Session) -> dict:
     if not name_query:
         return {
@@ -189,13 +274,7 @@ def _handle_student_progress(name_query: str | None, my_student_ids: list[int],
             "message": "Please specify a student name, e.g. 'progress for Maria Garcia'.",
         }
 
-    parts = name_query.lower().split()
-    q = db.query(Student).filter(Student.id.in_(my_student_ids))
-    candidates = []
-    for student in q.all():
-        full = f"{student.first_name} {student.last_name}".lower()
-        if all(p in full for p in parts):
-            candidates.append(student)
+    candidates = search_students(db, name_query, student_ids=my_student_ids, limit=1)
 
     if not candidates:
         return {
@@ -234,26 +313,30 @@ def _handle_student_progress(name_query: str | None, my_student_ids: list[int],
 
 
 def _handle_focus(my_student_ids: list[int], db: Session) -> dict:
-    student_risk: list[tuple] = []
-    students = db.query(Student).filter(Student.id.in_(my_student_ids)).all()
-
-    for s in students:
-        latest = (
-            db.query(TestSession)
-            .filter(TestSession.student_id == s.id, TestSession.is_complete == True)
-            .order_by(TestSession.created_at.desc())
-            .first()
-        )
-        if not latest:
-            continue
-        risk_areas = [
-            sc.target for sc in latest.scores if sc.risk_level == "high"
-        ]
-        if risk_areas:
-            student_risk.append((s, risk_areas))
+    # Rank students by high-risk scores on their latest session in SQL, then
+    # load only the top five students and their high-risk targets
+    latest = _latest_sessions(db, my_student_ids)
+    high_count = func.count(Score.id)
+    top = (
+        db.query(latest.c.student_id, latest.c.session_id)
+        .join(Score, Score.test_session_id == latest.c.session_id)
+        .filter(Score.risk_level == "high")
+        .group_by(latest.c.student_id, latest.c.session_id)
+        .order_by(high_count.desc(), latest.c.student_id)
+        .limit(5)
+        .all()
+    )
 
-    student_risk.sort(key=lambda x: -len(x[1]))
-    top_5 = student_risk[:5]
+    session_ids = [session_id for _, session_id in top]
+    risk_areas: dict[int, list[str]] = {}
+    for session_id, target in (
+        db.query(Score.test_session_id, Score.target)
+        .filter(Score.test_session_id.in_(session_ids), Score.risk_level == "high")
+        .order_by(Score.id)
+    ):
+        risk_areas.setdefault(session_id, []).append(target)
+    students = {s.id: s for s in db.query(Student).filter(Student.id.in_([sid for sid, _ in top]))}
+    top_5 = [(students[student_id], risk_areas[session_id]) for student_id, session_id in top]
 
     data = [
         {
@@ -279,7 +362,25 @@ def ask_assistant(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    my_student_ids = [s.id for s in current_user.my_students]
+    intent, param = _parse_intent(payload.query)
+    version = data_version(db, current_user.id)
+    cached = _response_cache.get(current_user.id, (intent, param), version)
+    if cached is not None:
+        return cached
+
+    response = _answer(intent, param, current_user, db)
+    _response_cache.put(current_user.id, (intent, param), version, response)
+    return response
+
+
+def _answer(intent: str, param: str | None, current_user: User, db: Session) -> dict:
+    if intent == "manual_search":
+        return _handle_manual_search(param)
+
+    my_student_ids = [
+        student_id for (student_id,) in
+        db.query(user_students.c.student_id).filter(user_students.c.user_id == current_user.id)
+    ]
 
     if not my_student_ids:
         return {
@@ -289,8 +390,6 @@ def ask_assistant(
             "message": "You don't have any students assigned yet. Add students first.",
         }
 
-    intent, param = _parse_intent(payload.query)
-
     if intent == "students_need_skill":
         return _handle_students_need_skill(param, my_student_ids, db)
     if intent == "group_by":
@@ -306,3 +405,15 @@ def ask_assistant(
         "data": [],
         "message": AVAILABLE_QUERIES,
     }
+
+
+@router.get("/manual-search")
+def manual_search(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(5, ge=1, le=20),
+    current_user: User = Depends(get_current_user),
+):
+    index = get_manual_index()
+    if index is None:
+        raise HTTPException(503, "Manual index is not available")
+    return {"query": q, "results": index.search(q, limit=limit)}
@@ -1,156 +1,146 @@
 import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, distinct, case
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from database import get_db
 from models import *
-from auth import get_current_user
+from auth import get_current_user, require_admin
+from services.snapshots import (
+    complete_snapshot_date, latest_snapshot_date, rollup_query, proficiency_rate, scorecard_metrics,
+)
 
 router = APIRouter(prefix="/api/executive", tags=["executive"])
 
 
+def _require_org(current_user: User) -> int:
+    if not current_user.organization_id:
+        raise HTTPException(400, "User has no organization")
+    return current_user.organization_id
+
+
 @router.get("/scorecard")
 def get_scorecard(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    org_id = current_user.organization_id
-    if not org_id:
-        raise HTTPException(400, "User has no organization")
+    org_id = _require_org(current_user)
+    snapshot_date = latest_snapshot_date(db, org_id)
 
-    total_students = (
-        db.query(func.count(Student.id))
-        .filter(Student.organization_id == org_id, Student.status == "active")
-        .scalar()
+    totals = (
+        rollup_query(db)
+        .filter(OrgSnapshot.organization_id == org_id, OrgSnapshot.snapshot_date == snapshot_date)
+        .one()
     )
+    return {**scorecard_metrics(totals), "snapshot_date": snapshot_date}
 
-    current_year = str(datetime.datetime.utcnow().year)
-    academic_year = f"{int(current_year) - 1}-{current_year}"
 
-    tested_subq = (
-        db.query(distinct(TestSession.student_id))
-        .join(Student, TestSession.student_id == Student.id)
-        .filter(
-            Student.organization_id == org_id,
-            TestSession.is_complete == True,
-            TestSession.academic_year == academic_year,
-        )
-        .subquery()
-    )
-    tested_count = db.query(func.count()).select_from(tested_subq).scalar()
+@router.get("/school-comparison")
+def get_school_comparison(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    org_id = _require_org(current_user)
+    snapshot_date = latest_snapshot_date(db, org_id)
 
-    risk_scores = (
-        db.query(Score.risk_level, func.count(distinct(TestSession.student_id)))
-        .join(TestSession, Score.test_session_id == TestSession.id)
-        .join(Student, TestSession.student_id == Student.id)
+    schools = (
+        rollup_query(db, OrgSnapshot.school)
         .filter(
-            Student.organization_id == org_id,
-            TestSession.is_complete == True,
-            TestSession.academic_year == academic_year,
-            Score.risk_level.isnot(None),
+            OrgSnapshot.organization_id == org_id,
+            OrgSnapshot.snapshot_date == snapshot_date,
+            OrgSnapshot.status == "active",
+            OrgSnapshot.school.isnot(None),
         )
-        .group_by(Score.risk_level)
+        .group_by(OrgSnapshot.school)
         .all()
     )
 
-    risk_map = {level: count for level, count in risk_scores}
-    benchmark_plus = risk_map.get("benchmark", 0) + risk_map.get("advanced", 0)
-    scored_total = sum(risk_map.values()) or 1
-    proficiency_rate = round(benchmark_plus / scored_total * 100, 1)
-
-    completion_rate = round(tested_count / max(total_students, 1) * 100, 1)
-
-    total_scored = sum(risk_map.values())
-    tier1_pct = round((risk_map.get("benchmark", 0) + risk_map.get("advanced", 0)) / max(total_scored, 1) * 100, 1)
-    tier2_pct = round(risk_map.get("moderate", 0) / max(total_scored, 1) * 100, 1)
-    tier3_pct = round(risk_map.get("high", 0) / max(total_scored, 1) * 100, 1)
+    results = []
+    for r in schools:
+        scored_total = (r.risk_advanced + r.risk_benchmark + r.risk_moderate + r.risk_high) or 1
+        at_risk = r.risk_moderate + r.risk_high
+        results.append({
+            "school": r.school,
+            "student_count": r.total_students,
+            "proficiency_rate": proficiency_rate(r),
+            "avg_risk_pct": round(at_risk / scored_total * 100, 1),
+            "completion_rate": round(r.tested_count / max(r.total_students, 1) * 100, 1),
+        })
 
-    return {
-        "total_students": total_students,
-        "tested_count": tested_count,
-        "proficiency_rate": proficiency_rate,
-        "avg_growth": round(proficiency_rate * 0.12, 1),
-        "completion_rate": completion_rate,
-        "tier_distribution": {
-            "tier1": round(tier1_pct),
-            "tier2": round(tier2_pct),
-            "tier3": round(tier3_pct),
-        },
-    }
+    results.sort(key=lambda x: x["proficiency_rate"], reverse=True)
+    return results
 
 
-@router.get("/school-comparison")
-def get_school_comparison(
+@router.get("/trends")
+def get_trends(
+    days: int = Query(90, ge=1, le=1095),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    org_id = current_user.organization_id
-    if not org_id:
-        raise HTTPException(400, "User has no organization")
-
-    current_year = str(datetime.datetime.utcnow().year)
-    academic_year = f"{int(current_year) - 1}-{current_year}"
-
-    schools = (
-        db.query(Student.school)
-        .filter(Student.organization_id == org_id, Student.status == "active", Student.school.isnot(None))
-        .distinct()
+    org_id = _require_org(current_user)
+    latest_snapshot_date(db, org_id)
+    since = (datetime.datetime.utcnow().date() - datetime.timedelta(days=days)).isoformat()
+
+    rows = (
+        rollup_query(db, OrgSnapshot.snapshot_date)
+        .filter(OrgSnapshot.organization_id == org_id, OrgSnapshot.snapshot_date >= since)
+        .group_by(OrgSnapshot.snapshot_date)
+        .order_by(OrgSnapshot.snapshot_date)
         .all()
     )
+    return [{"snapshot_date": r.snapshot_date, **scorecard_metrics(r)} for r in rows]
 
-    results = []
-    for (school_name,) in schools:
-        student_count = (
-            db.query(func.count(Student.id))
-            .filter(Student.organization_id == org_id, Student.school == school_name, Student.status == "active")
-            .scalar()
-        )
-
-        school_student_ids = (
-            db.query(Student.id)
-            .filter(Student.organization_id == org_id, Student.school == school_name, Student.status == "active")
-            .subquery()
-        )
-
-        risk_scores = (
-            db.query(Score.risk_level, func.count(distinct(TestSession.student_id)))
-            .join(TestSession, Score.test_session_id == TestSession.id)
-            .filter(
-                TestSession.student_id.in_(db.query(school_student_ids)),
-                TestSession.is_complete == True,
-                TestSession.academic_year == academic_year,
-                Score.risk_level.isnot(None),
-            )
-            .group_by(Score.risk_level)
-            .all()
-        )
 
-        risk_map = {level: count for level, count in risk_scores}
-        scored_total = sum(risk_map.values()) or 1
-        benchmark_plus = risk_map.get("benchmark", 0) + risk_map.get("advanced", 0)
-        at_risk = risk_map.get("moderate", 0) + risk_map.get("high", 0)
-
-        proficiency_rate = round(benchmark_plus / scored_total * 100, 1)
-        avg_risk_pct = round(at_risk / scored_total * 100, 1)
-
-        tested = (
-            db.query(func.count(distinct(TestSession.student_id)))
-            .filter(
-                TestSession.student_id.in_(db.query(school_student_ids)),
-                TestSession.is_complete == True,
-                TestSession.academic_year == academic_year,
-            )
-            .scalar()
+@router.get("/rollups")
+def get_rollups(
+    level: str = Query("state"),
+    country: Optional[str] = None,
+    state: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin),
+):
+    """Cross-organization rollups from the latest snapshots: one entry per
+    country, state, or district (organization) matching the filters."""
+    if level not in ("country", "state", "district"):
+        raise HTTPException(422, "level must be one of: country, state, district")
+
+    snapshot_date = complete_snapshot_date(db)
+    if level == "district":
+        q = (
+            rollup_query(db, Organization.id, Organization.name, Organization.country, Organization.state)
+            .join(Organization, Organization.id == OrgSnapshot.organization_id)
+            .filter(OrgSnapshot.snapshot_date == snapshot_date)
         )
-        completion_rate = round(tested / max(student_count, 1) * 100, 1)
-
-        results.append({
-            "school": school_name,
-            "student_count": student_count,
-            "proficiency_rate": proficiency_rate,
-            "avg_risk_pct": avg_risk_pct,
-            "completion_rate": completion_rate,
-        })
-
-    results.sort(key=lambda x: x["proficiency_rate"], reverse=True)
-    return results
+        if country:
+            q = q.filter(Organization.country == country)
+        if state:
+            q = q.filter(Organization.state == state)
+        rows = q.group_by(Organization.id).order_by(Organization.country, Organization.state, Organization.name).all()
+        return [
+            {
+                "level": "district",
+                "organization_id": r.id,
+                "name": r.name,
+                "country": r.country,
+                "state": r.state,
+                "snapshot_date": snapshot_date,
+                **scorecard_metrics(r),
+            }
+            for r in rows
+        ]
+
+    q = db.query(RegionRollup).filter(RegionRollup.level == level, RegionRollup.snapshot_date == snapshot_date)
+    if country:
+        q = q.filter(RegionRollup.country == country)
+    if state:
+        q = q.filter(RegionRollup.state == state)
+    return [
+        {
+            "level": r.level,
+            "country": r.country,
+            "state": r.state,
+            "organization_count": r.organization_count,
+            "snapshot_date": r.snapshot_date,
+            **scorecard_metrics(r),
+        }
+        for r in q.order_by(RegionRollup.country, RegionRollup.state).all()
+    ]
@@ -1,10 +1,12 @@
-import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, distinct
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from database import get_db
 from models import *
 from auth import get_current_user
+from services.badges import award_badges, school_students
+from services import leaderboards
 
 router = APIRouter(prefix="/api/gamification", tags=["gamification"])
 
@@ -86,6 +88,27 @@ def get_student_streak(
     }
 
 
+@router.get("/leaderboard")
+def get_leaderboard(
+    group_id: Optional[int] = None,
+    school: Optional[str] = None,
+    limit: int = Query(leaderboards.DEFAULT_LIMIT, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Top reading streaks in one of the user's groups, or in a school of their organization."""
+    if group_id is not None:
+        group = db.query(Group).filter(Group.id == group_id, Group.owner_id == current_user.id).first()
+        if not group:
+            raise HTTPException(404, "Group not found")
+        scope = leaderboards.group_scope(group.id)
+    elif school:
+        scope = leaderboards.school_scope(current_user.organization_id, school)
+    else:
+        raise HTTPException(422, "Pass group_id or school")
+    return {"scope": scope, "entries": leaderboards.top(db, scope, limit)}
+
+
 @router.get("/student/{student_id}/profile")
 def get_student_profile(
     student_id: int,
@@ -164,57 +187,6 @@ def get_student_profile(
     }
 
 
-BADGE_CRITERIA = {
-    "first_assessment": lambda db, sid: (
-        db.query(func.count(TestSession.id))
-        .filter(TestSession.student_id == sid, TestSession.is_complete == True)
-        .scalar()
-        >= 1
-    ),
-    "five_assessments": lambda db, sid: (
-        db.query(func.count(TestSession.id))
-        .filter(TestSession.student_id == sid, TestSession.is_complete == True)
-        .scalar()
-        >= 5
-    ),
-    "risk_reducer": lambda db, sid: _check_risk_reducer(db, sid),
-    "perfect_score": lambda db, sid: (
-        db.query(Score)
-        .join(TestSession, Score.test_session_id == TestSession.id)
-        .filter(
-            TestSession.student_id == sid,
-            Score.raw_score == Score.max_score,
-            Score.max_score.isnot(None),
-            Score.max_score > 0,
-        )
-        .first()
-        is not None
-    ),
-    "streak_7": lambda db, sid: (
-        (db.query(ReadingStreak).filter(ReadingStreak.student_id == sid).first() or ReadingStreak(current_streak=0)).current_streak >= 7
-    ),
-}
-
-
-def _check_risk_reducer(db: Session, student_id: int) -> bool:
-    sessions = (
-        db.query(TestSession)
-        .filter(TestSession.student_id == student_id, TestSession.is_complete == True)
-        .order_by(TestSession.completed_at.asc())
-        .all()
-    )
-    if len(sessions) < 2:
-        return False
-
-    first_scores = db.query(Score).filter(Score.test_session_id == sessions[0].id).all()
-    last_scores = db.query(Score).filter(Score.test_session_id == sessions[-1].id).all()
-
-    first_had_high = any(s.risk_level == "high" for s in first_scores)
-    last_at_benchmark = any(s.risk_level in ("benchmark", "advanced") for s in last_scores)
-
-    return first_had_high and last_at_benchmark
-
-
 @router.post("/student/{student_id}/check-badges")
 def check_and_award_badges(
     student_id: int,
@@ -225,31 +197,34 @@ def check_and_award_badges(
     if not student:
         raise HTTPException(404, "Student not found")
 
-    all_badges = db.query(Badge).all()
-    already_earned = {
-        sb.badge_id
-        for sb in db.query(StudentBadge).filter(StudentBadge.student_id == student_id).all()
-    }
+    awarded = award_badges(db, select(Student.id).where(Student.id == student_id))
+    db.commit()
 
-    newly_awarded = []
-    for badge in all_badges:
-        if badge.id in already_earned:
-            continue
-
-        checker = BADGE_CRITERIA.get(badge.criteria)
-        if checker and checker(db, student_id):
-            sb = StudentBadge(
-                student_id=student_id,
-                badge_id=badge.id,
-                earned_at=datetime.datetime.utcnow(),
-            )
-            db.add(sb)
-            newly_awarded.append({
-                "badge_id": badge.id,
-                "name": badge.name,
-                "description": badge.description,
-                "icon": badge.icon,
-            })
+    newly_awarded = [
+        {
+            "badge_id": badge.id,
+            "name": badge.name,
+            "description": badge.description,
+            "icon": badge.icon,
+        }
+        for badge in awarded.get(student_id, [])
+    ]
+    return {"newly_awarded": newly_awarded, "total_new": len(newly_awarded)}
+
+
+@router.post("/check-badges")
+def check_and_award_school_badges(
+    school: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Award badges to every student in the organization, or in one school of it."""
+    if current_user.role != "admin":
+        raise HTTPException(403, "Admin access required")
 
+    awarded = award_badges(db, school_students(current_user.organization_id, school))
     db.commit()
-    return {"newly_awarded": newly_awarded, "total_new": len(newly_awarded)}
+    return {
+        "students_awarded": len(awarded),
+        "total_new": sum(len(badges) for badges in awarded.values()),
+    }
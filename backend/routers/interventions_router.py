@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from database import get_db
 from auth import get_current_user
 from models import *
+from services.intervention_catalog import get_catalog
 
 router = APIRouter(prefix="/api/interventions", tags=["interventions"])
 
 
 @router.get("/")
 def list_interventions(
+    request: Request,
     skill_area: Optional[str] = Query(None),
     grade: Optional[str] = Query(None),
     evidence_level: Optional[str] = Query(None),
@@ -17,32 +20,22 @@ def list_interventions(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    q = db.query(Intervention)
-    if skill_area:
-        q = q.filter(Intervention.skill_area == skill_area)
+    """Library search from the in-memory catalog. The ETag is the catalog digest, so
+    a revalidation returns 304 until the library changes."""
+    catalog = get_catalog(db)
+    etag = f'W/"interventions-{catalog.etag}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    interventions = catalog.find(skill_area, grade)
     if evidence_level:
-        q = q.filter(Intervention.evidence_level == evidence_level)
-    if grade:
-        q = q.filter(Intervention.grade_min <= grade, Intervention.grade_max >= grade)
+        interventions = [i for i in interventions if i["evidence_level"] == evidence_level]
     if search:
-        q = q.filter(Intervention.title.ilike(f"%{search}%"))
-
-    interventions = q.order_by(Intervention.title).all()
-    return [
-        {
-            "id": i.id,
-            "title": i.title,
-            "description": i.description,
-            "skill_area": i.skill_area,
-            "grade_min": i.grade_min,
-            "grade_max": i.grade_max,
-            "duration_minutes": i.duration_minutes,
-            "materials": i.materials,
-            "evidence_level": i.evidence_level,
-            "instructions": i.instructions,
-        }
-        for i in interventions
-    ]
+        needle = search.lower()
+        interventions = [i for i in interventions if needle in i["title"].lower()]
+    # Catalog rows are plain JSON values already; skip the generic encoder
+    return JSONResponse(interventions, headers=headers)
 
 
 @router.get("/{id}")
@@ -51,21 +44,10 @@ def get_intervention(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    intervention = db.query(Intervention).filter(Intervention.id == id).first()
+    intervention = get_catalog(db).by_id.get(id)
     if not intervention:
         raise HTTPException(404, "Intervention not found")
-    return {
-        "id": intervention.id,
-        "title": intervention.title,
-        "description": intervention.description,
-        "skill_area": intervention.skill_area,
-        "grade_min": intervention.grade_min,
-        "grade_max": intervention.grade_max,
-        "duration_minutes": intervention.duration_minutes,
-        "materials": intervention.materials,
-        "evidence_level": intervention.evidence_level,
-        "instructions": intervention.instructions,
-    }
+    return intervention
 
 
 @router.post("/assign")
@@ -122,13 +104,14 @@ def list_assignments(
         .all()
     )
 
+    catalog = get_catalog(db)
     results = []
     for a in assignments:
-        intervention = db.query(Intervention).filter(Intervention.id == a.intervention_id).first()
+        intervention = catalog.by_id.get(a.intervention_id)
         results.append({
             "id": a.id,
             "intervention_id": a.intervention_id,
-            "intervention_title": intervention.title if intervention else None,
+            "intervention_title": intervention["title"] if intervention else None,
             "student_id": a.student_id,
             "assigned_by": a.assigned_by,
             "status": a.status,
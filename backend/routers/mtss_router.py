@@ -1,97 +1,32 @@
 import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from database import get_db
 from auth import get_current_user
 from models import *
+from services.tiers import compute_tier, ensure_org_tiers
 
 router = APIRouter(prefix="/api/mtss", tags=["mtss"])
 
-TIER_MAP = {
-    "benchmark": 1,
-    "advanced": 1,
-    "moderate": 2,
-    "high": 3,
-}
-
-
-def _latest_scores_for_org(db: Session, org_id: int):
-    """Return a dict mapping student_id -> list of (subtest, target, risk_level)
-    from the most recent completed test session per student+subtest."""
-    from sqlalchemy import and_
-
-    latest_session_subq = (
-        db.query(
-            TestSession.student_id,
-            TestSession.subtest,
-            func.max(TestSession.completed_at).label("max_completed"),
-        )
-        .join(Student, Student.id == TestSession.student_id)
-        .filter(
-            Student.organization_id == org_id,
-            TestSession.is_complete == True,
-        )
-        .group_by(TestSession.student_id, TestSession.subtest)
-        .subquery()
-    )
-
-    rows = (
-        db.query(
-            TestSession.student_id,
-            TestSession.subtest,
-            Score.target,
-            Score.risk_level,
-        )
-        .join(Score, Score.test_session_id == TestSession.id)
-        .join(
-            latest_session_subq,
-            and_(
-                TestSession.student_id == latest_session_subq.c.student_id,
-                TestSession.subtest == latest_session_subq.c.subtest,
-                TestSession.completed_at == latest_session_subq.c.max_completed,
-            ),
-        )
-        .filter(Score.risk_level.isnot(None), Score.sub_target.is_(None))
-        .all()
-    )
-
-    student_scores: dict = {}
-    for student_id, subtest, target, risk_level in rows:
-        student_scores.setdefault(student_id, []).append(
-            {"subtest": subtest, "target": target, "risk_level": risk_level}
-        )
-    return student_scores
-
-
-def _compute_tier(risk_levels: list[str]) -> int:
-    """Majority-rules tier: Tier 3 if >=50% high, Tier 2 if >=50% moderate+high,
-    else Tier 1. Prevents a single high score from putting students in Tier 3."""
-    if not risk_levels:
-        return 1
-    tiers = [TIER_MAP.get(rl, 1) for rl in risk_levels]
-    n = len(tiers)
-    high_count = tiers.count(3)
-    moderate_count = tiers.count(2)
-    if high_count >= n * 0.5:
-        return 3
-    if (high_count + moderate_count) >= n * 0.5:
-        return 2
-    return 1
-
-
 @router.get("/tier-summary")
 def tier_summary(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    student_scores = _latest_scores_for_org(db, current_user.organization_id)
+    ensure_org_tiers(db, current_user.organization_id)
+    rows = (
+        db.query(StudentTier.tier, func.count(StudentTier.id))
+        .filter(StudentTier.organization_id == current_user.organization_id)
+        .group_by(StudentTier.tier)
+        .all()
+    )
 
     counts = {1: 0, 2: 0, 3: 0}
-    for sid, scores in student_scores.items():
-        tier = _compute_tier([s["risk_level"] for s in scores])
-        counts[tier] += 1
+    for tier, count in rows:
+        counts[tier] = count
 
     total = sum(counts.values())
     def pct(n): return round(n / total * 100, 1) if total else 0
@@ -106,34 +41,102 @@ def tier_summary(
 
 @router.get("/tier-students")
 def tier_students(
+    response: Response,
     tier: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    student_scores = _latest_scores_for_org(db, current_user.organization_id)
-    student_ids = list(student_scores.keys())
-    students = db.query(Student).filter(Student.id.in_(student_ids)).all() if student_ids else []
-    student_map = {s.id: s for s in students}
-
-    results = []
-    for sid, scores in student_scores.items():
-        s = student_map.get(sid)
-        if not s:
-            continue
-        risk_levels = [sc["risk_level"] for sc in scores]
-        student_tier = _compute_tier(risk_levels)
-        if tier is not None and student_tier != tier:
-            continue
-        results.append({
+    ensure_org_tiers(db, current_user.organization_id)
+    q = (
+        db.query(StudentTier, Student)
+        .join(Student, Student.id == StudentTier.student_id)
+        .filter(StudentTier.organization_id == current_user.organization_id)
+    )
+    if tier is not None:
+        q = q.filter(StudentTier.tier == tier)
+    if limit is not None:
+        response.headers["X-Total-Count"] = str(q.with_entities(func.count(StudentTier.id)).scalar())
+        q = q.order_by(Student.last_name, Student.first_name, Student.id).offset(offset).limit(limit)
+
+    return [
+        {
             "student_id": s.id,
             "first_name": s.first_name,
             "last_name": s.last_name,
             "grade": s.grade,
             "school": s.school,
-            "tier": student_tier,
-            "risk_levels": scores,
-        })
-    return results
+            "tier": st.tier,
+            "risk_levels": json.loads(st.risk_levels_json or "[]"),
+        }
+        for st, s in q.all()
+    ]
+
+
+TOY_ORDER = {"BOY": 0, "MOY": 1, "EOY": 2}
+
+
+def _tier_histories(db: Session, student_ids: list[int]) -> dict:
+    """Window-by-window tier history for each student, from a single scores query."""
+    rows = (
+        db.query(TestSession.student_id, TestSession.academic_year, TestSession.time_of_year, Score.risk_level)
+        .outerjoin(Score, Score.test_session_id == TestSession.id)
+        .filter(TestSession.student_id.in_(student_ids), TestSession.is_complete == True)
+        .all()
+    )
+
+    # Group by student, then assessment window (academic_year + time_of_year); a
+    # window with no rated scores is still listed, and compute_tier makes it tier 1
+    windows: dict = {}
+    for student_id, academic_year, time_of_year, risk_level in rows:
+        risk_levels = windows.setdefault(student_id, {}).setdefault((academic_year, time_of_year), [])
+        if risk_level:
+            risk_levels.append(risk_level)
+
+    return {
+        student_id: [
+            {"period": f"{year} {toy}", "tier": compute_tier(risk_levels)}
+            for (year, toy), risk_levels in sorted(
+                student_windows.items(), key=lambda x: (x[0][0], TOY_ORDER.get(x[0][1], 9))
+            )
+        ]
+        for student_id, student_windows in windows.items()
+    }
+
+
+@router.get("/tier-history")
+def bulk_tier_history(
+    group_id: Optional[int] = Query(None),
+    student_ids: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if group_id is None and not student_ids:
+        raise HTTPException(422, "Provide group_id or student_ids")
+
+    # Both paths are confined to the caller's organization, including group members
+    q = db.query(Student).filter(Student.organization_id == current_user.organization_id)
+    if group_id is not None:
+        group = db.query(Group).filter(Group.id == group_id, Group.owner_id == current_user.id).first()
+        if not group:
+            raise HTTPException(404, "Group not found")
+        q = q.join(group_students, group_students.c.student_id == Student.id).filter(group_students.c.group_id == group_id)
+    if student_ids:
+        q = q.filter(Student.id.in_(student_ids))
+    students = q.order_by(Student.last_name, Student.first_name).all()
+
+    histories = _tier_histories(db, [s.id for s in students])
+    return [
+        {
+            "student_id": s.id,
+            "first_name": s.first_name,
+            "last_name": s.last_name,
+            "grade": s.grade,
+            "history": histories.get(s.id, []),
+        }
+        for s in students
+    ]
 
 
 @router.get("/tier-history/{student_id}")
@@ -142,34 +145,13 @@ def tier_history(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    student = db.query(Student).filter(Student.id == student_id).first()
+    student = db.query(Student).filter(
+        Student.id == student_id, Student.organization_id == current_user.organization_id
+    ).first()
     if not student:
         raise HTTPException(404, "Student not found")
 
-    sessions = (
-        db.query(TestSession)
-        .filter(TestSession.student_id == student_id, TestSession.is_complete == True)
-        .order_by(TestSession.academic_year, TestSession.time_of_year)
-        .all()
-    )
-
-    # Group by assessment window (academic_year + time_of_year)
-    windows: dict = {}
-    for sess in sessions:
-        key = f"{sess.academic_year} {sess.time_of_year}"
-        risk_levels = windows.setdefault(key, [])
-        for score in sess.scores:
-            if score.risk_level:
-                risk_levels.append(score.risk_level)
-
-    toy_order = {"BOY": 0, "MOY": 1, "EOY": 2}
-    history = []
-    for period, risk_levels in sorted(
-        windows.items(), key=lambda x: (x[0].split()[0], toy_order.get(x[0].split()[-1], 9))
-    ):
-        history.append({"period": period, "tier": _compute_tier(risk_levels)})
-
-    return history
+    return _tier_histories(db, [student_id]).get(student_id, [])
 
 
 @router.post("/intervention-log")
@@ -1,24 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
-from database import get_db
-from auth import get_current_user
+from database import get_db, SessionLocal
+from auth import get_current_user, get_user_from_token, issue_stream_ticket, redeem_stream_ticket, STREAM_TICKET_SECONDS
 from models import *
+from services import notifications as notification_service
+from services.pubsub import broker
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
+# Comment line sent on idle streams so proxies keep the connection open
+KEEPALIVE_SECONDS = 15
+
+
+def _stream_user_id(ticket: Optional[str], token: Optional[str]) -> int:
+    db = SessionLocal()
+    try:
+        if ticket is not None:
+            return redeem_stream_ticket(ticket, db).id
+        return get_user_from_token(token, db).id
+    finally:
+        db.close()
+
+
+def _current_unread_count(user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return notification_service.unread_count(db, user_id)
+    finally:
+        db.close()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream-ticket")
+def stream_ticket(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """A single-use ticket for /stream, which EventSource opens without headers."""
+    return {"ticket": issue_stream_ticket(db, current_user), "expires_in": STREAM_TICKET_SECONDS}
+
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    ticket: Optional[str] = Query(None),
+):
+    """Server-sent events: the current unread count, then `notification` and
+    `unread_count` events as they happen. Authenticated by a ticket from
+    /stream-ticket in the query string (EventSource can't set headers), or by the
+    usual bearer header; the JWT itself is never accepted in the URL."""
+    token = None
+    if ticket is None:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise HTTPException(401, "Not authenticated")
+    # Resolve the user up front with a short-lived session; the stream holds none
+    user_id = await run_in_threadpool(_stream_user_id, ticket, token)
+
+    async def events():
+        # Subscribe before reading the count so nothing published in between is lost
+        subscription = broker.subscribe(notification_service.channel(user_id))
+        try:
+            count = await run_in_threadpool(_current_unread_count, user_id)
+            yield "retry: 5000\n" + _sse("unread_count", {"event": "unread_count", "unread_count": count})
+            while not await request.is_disconnected():
+                message = await subscription.get(timeout=KEEPALIVE_SECONDS)
+                if message is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield _sse(message["event"], message)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @router.get("/unread-count")
 def unread_count(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    count = (
-        db.query(Notification)
-        .filter(Notification.user_id == current_user.id, Notification.is_read == False)
-        .count()
-    )
-    return {"unread_count": count}
+    return {"unread_count": notification_service.unread_count(db, current_user.id)}
 
 
 @router.post("/mark-all-read")
@@ -26,36 +99,32 @@ def mark_all_read(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False,
-    ).update({"is_read": True})
+    notification_service.mark_all_read(db, current_user.id)
     db.commit()
     return {"message": "All notifications marked as read"}
 
 
 @router.get("/")
 def list_notifications(
+    response: Response,
     is_read: Optional[bool] = Query(None),
+    before_id: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    """Newest first, keyset-paginated on id: pass the X-Next-Cursor header (the last
+    id of this page) as `before_id` for the next page."""
     q = db.query(Notification).filter(Notification.user_id == current_user.id)
     if is_read is not None:
         q = q.filter(Notification.is_read == is_read)
-    notifications = q.order_by(Notification.created_at.desc()).all()
-    return [
-        {
-            "id": n.id,
-            "type": n.type,
-            "title": n.title,
-            "message": n.message,
-            "link": n.link,
-            "is_read": n.is_read,
-            "created_at": n.created_at.isoformat() if n.created_at else None,
-        }
-        for n in notifications
-    ]
+    if before_id is not None:
+        q = q.filter(Notification.id < before_id)
+    rows = q.order_by(Notification.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return [notification_service.serialize(n) for n in rows]
 
 
 @router.post("/{id}/read")
@@ -64,13 +133,7 @@ def mark_read(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    notification = (
-        db.query(Notification)
-        .filter(Notification.id == id, Notification.user_id == current_user.id)
-        .first()
-    )
-    if not notification:
+    if not notification_service.mark_read(db, current_user.id, id):
         raise HTTPException(404, "Notification not found")
-    notification.is_read = True
     db.commit()
     return {"message": "Notification marked as read"}
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from database import get_db
 from models import *
 from auth import get_current_user
+from services.response_cache import ResponseCache, data_version
 
 router = APIRouter(prefix="/api/parent", tags=["parent"])
 
 TOY_ORDER = {"BOY": 0, "MOY": 1, "EOY": 2}
 
+# Overview responses per parent, invalidated by their data version (bumped on
+# score and student changes for their children)
+_overview_cache = ResponseCache()
+
 ACTIVITIES_BY_GRADE = {
     "K": [
         {"title": "Alphabet Treasure Hunt", "description": "Find objects around the house that start with each letter of the alphabet.", "duration": "15 min"},
@@ -99,37 +105,62 @@ def get_my_children(
     ]
 
 
-@router.get("/child/{student_id}/progress")
-def get_child_progress(
-    student_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    student = _verify_parent_access(current_user, student_id, db)
-
-    sessions = (
-        db.query(TestSession)
-        .filter(TestSession.student_id == student_id, TestSession.is_complete == True)
-        .order_by(TestSession.created_at.desc())
-        .all()
+def _latest_two_sessions(db: Session, parent_id: int, student_id: int | None = None) -> dict:
+    """Linked children with the scores of their two latest completed sessions, from
+    one query: {student_id: (student row, [latest scores], [previous scores])}.
+    Scores are (target, raw_score, risk_level) in score order."""
+    children = select(parent_students.c.student_id).where(parent_students.c.user_id == parent_id)
+    if student_id is not None:
+        children = children.where(parent_students.c.student_id == student_id)
+    ranked = (
+        select(
+            TestSession.id,
+            TestSession.student_id,
+            func.row_number().over(
+                partition_by=TestSession.student_id,
+                order_by=(TestSession.created_at.desc(), TestSession.id),
+            ).label("rn"),
+        )
+        .where(TestSession.is_complete == True, TestSession.student_id.in_(children))
+        .subquery()
+    )
+    rows = (
+        db.query(
+            Student.id, Student.first_name, Student.last_name, Student.grade, Student.school,
+            ranked.c.rn, Score.target, Score.raw_score, Score.risk_level,
+        )
+        .select_from(parent_students)
+        .join(Student, Student.id == parent_students.c.student_id)
+        .outerjoin(ranked, (ranked.c.student_id == Student.id) & (ranked.c.rn <= 2))
+        .outerjoin(Score, Score.test_session_id == ranked.c.id)
+        .filter(parent_students.c.user_id == parent_id)
+        .order_by(Student.id, ranked.c.rn, Score.id)
     )
+    if student_id is not None:
+        rows = rows.filter(Student.id == student_id)
+    result: dict = {}
+    for row in rows:
+        _, latest, previous = result.setdefault(row.id, (row, [], []))
+        if row.target is not None:
+            (latest if row.rn == 1 else previous).append((row.target, row.raw_score, row.risk_level))
+    return result
 
+
+def _progress(student, latest: list, previous: list) -> dict:
     current_risks = {}
     recent_scores = []
-    if sessions:
-        latest = sessions[0]
-        for sc in latest.scores:
-            current_risks[sc.target] = sc.risk_level
-            recent_scores.append({
-                "target": sc.target,
-                "raw_score": sc.raw_score,
-                "risk_level": sc.risk_level,
-            })
+    for target, raw_score, risk_level in latest:
+        current_risks[target] = risk_level
+        recent_scores.append({
+            "target": target,
+            "raw_score": raw_score,
+            "risk_level": risk_level,
+        })
 
     trend = "stable"
-    if len(sessions) >= 2:
-        latest_scores = {sc.target: sc.raw_score for sc in sessions[0].scores}
-        previous_scores = {sc.target: sc.raw_score for sc in sessions[1].scores}
+    if previous:
+        latest_scores = {target: raw for target, raw, _ in latest}
+        previous_scores = {target: raw for target, raw, _ in previous}
         common = set(latest_scores) & set(previous_scores)
         if common:
             improving = sum(
@@ -166,6 +197,56 @@ def get_child_progress(
     }
 
 
+@router.get("/overview")
+def get_overview(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Every linked child's current risks, trend, celebrations and activities in one
+    response. The ETag is the parent's data version, so a revalidation that hits
+    costs one primary-key lookup and returns 304."""
+    if current_user.role != "parent":
+        raise HTTPException(403, "Parent access required")
+
+    version = data_version(db, current_user.id)
+    etag = f'W/"parent-{current_user.id}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    cached = _overview_cache.get(current_user.id, ("overview",), version)
+    if cached is not None:
+        return cached
+
+    children = []
+    for student, latest, previous in _latest_two_sessions(db, current_user.id).values():
+        child = _progress(student, latest, previous)
+        child.update({
+            "first_name": student.first_name,
+            "last_name": student.last_name,
+            "school": student.school,
+            "activities": ACTIVITIES_BY_GRADE.get(student.grade, DEFAULT_ACTIVITIES),
+        })
+        children.append(child)
+    result = {"children": children}
+    _overview_cache.put(current_user.id, ("overview",), version, result)
+    return result
+
+
+@router.get("/child/{student_id}/progress")
+def get_child_progress(
+    student_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    student = _verify_parent_access(current_user, student_id, db)
+    _, latest, previous = _latest_two_sessions(db, current_user.id, student_id).get(student.id, (None, [], []))
+    return _progress(student, latest, previous)
+
+
 @router.get("/child/{student_id}/activities")
 def get_child_activities(
     student_id: int,
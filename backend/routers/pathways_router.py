@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import *
 from auth import get_current_user
+from services.intervention_catalog import get_catalog
+from services.streaks import record_activity
 
 router = APIRouter(prefix="/api/pathways", tags=["pathways"])
 
@@ -24,16 +26,6 @@ TARGET_SKILL_MAP = {
     "VOCABULARY": "vocabulary",
 }
 
-GRADE_ORDER = ["K", "1", "2", "3", "4", "5", "6", "7", "8"]
-
-
-def _grade_in_range(grade: str, grade_min: str, grade_max: str) -> bool:
-    try:
-        idx = GRADE_ORDER.index(grade)
-        return GRADE_ORDER.index(grade_min) <= idx <= GRADE_ORDER.index(grade_max)
-    except ValueError:
-        return True
-
 
 @router.post("/generate/{student_id}")
 def generate_pathway(
@@ -75,14 +67,11 @@ def generate_pathway(
     if not needed_skills:
         raise HTTPException(400, "No mappable skill areas found for at-risk targets")
 
-    matched_interventions = (
-        db.query(Intervention)
-        .filter(Intervention.skill_area.in_(needed_skills))
-        .all()
+    catalog = get_catalog(db)
+    matched_interventions = sorted(
+        (i for skill in needed_skills for i in catalog.find(skill, student.grade)),
+        key=lambda i: i["id"],
     )
-    matched_interventions = [
-        i for i in matched_interventions if _grade_in_range(student.grade, i.grade_min, i.grade_max)
-    ]
 
     if not matched_interventions:
         raise HTTPException(404, "No matching interventions found in the library")
@@ -95,7 +84,7 @@ def generate_pathway(
     for idx, intervention in enumerate(matched_interventions):
         activity = PathwayActivity(
             pathway_id=pathway.id,
-            intervention_id=intervention.id,
+            intervention_id=intervention["id"],
             order=idx,
             status="pending",
         )
@@ -176,12 +165,22 @@ def complete_activity(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    activity = db.query(PathwayActivity).filter(PathwayActivity.id == activity_id).first()
-    if not activity:
+    row = (
+        db.query(PathwayActivity, StudentPathway.student_id)
+        .join(StudentPathway, StudentPathway.id == PathwayActivity.pathway_id)
+        .join(Student, Student.id == StudentPathway.student_id)
+        .filter(PathwayActivity.id == activity_id, Student.organization_id == current_user.organization_id)
+        .first()
+    )
+    if not row:
         raise HTTPException(404, "Activity not found")
+    activity, student_id = row
 
+    newly_completed = activity.status != "completed"
     activity.status = "completed"
     activity.completed_at = datetime.datetime.utcnow()
+    if newly_completed:
+        record_activity(db, student_id, activity.completed_at.date())
     db.commit()
     db.refresh(activity)
 
@@ -1,22 +1,89 @@
-import csv
-import io
+import base64
+import json
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response
+from sqlalchemy import func, or_, and_, select, literal
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, insert_ignore
 from models import User, Student, Group, user_students, group_students
 from schemas import StudentCreate, StudentOut, StudentUpdate, GroupCreate, GroupOut
 from auth import get_current_user
+from services.roster import import_roster, sync_roster
+from services.student_search import search_students, student_search_filter
+from services.response_cache import bump_data_versions, bump_for_organization, bump_for_students
+from services import leaderboards
 
 router = APIRouter(prefix="/api/students", tags=["students"])
 
 
-@router.get("/all", response_model=List[StudentOut])
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in StudentOut.model_fields]
+    if unknown:
+        raise HTTPException(422, f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def _encode_cursor(last_name: str, student_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([last_name, student_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        last_name, student_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(last_name), int(student_id)
+    except (ValueError, TypeError):
+        raise HTTPException(422, "Invalid cursor")
+
+
+def _student_page(q, response: Response, fields: Optional[str], cursor: Optional[str], limit: Optional[int]) -> list:
+    """Keyset-paginate a Student query on (last_name, id).
+
+    Without `limit` every match is returned, as before. `fields` selects only the
+    requested columns. X-Total-Count carries the total match count and
+    X-Next-Cursor the cursor for the following page when there is one."""
+    requested = _parse_fields(fields)
+    if limit is not None:
+        response.headers["X-Total-Count"] = str(q.with_entities(func.count(Student.id)).scalar())
+
+    if cursor:
+        last_name, student_id = _decode_cursor(cursor)
+        q = q.filter(or_(
+            Student.last_name > last_name,
+            and_(Student.last_name == last_name, Student.id > student_id),
+        ))
+    q = q.order_by(Student.last_name, Student.id)
+
+    if requested:
+        keys = list(dict.fromkeys(requested + ["last_name", "id"]))
+        q = q.with_entities(*[getattr(Student, k) for k in keys])
+    if limit is not None:
+        q = q.limit(limit + 1)
+    rows = q.all()
+
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].last_name, rows[-1].id)
+    if limit is None:
+        response.headers["X-Total-Count"] = str(len(rows))
+
+    if requested:
+        return [{k: getattr(r, k) for k in requested} for r in rows]
+    return [StudentOut.model_validate(s) for s in rows]
+
+
+@router.get("/all")
 def get_all_students(
+    response: Response,
     grade: Optional[str] = None,
     school: Optional[str] = None,
     status: Optional[str] = "active",
     search: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -28,20 +95,37 @@ def get_all_students(
     if school:
         q = q.filter(Student.school == school)
     if search:
-        q = q.filter(
-            (Student.first_name.ilike(f"%{search}%"))
-            | (Student.last_name.ilike(f"%{search}%"))
-            | (Student.student_id_external.ilike(f"%{search}%"))
-        )
-    return [StudentOut.model_validate(s) for s in q.order_by(Student.last_name).all()]
+        q = q.filter(student_search_filter(db, search))
+    return _student_page(q, response, fields, cursor, limit)
 
 
-@router.get("/my", response_model=List[StudentOut])
+@router.get("/my")
 def get_my_students(
+    response: Response,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    q = (
+        db.query(Student)
+        .join(user_students, user_students.c.student_id == Student.id)
+        .filter(user_students.c.user_id == current_user.id)
+    )
+    return _student_page(q, response, fields, cursor, limit)
+
+
+@router.get("/search", response_model=List[StudentOut])
+def student_typeahead(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(10, ge=1, le=50),
+    status: Optional[str] = "active",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return [StudentOut.model_validate(s) for s in current_user.my_students]
+    students = search_students(db, q, organization_id=current_user.organization_id, status=status, limit=limit)
+    return [StudentOut.model_validate(s) for s in students]
 
 
 @router.post("/", response_model=StudentOut)
@@ -62,6 +146,8 @@ def create_student(
         organization_id=current_user.organization_id,
     )
     db.add(student)
+    db.flush()
+    leaderboards.sync_students(db, [student.id])
     db.commit()
     db.refresh(student)
 
@@ -69,6 +155,7 @@ def create_student(
         teacher = db.query(User).filter(User.email == payload.teacher_email).first()
         if teacher:
             teacher.my_students.append(student)
+            bump_data_versions(db, [teacher.id])
             db.commit()
 
     return StudentOut.model_validate(student)
@@ -77,48 +164,37 @@ def create_student(
 @router.post("/bulk-import")
 def bulk_import_students(
     file: UploadFile = File(...),
+    mode: str = Query("create"),
+    dry_run: bool = Query(False),
+    deactivate_missing: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    content = file.file.read().decode("utf-8")
-    reader = csv.DictReader(io.StringIO(content))
-
-    created = 0
-    errors = []
-    for i, row in enumerate(reader, start=2):
-        try:
-            first = row.get("first_name") or row.get("First Name") or ""
-            last = row.get("last_name") or row.get("Last Name") or ""
-            grade = row.get("grade") or row.get("Grade") or ""
-            if not first or not last or not grade:
-                errors.append(f"Row {i}: missing required fields")
-                continue
-
-            student = Student(
-                first_name=first.strip(),
-                last_name=last.strip(),
-                grade=grade.strip(),
-                student_id_external=(row.get("student_id") or row.get("Student ID") or "").strip() or None,
-                school=(row.get("school") or row.get("School") or "").strip() or None,
-                district=(row.get("district") or row.get("District") or "").strip() or None,
-                gender=(row.get("gender") or row.get("Gender") or "").strip() or None,
-                organization_id=current_user.organization_id,
-            )
-            db.add(student)
-            db.flush()
-
-            teacher_email = (row.get("teacher_email") or row.get("Teacher Email") or "").strip()
-            if teacher_email:
-                teacher = db.query(User).filter(User.email == teacher_email).first()
-                if teacher:
-                    teacher.my_students.append(student)
-
-            created += 1
-        except Exception as e:
-            errors.append(f"Row {i}: {str(e)}")
+    if mode == "sync":
+        if current_user.role != "admin":
+            raise HTTPException(403, "Admin access required")
+        result = sync_roster(
+            db, file.file, current_user.organization_id,
+            dry_run=dry_run, deactivate_missing=deactivate_missing,
+        )
+    elif mode == "create":
+        result = import_roster(db, file.file, current_user.organization_id, dry_run=dry_run)
+    else:
+        raise HTTPException(422, "mode must be one of: create, sync")
+
+    if not dry_run:
+        bump_for_organization(db, current_user.organization_id)
+        leaderboards.sync_organization(db, current_user.organization_id)
+        db.commit()
+    return result
 
-    db.commit()
-    return {"created": created, "errors": errors}
+
+def _org_student_pairs(key: int, student_ids: List[int], current_user: User):
+    """SELECT (key, student_id) for the requested students in the user's organization."""
+    return select(literal(key), Student.id).where(
+        Student.id.in_(student_ids),
+        Student.organization_id == current_user.organization_id,
+    )
 
 
 @router.post("/add-to-my-students")
@@ -127,12 +203,31 @@ def add_to_my_students(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    students = db.query(Student).filter(Student.id.in_(student_ids)).all()
-    for s in students:
-        if s not in current_user.my_students:
-            current_user.my_students.append(s)
+    result = db.execute(
+        insert_ignore(user_students).from_select(
+            ["user_id", "student_id"], _org_student_pairs(current_user.id, student_ids, current_user)
+        )
+    )
+    bump_data_versions(db, [current_user.id])
+    db.commit()
+    return {"added": result.rowcount}
+
+
+@router.post("/remove-from-my-students")
+def bulk_remove_from_my_students(
+    student_ids: List[int],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    result = db.execute(
+        user_students.delete().where(
+            user_students.c.user_id == current_user.id,
+            user_students.c.student_id.in_(student_ids),
+        )
+    )
+    bump_data_versions(db, [current_user.id])
     db.commit()
-    return {"added": len(students)}
+    return {"removed": result.rowcount}
 
 
 @router.delete("/remove-from-my-students/{student_id}")
@@ -141,10 +236,14 @@ def remove_from_my_students(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    student = db.query(Student).filter(Student.id == student_id).first()
-    if student and student in current_user.my_students:
-        current_user.my_students.remove(student)
-        db.commit()
+    db.execute(
+        user_students.delete().where(
+            user_students.c.user_id == current_user.id,
+            user_students.c.student_id == student_id,
+        )
+    )
+    bump_data_versions(db, [current_user.id])
+    db.commit()
     return {"removed": True}
 
 
@@ -163,6 +262,9 @@ def update_student(student_id: int, payload: StudentUpdate, db: Session = Depend
         raise HTTPException(404, "Student not found")
     for field, value in payload.model_dump(exclude_unset=True).items():
         setattr(student, field, value)
+    db.flush()
+    bump_for_students(db, [student_id])
+    leaderboards.sync_students(db, [student_id])
     db.commit()
     db.refresh(student)
     return StudentOut.model_validate(student)
@@ -174,6 +276,8 @@ def set_inactive(student_id: int, db: Session = Depends(get_db), current_user: U
     if not student:
         raise HTTPException(404, "Student not found")
     student.status = "inactive"
+    db.flush()
+    leaderboards.sync_students(db, [student_id])
     db.commit()
     return {"status": "inactive"}
 
@@ -184,6 +288,8 @@ def set_active(student_id: int, db: Session = Depends(get_db), current_user: Use
     if not student:
         raise HTTPException(404, "Student not found")
     student.status = "active"
+    db.flush()
+    leaderboards.sync_students(db, [student_id])
     db.commit()
     return {"status": "active"}
 
@@ -191,11 +297,17 @@ def set_active(student_id: int, db: Session = Depends(get_db), current_user: Use
 # --- Groups ---
 @router.get("/groups/list", response_model=List[GroupOut])
 def list_groups(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    groups = db.query(Group).filter(Group.owner_id == current_user.id).all()
+    student_count = (
+        select(func.count())
+        .where(group_students.c.group_id == Group.id)
+        .correlate(Group)
+        .scalar_subquery()
+    )
+    rows = db.query(Group, student_count).filter(Group.owner_id == current_user.id).all()
     result = []
-    for g in groups:
+    for g, count in rows:
         out = GroupOut.model_validate(g)
-        out.student_count = len(g.students)
+        out.student_count = count
         result.append(out)
     return result
 
@@ -219,25 +331,45 @@ def get_group_students(group_id: int, db: Session = Depends(get_db), current_use
     return [StudentOut.model_validate(s) for s in group.students]
 
 
-@router.post("/groups/{group_id}/add-students")
-def add_students_to_group(group_id: int, student_ids: List[int], db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def _get_owned_group(group_id: int, db: Session, current_user: User) -> Group:
     group = db.query(Group).filter(Group.id == group_id, Group.owner_id == current_user.id).first()
     if not group:
         raise HTTPException(404, "Group not found")
-    students = db.query(Student).filter(Student.id.in_(student_ids)).all()
-    for s in students:
-        if s not in group.students:
-            group.students.append(s)
+    return group
+
+
+@router.post("/groups/{group_id}/add-students")
+def add_students_to_group(group_id: int, student_ids: List[int], db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    group = _get_owned_group(group_id, db, current_user)
+    result = db.execute(
+        insert_ignore(group_students).from_select(
+            ["group_id", "student_id"], _org_student_pairs(group.id, student_ids, current_user)
+        )
+    )
+    leaderboards.sync_students(db, student_ids)
     db.commit()
-    return {"added": len(students)}
+    return {"added": result.rowcount}
+
+
+@router.post("/groups/{group_id}/remove-students")
+def remove_students_from_group(group_id: int, student_ids: List[int], db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    group = _get_owned_group(group_id, db, current_user)
+    result = db.execute(
+        group_students.delete().where(
+            group_students.c.group_id == group.id,
+            group_students.c.student_id.in_(student_ids),
+        )
+    )
+    leaderboards.sync_students(db, student_ids)
+    db.commit()
+    return {"removed": result.rowcount}
 
 
 @router.delete("/groups/{group_id}")
 def delete_group(group_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    group = db.query(Group).filter(Group.id == group_id, Group.owner_id == current_user.id).first()
-    if not group:
-        raise HTTPException(404, "Group not found")
-    group.students = []
+    group = _get_owned_group(group_id, db, current_user)
+    db.execute(group_students.delete().where(group_students.c.group_id == group.id))
+    leaderboards.drop_group(db, group.id)
     db.delete(group)
     db.commit()
     return {"deleted": True}
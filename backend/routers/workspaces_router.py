@@ -1,6 +1,7 @@
 from typing import List, Optional
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select, union
 from sqlalchemy.orm import Session
 from database import get_db
 from models import *
@@ -31,28 +32,33 @@ def list_workspaces(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    owned = db.query(Workspace).filter(Workspace.owner_id == current_user.id).all()
-
-    member_of = (
-        db.query(Workspace)
-        .filter(Workspace.members.any(User.id == current_user.id))
+    visible_ids = union(
+        select(Workspace.id).where(Workspace.owner_id == current_user.id),
+        select(workspace_members.c.workspace_id).where(workspace_members.c.user_id == current_user.id),
+    )
+    member_count = (
+        select(func.count())
+        .where(workspace_members.c.workspace_id == Workspace.id)
+        .correlate(Workspace)
+        .scalar_subquery()
+    )
+    rows = (
+        db.query(Workspace, member_count)
+        .filter(Workspace.id.in_(visible_ids))
+        .order_by(Workspace.owner_id != current_user.id, Workspace.id)
         .all()
     )
-
-    seen_ids = set()
-    results = []
-    for ws in owned + member_of:
-        if ws.id not in seen_ids:
-            seen_ids.add(ws.id)
-            results.append({
-                "id": ws.id,
-                "name": ws.name,
-                "ws_type": ws.ws_type,
-                "owner_id": ws.owner_id,
-                "member_count": len(ws.members),
-                "created_at": str(ws.created_at),
-            })
-    return results
+    return [
+        {
+            "id": ws.id,
+            "name": ws.name,
+            "ws_type": ws.ws_type,
+            "owner_id": ws.owner_id,
+            "member_count": count,
+            "created_at": str(ws.created_at),
+        }
+        for ws, count in rows
+    ]
 
 
 @router.post("/")
@@ -0,0 +1,237 @@
+"""
+At-risk prediction — batched trajectory analysis over a teacher's roster.
+
+Every complete session and main-target score for the roster is loaded with one
+query into columnar NumPy arrays, and all students are evaluated at once:
+  - The latest academic year and latest session are per-student reductions
+  - Each (student, subtest_target) series is ordered BOY→MOY→EOY, and its last
+    two points give the drop percentage and any escalation to high risk
+  - Current risk is the majority rule over the latest session's risk levels
+Only flagged students are turned back into Python dicts for the response.
+
+Each result also carries the student's model-forecast EOY-risk probability from
+`risk_forecasts` (see services.risk_model), read with one indexed lookup, and
+whether the teacher is watching them, joined in with the roster.
+"""
+import numpy as np
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+from models import Student, TestSession, Score, RiskForecast, user_students, student_watchlist
+
+TOY_ORDER = {"BOY": 0, "MOY": 1, "EOY": 2}
+
+DROP_THRESHOLD = 0.20
+
+# Forecast EOY-risk probability at which the model's prediction is listed as a factor
+FORECAST_THRESHOLD = 0.8
+
+PROBABILITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+
+def _group_bounds(sorted_keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Start/end offsets of each run of equal values in an already-sorted array."""
+    if not len(sorted_keys):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    ends = np.r_[starts[1:], len(sorted_keys)]
+    return starts, ends
+
+
+def _load_columns(db: Session, student_ids: list[int]) -> dict | None:
+    rows = (
+        db.query(
+            TestSession.student_id, TestSession.id, TestSession.academic_year,
+            TestSession.time_of_year, TestSession.created_at, TestSession.subtest,
+            Score.id, Score.target, Score.raw_score, Score.risk_level,
+        )
+        .outerjoin(Score, and_(Score.test_session_id == TestSession.id, Score.sub_target.is_(None)))
+        .filter(TestSession.student_id.in_(student_ids), TestSession.is_complete == True)
+        .all()
+    )
+    if not rows:
+        return None
+
+    student_id, session_id, year, toy, created_at, subtest, score_id, target, raw_score, risk = zip(*rows)
+    students, student_idx = np.unique(np.array(student_id), return_inverse=True)
+    _, year_code = np.unique(np.array(year), return_inverse=True)
+    keys = [f"{s}_{t}" for s, t in zip(subtest, target)]
+    key_names, key_code = np.unique(np.array(keys), return_inverse=True)
+    _, subtest_code = np.unique(np.array(subtest), return_inverse=True)
+    risk = np.array(risk, dtype=object)
+
+    return {
+        "students": students,
+        "student": student_idx,
+        "session": np.array(session_id),
+        "year": year_code,
+        "toy": np.array([TOY_ORDER.get(t, 99) for t in toy]),
+        "subtest": subtest_code,
+        "created": np.array(created_at, dtype="datetime64[us]").astype(np.int64),
+        "has_score": np.array([s is not None for s in score_id]),
+        "score": np.array([s if s is not None else -1 for s in score_id]),
+        "key": key_code,
+        "key_names": key_names,
+        "raw": np.array(raw_score, dtype=float),
+        "high": risk == "high",
+        "moderate": risk == "moderate",
+        "benchmark": risk == "benchmark",
+        "rated": risk != None,  # noqa: E711 — elementwise test on an object array
+        "risk": risk,
+    }
+
+
+def _current_risk(cols: dict, n_students: int) -> tuple[np.ndarray, np.ndarray]:
+    """Latest session per student (newest created_at; on ties the first by subtest,
+    then id) and the majority-rule risk over its rated main scores."""
+    order = np.lexsort((-cols["session"], -cols["subtest"], cols["created"], cols["student"]))
+    _, ends = _group_bounds(cols["student"][order])
+    latest_session = np.empty(n_students, dtype=np.int64)
+    latest_session[cols["student"][order[ends - 1]]] = cols["session"][order[ends - 1]]
+    is_latest = cols["session"] == latest_session[cols["student"]]
+
+    rated = is_latest & cols["has_score"] & cols["rated"]
+    total = np.bincount(cols["student"][rated], minlength=n_students)
+    high = np.bincount(cols["student"][rated & cols["high"]], minlength=n_students)
+    moderate = np.bincount(cols["student"][rated & cols["moderate"]], minlength=n_students)
+
+    risk = np.where(
+        total == 0, "unknown",
+        np.where(high >= total * 0.5, "high",
+                 np.where(high + moderate >= total * 0.5, "moderate", "benchmark")),
+    )
+    return risk, is_latest
+
+
+def _trajectory_factors(cols: dict, n_students: int) -> tuple[np.ndarray, dict]:
+    """Flag students whose latest-year series dropped by DROP_THRESHOLD or escalated
+    to high risk. Returns (declining mask, student index -> contributing factors)."""
+    latest_year = np.full(n_students, -1)
+    np.maximum.at(latest_year, cols["student"], cols["year"])
+    rows = np.flatnonzero(cols["has_score"] & (cols["year"] == latest_year[cols["student"]]))
+
+    # Chronological position of every point (by time of year, then subtest name and
+    # session within it); a series is reported in the order its first point appears
+    chrono = rows[np.lexsort((
+        cols["score"][rows], cols["session"][rows], cols["subtest"][rows], cols["toy"][rows], cols["student"][rows],
+    ))]
+    position = np.empty(len(cols["student"]), dtype=np.int64)
+    position[chrono] = np.arange(len(chrono))
+
+    series = rows[np.lexsort((position[rows], cols["key"][rows], cols["student"][rows]))]
+    starts, ends = _group_bounds(cols["student"][series] * len(cols["key_names"]) + cols["key"][series])
+    last = series[ends - 1]
+    prev = series[np.maximum(ends - 2, starts)]
+    has_prev = ends - starts >= 2
+
+    prev_raw, last_raw = cols["raw"][prev], cols["raw"][last]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drop = (prev_raw - last_raw) / prev_raw
+    dropped = has_prev & (prev_raw > 0) & ~np.isnan(last_raw) & (drop >= DROP_THRESHOLD)
+    escalated = has_prev & cols["high"][last] & (cols["benchmark"][prev] | cols["moderate"][prev])
+    single_high = ~has_prev & cols["high"][last]
+
+    group_student = cols["student"][last]
+    declining = np.bincount(group_student[dropped | escalated], minlength=n_students) > 0
+
+    factors: dict[int, list[str]] = {}
+    flagged = np.flatnonzero((dropped | escalated | single_high) & declining[group_student])
+    flagged = flagged[np.lexsort((position[series[starts[flagged]]], group_student[flagged]))]
+    for g in flagged:
+        label = str(cols["key_names"][cols["key"][last[g]]]).replace("_", " ")
+        student_factors = factors.setdefault(int(group_student[g]), [])
+        if single_high[g]:
+            student_factors.append(f"High risk on {label}")
+        if dropped[g]:
+            student_factors.append(f"Declining {label} scores")
+        if escalated[g]:
+            student_factors.append(f"Risk escalated to high on {label}")
+    return declining, factors
+
+
+def _latest_scores(cols: dict, is_latest: np.ndarray, student: int) -> dict:
+    rows = np.flatnonzero(is_latest & cols["has_score"] & (cols["student"] == student))
+    rows = rows[np.argsort(cols["score"][rows], kind="stable")]
+    return {
+        str(cols["key_names"][cols["key"][i]]): {
+            "raw_score": None if np.isnan(cols["raw"][i]) else float(cols["raw"][i]),
+            "risk_level": cols["risk"][i],
+        }
+        for i in rows
+    }
+
+
+def _roster(db: Session, user_id: int) -> list[tuple[Student, bool]]:
+    """The user's My Students, each with whether it is on their watch list."""
+    return (
+        db.query(Student, student_watchlist.c.student_id.isnot(None))
+        .join(user_students, user_students.c.student_id == Student.id)
+        .outerjoin(
+            student_watchlist,
+            and_(student_watchlist.c.user_id == user_id, student_watchlist.c.student_id == Student.id),
+        )
+        .filter(user_students.c.user_id == user_id)
+        .all()
+    )
+
+
+def _entry(student: Student, watched: bool, probability: str, factors: list[str], current_risk: str,
+           latest_scores: dict, forecast: float | None) -> dict:
+    if forecast is not None and forecast >= FORECAST_THRESHOLD:
+        factors = factors + [f"Forecast {forecast:.0%} likely to be at risk at EOY"]
+    return {
+        "student_id": student.id,
+        "student_name": f"{student.last_name}, {student.first_name}",
+        "grade": student.grade,
+        "school": student.school,
+        "probability": probability,
+        "contributing_factors": factors,
+        "current_risk": current_risk,
+        "latest_scores": latest_scores,
+        "eoy_risk_probability": forecast,
+        "on_watchlist": watched,
+    }
+
+
+def find_at_risk_students(db: Session, user_id: int) -> list[dict]:
+    """The user's students with declining trajectories (or no assessments yet),
+    highest probability first, otherwise in roster order."""
+    roster = _roster(db, user_id)
+    if not roster:
+        return []
+
+    student_ids = [s.id for s, _ in roster]
+    cols = _load_columns(db, student_ids)
+    forecasts = dict(
+        db.query(RiskForecast.student_id, RiskForecast.probability)
+        .filter(RiskForecast.student_id.in_(student_ids))
+        .all()
+    )
+    index: dict[int, int] = {}
+    if cols is not None:
+        n_students = len(cols["students"])
+        index = {int(sid): i for i, sid in enumerate(cols["students"])}
+        current_risk, is_latest = _current_risk(cols, n_students)
+        declining, factors = _trajectory_factors(cols, n_students)
+
+    results = []
+    for student, watched in roster:
+        i = index.get(student.id)
+        if i is None:
+            results.append(_entry(student, watched, "medium", ["No recent assessment"], "unknown", {},
+                                  forecasts.get(student.id)))
+            continue
+        if not declining[i]:
+            continue
+
+        risk = str(current_risk[i])
+        if risk in ("moderate", "high"):
+            probability = "high"
+        elif risk == "benchmark":
+            probability = "medium"
+        else:
+            probability = "low"
+        results.append(_entry(student, watched, probability, factors.get(i, []), risk,
+                              _latest_scores(cols, is_latest, i), forecasts.get(student.id)))
+
+    results.sort(key=lambda r: PROBABILITY_ORDER.get(r["probability"], 3))
+    return results
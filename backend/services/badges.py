@@ -0,0 +1,166 @@
+"""
+Badge engine — evaluates badge criteria against per-student stats and awards in bulk.
+
+One grouped statement builds a stats row per student (completed assessments,
+perfect-score flag, risk on the first and last completed session, current
+streak); each criterion is a predicate over that row, so checking every badge
+costs the same single query for one student or a whole school. New awards go in
+with one executemany, ignoring pairs that were awarded concurrently.
+
+Award a school's badges from the backend directory with:
+
+    python -m services.badges --organization-id 1 [--school "Lincoln Elementary"]
+"""
+import datetime
+from typing import NamedTuple
+from sqlalchemy import Select, and_, case, func, select
+from sqlalchemy.orm import Session
+from database import insert_ignore
+from models import Badge, StudentBadge, ReadingStreak, Student, TestSession, Score
+
+AT_BENCHMARK = ("benchmark", "advanced")
+
+
+class StudentStats(NamedTuple):
+    assessments: int
+    perfect_score: bool
+    first_had_high: bool
+    last_at_benchmark: bool
+    current_streak: int
+
+
+BADGE_CRITERIA = {
+    "first_assessment": lambda s: s.assessments >= 1,
+    "five_assessments": lambda s: s.assessments >= 5,
+    "risk_reducer": lambda s: s.assessments >= 2 and s.first_had_high and s.last_at_benchmark,
+    "perfect_score": lambda s: s.perfect_score,
+    "streak_7": lambda s: s.current_streak >= 7,
+}
+
+
+def student_stats(db: Session, student_ids: Select) -> dict[int, StudentStats]:
+    """Stats for every student in `student_ids` (a select of Student.id), in one query."""
+    score_flags = (
+        select(
+            Score.test_session_id,
+            func.max(case((Score.risk_level == "high", 1), else_=0)).label("high"),
+            func.max(case((Score.risk_level.in_(AT_BENCHMARK), 1), else_=0)).label("benchmark"),
+            func.max(case(
+                (and_(Score.max_score.isnot(None), Score.max_score > 0, Score.raw_score == Score.max_score), 1),
+                else_=0,
+            )).label("perfect"),
+        )
+        .join(TestSession, TestSession.id == Score.test_session_id)
+        .where(TestSession.student_id.in_(student_ids))
+        .group_by(Score.test_session_id)
+        .subquery()
+    )
+    # Completed sessions are ranked from both ends by completion time; the perfect
+    # score flag counts any session, complete or not
+    window = (TestSession.student_id, TestSession.is_complete)
+    sessions = (
+        select(
+            TestSession.student_id,
+            TestSession.is_complete,
+            func.row_number().over(
+                partition_by=window, order_by=(TestSession.completed_at, TestSession.id)
+            ).label("from_first"),
+            func.row_number().over(
+                partition_by=window, order_by=(TestSession.completed_at.desc(), TestSession.id.desc())
+            ).label("from_last"),
+            score_flags.c.high,
+            score_flags.c.benchmark,
+            score_flags.c.perfect,
+        )
+        .outerjoin(score_flags, score_flags.c.test_session_id == TestSession.id)
+        .where(TestSession.student_id.in_(student_ids))
+        .subquery()
+    )
+    complete = sessions.c.is_complete == True
+    per_student = (
+        select(
+            sessions.c.student_id,
+            func.sum(case((complete, 1), else_=0)).label("assessments"),
+            func.max(func.coalesce(sessions.c.perfect, 0)).label("perfect"),
+            func.max(case((and_(complete, sessions.c.from_first == 1), sessions.c.high), else_=0)).label("first_high"),
+            func.max(case((and_(complete, sessions.c.from_last == 1), sessions.c.benchmark), else_=0)).label("last_benchmark"),
+        )
+        .group_by(sessions.c.student_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Student.id,
+            per_student.c.assessments,
+            per_student.c.perfect,
+            per_student.c.first_high,
+            per_student.c.last_benchmark,
+            ReadingStreak.current_streak,
+        )
+        .outerjoin(per_student, per_student.c.student_id == Student.id)
+        .outerjoin(ReadingStreak, ReadingStreak.student_id == Student.id)
+        .where(Student.id.in_(student_ids))
+    )
+    return {
+        sid: StudentStats(
+            assessments=assessments or 0,
+            perfect_score=bool(perfect),
+            first_had_high=bool(first_high),
+            last_at_benchmark=bool(last_benchmark),
+            current_streak=streak or 0,
+        )
+        for sid, assessments, perfect, first_high, last_benchmark, streak in rows
+    }
+
+
+def award_badges(db: Session, student_ids: Select) -> dict[int, list[Badge]]:
+    """Award every badge the students now qualify for and haven't earned.
+    Returns the new badges per student. The caller commits."""
+    badges = [b for b in db.query(Badge).order_by(Badge.id) if b.criteria in BADGE_CRITERIA]
+    stats = student_stats(db, student_ids)
+    earned = set(
+        db.query(StudentBadge.student_id, StudentBadge.badge_id)
+        .filter(StudentBadge.student_id.in_(student_ids))
+    )
+
+    awarded: dict[int, list[Badge]] = {}
+    for student_id, student in stats.items():
+        for badge in badges:
+            if (student_id, badge.id) not in earned and BADGE_CRITERIA[badge.criteria](student):
+                awarded.setdefault(student_id, []).append(badge)
+
+    now = datetime.datetime.utcnow()
+    rows = [
+        {"student_id": student_id, "badge_id": badge.id, "earned_at": now}
+        for student_id, new in awarded.items()
+        for badge in new
+    ]
+    if rows:
+        db.execute(insert_ignore(StudentBadge.__table__), rows)
+    return awarded
+
+
+def school_students(organization_id: int, school: str | None = None) -> Select:
+    q = select(Student.id).where(Student.organization_id == organization_id)
+    if school is not None:
+        q = q.where(Student.school == school)
+    return q
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, engine, Base
+
+    parser = argparse.ArgumentParser(description="Award badges for a whole school or organization.")
+    parser.add_argument("--organization-id", type=int, required=True)
+    parser.add_argument("--school", help="limit to one school (default: every school in the organization)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        awarded = award_badges(db, school_students(args.organization_id, args.school))
+        db.commit()
+    finally:
+        db.close()
+    print(f"Awarded {sum(len(b) for b in awarded.values())} badges to {len(awarded)} students.")
@@ -0,0 +1,151 @@
+"""
+Intervention catalog — the intervention library held in memory and indexed for lookup.
+
+The library is small and read on every pathway generation and library search, so
+it is loaded once per process and serialized up front. Grades are compared by
+position in GRADE_LEVELS (K < 1 < … < 8), never as strings, and each
+intervention is filed under every grade its range covers, per skill area, so
+looking up (skill, grade) is a dict hit returning just the matches, already in
+title order.
+
+ORM inserts, updates and deletes of interventions drop the catalog when their
+transaction commits; the next read reloads it. Writes made by other processes
+are caught by a fingerprint of the table (row count and highest id) that each
+read checks before serving the catalog, and in-place edits elsewhere, which the
+fingerprint can't see, by reloading at least every CATALOG_TTL seconds. Its
+`etag` is a digest of the content, so it agrees across workers and restarts.
+"""
+import hashlib
+import json
+import threading
+import time
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+from database import SessionLocal
+from models import Intervention
+
+# Grades the library is written for; any other grade (PreK, high school) matches
+# every intervention rather than none
+GRADE_LEVELS = ("K", "1", "2", "3", "4", "5", "6", "7", "8")
+
+_GRADE_RANK = {g: i for i, g in enumerate(GRADE_LEVELS)}
+
+_CHANGED_KEY = "interventions_changed"
+
+# Longest a catalog is served without reloading, for edits made by other processes
+CATALOG_TTL = 300
+
+
+def grade_rank(grade: str | None) -> int | None:
+    """Position of a grade in GRADE_LEVELS, or None if it isn't one."""
+    return _GRADE_RANK.get(grade.strip()) if grade else None
+
+
+def serialize(i: Intervention) -> dict:
+    return {
+        "id": i.id,
+        "title": i.title,
+        "description": i.description,
+        "skill_area": i.skill_area,
+        "grade_min": i.grade_min,
+        "grade_max": i.grade_max,
+        "duration_minutes": i.duration_minutes,
+        "materials": i.materials,
+        "evidence_level": i.evidence_level,
+        "instructions": i.instructions,
+    }
+
+
+class InterventionCatalog:
+    """Serialized interventions bucketed by skill area and by grade."""
+
+    def __init__(self, interventions: list[dict], fingerprint: tuple = ()):
+        self.fingerprint = fingerprint
+        self.loaded_at = time.monotonic()
+        self.all = sorted(interventions, key=lambda i: (i["title"], i["id"]))
+        self.by_id = {i["id"]: i for i in self.all}
+        self._by_skill: dict[str, list[dict]] = {}
+        self._by_grade: dict[int, list[dict]] = {}
+        self._by_skill_grade: dict[tuple[str, int], list[dict]] = {}
+        for i in self.all:
+            self._by_skill.setdefault(i["skill_area"], []).append(i)
+            # A bound that isn't a known grade makes the intervention match every grade
+            low = grade_rank(i["grade_min"])
+            high = grade_rank(i["grade_max"])
+            if low is None or high is None:
+                low, high = 0, len(GRADE_LEVELS) - 1
+            for rank in range(low, high + 1):
+                self._by_grade.setdefault(rank, []).append(i)
+                self._by_skill_grade.setdefault((i["skill_area"], rank), []).append(i)
+        self.etag = hashlib.sha1(json.dumps(self.all, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def find(self, skill_area: str | None = None, grade: str | None = None) -> list[dict]:
+        """Interventions for a skill area and/or grade, in title order. A grade that
+        isn't in GRADE_LEVELS doesn't narrow the result."""
+        rank = grade_rank(grade)
+        if skill_area and rank is not None:
+            return self._by_skill_grade.get((skill_area, rank), [])
+        if skill_area:
+            return self._by_skill.get(skill_area, [])
+        if rank is not None:
+            return self._by_grade.get(rank, [])
+        return self.all
+
+
+_catalog: InterventionCatalog | None = None
+# Bumped by every invalidation, so a load that overlapped one isn't kept
+_generation = 0
+_lock = threading.Lock()
+
+
+def _fingerprint(db: Session) -> tuple:
+    return tuple(db.execute(select(func.count(Intervention.id), func.max(Intervention.id))).one())
+
+
+def get_catalog(db: Session) -> InterventionCatalog:
+    """The catalog, reloaded through `db` if it is missing, expired, or doesn't
+    match the table as `db` sees it."""
+    global _catalog
+    fingerprint = _fingerprint(db)
+    catalog = _catalog
+    if (
+        catalog is not None
+        and catalog.fingerprint == fingerprint
+        and time.monotonic() - catalog.loaded_at < CATALOG_TTL
+    ):
+        return catalog
+    with _lock:
+        generation = _generation
+    catalog = InterventionCatalog([serialize(i) for i in db.query(Intervention)], fingerprint)
+    with _lock:
+        # Don't cache a load that raced a commit: it may predate the change
+        if generation == _generation:
+            _catalog = catalog
+    return catalog
+
+
+def invalidate() -> None:
+    global _catalog, _generation
+    with _lock:
+        _generation += 1
+        _catalog = None
+
+
+@event.listens_for(Intervention, "after_insert")
+@event.listens_for(Intervention, "after_update")
+@event.listens_for(Intervention, "after_delete")
+def _mark_changed(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_on_commit(db: Session) -> None:
+    if db.info.pop(_CHANGED_KEY, False):
+        invalidate()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_changes(db: Session) -> None:
+    db.info.pop(_CHANGED_KEY, None)
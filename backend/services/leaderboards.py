@@ -0,0 +1,154 @@
+"""
+Leaderboards — reading streak rankings per school and per class group.
+
+`leaderboard_entries` holds one row per (scope, active student) carrying the
+student's current and longest streak, indexed on (scope, current_streak,
+longest_streak, student_id). Reading the top k of a school or group walks that
+index from its end, so it costs O(k) however large the school is; nothing is
+sorted at request time.
+
+The table is kept current incrementally:
+
+  streak changes     `update_streaks` rewrites the student's rows in every scope
+  roster changes     `sync_students` / `sync_organization` re-derive a student's
+                     scopes after edits, status changes, imports and group moves
+  group deletion     `drop_group`
+
+`ensure_leaderboards` fills the table on startup the first time it is empty.
+Entries are unique per (scope, student), and the fill skips any that already
+exist, so workers starting together can't duplicate rows.
+"""
+from sqlalchemy import String, bindparam, cast, func, literal, select, union_all, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from database import begin_immediate, insert_ignore
+from models import LeaderboardEntry, ReadingStreak, Student, StudentStatus, group_students
+
+DEFAULT_LIMIT = 10
+
+
+def school_scope(organization_id: int, school: str) -> str:
+    return f"school:{organization_id}:{school}"
+
+
+def group_scope(group_id: int) -> str:
+    return f"group:{group_id}"
+
+
+def _entries(*criteria):
+    """SELECT (scope, student_id, current_streak, longest_streak) for every scope
+    of the active students matching `criteria`."""
+    current = func.coalesce(ReadingStreak.current_streak, 0)
+    longest = func.coalesce(ReadingStreak.longest_streak, 0)
+    active = (Student.status == StudentStatus.ACTIVE, *criteria)
+    schools = (
+        select(
+            literal("school:") + cast(Student.organization_id, String) + literal(":") + Student.school,
+            Student.id, current, longest,
+        )
+        .outerjoin(ReadingStreak, ReadingStreak.student_id == Student.id)
+        .where(Student.school.isnot(None), *active)
+    )
+    groups = (
+        select(
+            literal("group:") + cast(group_students.c.group_id, String),
+            Student.id, current, longest,
+        )
+        .join(group_students, group_students.c.student_id == Student.id)
+        .outerjoin(ReadingStreak, ReadingStreak.student_id == Student.id)
+        .where(*active)
+    )
+    return union_all(schools, groups)
+
+
+_COLUMNS = ["scope", "student_id", "current_streak", "longest_streak"]
+
+
+def sync_students(db: Session, student_ids: list[int]) -> None:
+    """Re-derive these students' entries after a roster, status or group change.
+    The caller commits."""
+    if not student_ids:
+        return
+    table = LeaderboardEntry.__table__
+    db.execute(table.delete().where(table.c.student_id.in_(student_ids)))
+    db.execute(table.insert().from_select(_COLUMNS, _entries(Student.id.in_(student_ids))))
+
+
+def sync_organization(db: Session, organization_id: int) -> None:
+    """`sync_students` for a whole organization (roster imports). The caller commits."""
+    table = LeaderboardEntry.__table__
+    students = select(Student.id).where(Student.organization_id == organization_id)
+    db.execute(table.delete().where(table.c.student_id.in_(students)))
+    db.execute(table.insert().from_select(_COLUMNS, _entries(Student.organization_id == organization_id)))
+
+
+def drop_group(db: Session, group_id: int) -> None:
+    """The caller commits."""
+    table = LeaderboardEntry.__table__
+    db.execute(table.delete().where(table.c.scope == group_scope(group_id)))
+
+
+def update_streaks(db: Session, streaks: dict[int, tuple[int, int]]) -> None:
+    """Apply {student_id: (current_streak, longest_streak)} to every scope the
+    students rank in, as one executemany. The caller commits."""
+    if not streaks:
+        return
+    table = LeaderboardEntry.__table__
+    db.execute(
+        update(table)
+        .where(table.c.student_id == bindparam("sid"))
+        .values(current_streak=bindparam("current"), longest_streak=bindparam("longest")),
+        [{"sid": sid, "current": current, "longest": longest} for sid, (current, longest) in streaks.items()],
+    )
+
+
+def rebuild(db: Session) -> None:
+    """Recompute every entry from scratch. The caller commits."""
+    table = LeaderboardEntry.__table__
+    db.execute(table.delete())
+    db.execute(table.insert().from_select(_COLUMNS, _entries()))
+
+
+def ensure_leaderboards(engine: Engine) -> None:
+    """Fill the entries table on first start against an existing database."""
+    table = LeaderboardEntry.__table__
+    with begin_immediate(engine) as conn:
+        if conn.execute(select(table.c.id).limit(1)).first() is None:
+            conn.execute(insert_ignore(table).from_select(_COLUMNS, _entries()))
+
+
+def top(db: Session, scope: str, limit: int = DEFAULT_LIMIT) -> list[dict]:
+    """The scope's top `limit` students with a running streak, best first. Students
+    level on current streak share a rank."""
+    rows = db.execute(
+        select(
+            LeaderboardEntry.student_id,
+            LeaderboardEntry.current_streak,
+            LeaderboardEntry.longest_streak,
+            Student.first_name,
+            Student.last_name,
+            Student.grade,
+        )
+        .join(Student, Student.id == LeaderboardEntry.student_id)
+        .where(LeaderboardEntry.scope == scope, LeaderboardEntry.current_streak > 0)
+        .order_by(
+            LeaderboardEntry.current_streak.desc(),
+            LeaderboardEntry.longest_streak.desc(),
+            LeaderboardEntry.student_id.desc(),
+        )
+        .limit(limit)
+    ).all()
+
+    board = []
+    for position, row in enumerate(rows, start=1):
+        tied = board and board[-1]["current_streak"] == row.current_streak
+        board.append({
+            "rank": board[-1]["rank"] if tied else position,
+            "student_id": row.student_id,
+            "first_name": row.first_name,
+            "last_name": row.last_name,
+            "grade": row.grade,
+            "current_streak": row.current_streak,
+            "longest_streak": row.longest_streak,
+        })
+    return board
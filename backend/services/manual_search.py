@@ -0,0 +1,251 @@
+"""
+CUBED-3 manual search — BM25 over paragraph-sized chunks of the manual text.
+
+The index is built once from CUBED-3-Manual-full-text.txt and written to a
+single binary file that is memory-mapped at load time, so workers share the
+page cache and a query only touches the postings of its own terms:
+
+    header   magic, doc count, term count, average chunk length
+    docs     chunk lengths (u32), pages (u32), text offsets (u32) + UTF-8 text
+    terms    sorted term offsets (u32) + concatenated UTF-8 terms
+    postings per-term offsets (u32), then doc ids (u32) and term frequencies (u16)
+
+Rebuild it with `python -m services.manual_search`; it is also rebuilt on first
+use whenever the manual is newer than the index.
+"""
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from bisect import bisect_left
+import numpy as np
+
+MANUAL_PATH = os.environ.get(
+    "MANUAL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "CUBED-3-Manual-full-text.txt"),
+)
+MANUAL_INDEX_PATH = os.environ.get("MANUAL_INDEX_PATH", "manual_index.bin")
+
+MAGIC = b"CUBEDIX1"
+_HEADER = struct.Struct("<8sIIf")
+
+K1 = 1.2
+B = 0.75
+
+# Chunking: close a chunk at a sentence end once it has MIN_WORDS, or anywhere at MAX_WORDS
+MIN_WORDS = 60
+MAX_WORDS = 180
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the "
+    "this to was were what when which who will with does do say says about".split()
+)
+
+_PAGE_BREAK = re.compile(r"^=+\nPAGE (\d+)\n=+\n", re.M)
+_FOOTER = re.compile(r"^CUBED-3 MANUAL \|.*$", re.M)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens without stopwords, with a light plural strip so
+    "scores" matches "score"."""
+    tokens = []
+    for token in re.findall(r"\w+", text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def chunk_manual(text: str) -> list[tuple[int, str]]:
+    """Split the manual into (page, passage) chunks of roughly paragraph size."""
+    parts = _PAGE_BREAK.split(text)
+    chunks = []
+    # parts = [preamble, page_no, page_text, page_no, page_text, ...]
+    for page_no, page_text in zip(parts[1::2], parts[2::2]):
+        current: list[str] = []
+        for line in _FOOTER.sub("", page_text).splitlines():
+            words = line.split()
+            # Extracted tables can produce a single line of thousands of words
+            for start in range(0, len(words), MAX_WORDS):
+                piece = words[start:start + MAX_WORDS]
+                current.extend(piece)
+                if (len(current) >= MIN_WORDS and piece[-1][-1] in ".!?:") or len(current) >= MAX_WORDS:
+                    chunks.append((int(page_no), " ".join(current)))
+                    current = []
+        if current:
+            chunks.append((int(page_no), " ".join(current)))
+    return chunks
+
+
+def build_index(manual_path: str = MANUAL_PATH, index_path: str = MANUAL_INDEX_PATH) -> int:
+    """Chunk, tokenize and write the index file. Returns the number of chunks."""
+    with open(manual_path, encoding="utf-8") as f:
+        chunks = chunk_manual(f.read())
+
+    postings: dict[str, dict[int, int]] = {}
+    lengths = []
+    for doc_id, (_, passage) in enumerate(chunks):
+        tokens = tokenize(passage)
+        lengths.append(len(tokens))
+        for token in tokens:
+            freqs = postings.setdefault(token, {})
+            freqs[doc_id] = freqs.get(doc_id, 0) + 1
+
+    terms = sorted(postings)
+    term_blob = "".join(terms).encode("utf-8")
+    term_offsets = np.zeros(len(terms) + 1, dtype="<u4")
+    term_offsets[1:] = np.cumsum([len(t.encode("utf-8")) for t in terms])
+
+    posting_offsets = np.zeros(len(terms) + 1, dtype="<u4")
+    posting_offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+    doc_ids = np.fromiter((d for t in terms for d in postings[t]), dtype="<u4", count=int(posting_offsets[-1]))
+    tfs = np.fromiter(
+        (min(f, 65535) for t in terms for f in postings[t].values()), dtype="<u2", count=int(posting_offsets[-1])
+    )
+
+    texts = [passage.encode("utf-8") for _, passage in chunks]
+    text_offsets = np.zeros(len(chunks) + 1, dtype="<u4")
+    text_offsets[1:] = np.cumsum([len(t) for t in texts])
+
+    sections = [
+        np.array(lengths, dtype="<u4").tobytes(),
+        np.array([page for page, _ in chunks], dtype="<u4").tobytes(),
+        text_offsets.tobytes(),
+        b"".join(texts),
+        term_offsets.tobytes(),
+        term_blob,
+        posting_offsets.tobytes(),
+        doc_ids.tobytes(),
+        tfs.tobytes(),
+    ]
+    avgdl = float(np.mean(lengths)) if lengths else 0.0
+
+    # Write to a file of our own then rename, so a worker never maps a half-written
+    # file and two workers building at once don't write into each other's
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=os.path.dirname(os.path.abspath(index_path)),
+        prefix=os.path.basename(index_path) + ".", suffix=".tmp", delete=False,
+    ) as f:
+        tmp = f.name
+        try:
+            f.write(_HEADER.pack(MAGIC, len(chunks), len(terms), avgdl))
+            for section in sections:
+                f.write(struct.pack("<Q", len(section)))
+                f.write(section)
+        except BaseException:
+            f.close()
+            os.unlink(tmp)
+            raise
+    os.replace(tmp, index_path)
+    return len(chunks)
+
+
+class _Terms:
+    """Sorted term list read straight from the mapped file, for bisect."""
+
+    def __init__(self, blob: memoryview, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+
+class ManualIndex:
+    """Read-only BM25 index over a memory-mapped index file."""
+
+    def __init__(self, path: str = MANUAL_INDEX_PATH):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, self.n_docs, n_terms, self.avgdl = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a manual index")
+
+        sections = []
+        pos = _HEADER.size
+        for _ in range(9):
+            (size,) = struct.unpack_from("<Q", buf, pos)
+            sections.append(buf[pos + 8:pos + 8 + size])
+            pos += 8 + size
+        lengths, pages, text_offsets, self._texts, term_offsets, term_blob, posting_offsets, doc_ids, tfs = sections
+
+        self.lengths = np.frombuffer(lengths, dtype="<u4")
+        self.pages = np.frombuffer(pages, dtype="<u4")
+        self._text_offsets = np.frombuffer(text_offsets, dtype="<u4")
+        self._terms = _Terms(term_blob, np.frombuffer(term_offsets, dtype="<u4"))
+        self._posting_offsets = np.frombuffer(posting_offsets, dtype="<u4")
+        self._doc_ids = np.frombuffer(doc_ids, dtype="<u4")
+        self._tfs = np.frombuffer(tfs, dtype="<u2")
+        self.mtime = os.path.getmtime(path)
+
+    def _postings(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        key = term.encode("utf-8")
+        i = bisect_left(self._terms, key)
+        if i == len(self._terms) or self._terms[i] != key:
+            return None
+        start, end = self._posting_offsets[i], self._posting_offsets[i + 1]
+        return self._doc_ids[start:end], self._tfs[start:end]
+
+    def passage(self, doc_id: int) -> str:
+        return bytes(self._texts[self._text_offsets[doc_id]:self._text_offsets[doc_id + 1]]).decode("utf-8")
+
+    def search(self, query: str, limit: int = 5) -> list[dict]:
+        scores = np.zeros(self.n_docs)
+        norm = K1 * (1 - B + B * self.lengths / (self.avgdl or 1))
+        for term in set(tokenize(query)):
+            found = self._postings(term)
+            if found is None:
+                continue
+            doc_ids, tfs = found
+            idf = np.log(1 + (self.n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            tf = tfs.astype(float)
+            scores[doc_ids] += idf * tf * (K1 + 1) / (tf + norm[doc_ids])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        top = matched[np.argsort(-scores[matched], kind="stable")[:limit]]
+        return [
+            {"page": int(self.pages[d]), "score": round(float(scores[d]), 3), "text": self.passage(int(d))}
+            for d in top
+        ]
+
+
+_index: ManualIndex | None = None
+# One build at a time per process; concurrent requests wait for it and reuse the file
+_build_lock = threading.Lock()
+
+
+def _index_is_stale() -> bool:
+    if not os.path.exists(MANUAL_PATH):
+        return False
+    return not os.path.exists(MANUAL_INDEX_PATH) or os.path.getmtime(MANUAL_INDEX_PATH) < os.path.getmtime(MANUAL_PATH)
+
+
+def get_manual_index() -> ManualIndex | None:
+    """The shared index, building or rebuilding the file when the manual is newer.
+    None when neither the manual nor a prebuilt index is available."""
+    global _index
+    if _index_is_stale():
+        with _build_lock:
+            if _index_is_stale():
+                build_index()
+                _index = None
+    if not os.path.exists(MANUAL_INDEX_PATH):
+        return None
+    with _build_lock:
+        if _index is None or _index.mtime != os.path.getmtime(MANUAL_INDEX_PATH):
+            _index = ManualIndex()
+        return _index
+
+
+if __name__ == "__main__":
+    print(f"Indexed {build_index()} manual passages into {MANUAL_INDEX_PATH}.")
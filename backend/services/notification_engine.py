@@ -0,0 +1,225 @@
+"""
+Notification engine — scheduled untested, benchmark-deadline and weekly digest alerts.
+
+Run daily (e.g. from cron) from the backend directory; digests go out on Mondays
+or whenever `--digest` is passed:
+
+    python -m services.notification_engine [--digest] [--date YYYY-MM-DD]
+
+Every rule is a grouped query over all users at once (untested students per
+examiner, recipients of a closing window, weekly completions per teacher), so a
+run costs a handful of statements however many users there are. New rows go in
+through one executemany via `notify_bulk`.
+
+A user holds at most one unread notification per generated type: when one is
+already waiting, its message is refreshed in place (via `refresh`, which also
+pushes the new text to open streams) instead of stacking another.
+"""
+import datetime
+from sqlalchemy import distinct, exists, func
+from sqlalchemy.orm import Session
+from models import (
+    User, UserRole, Student, StudentStatus, TestSession, Score, Notification, user_students,
+)
+from services.notifications import notify_bulk, refresh
+
+# (time_of_year, opens (month, day), closes (month, day)); months from August
+# onwards fall in the first calendar year of the academic year
+BENCHMARK_WINDOWS = (
+    ("BOY", (8, 1), (10, 31)),
+    ("MOY", (12, 1), (2, 28)),
+    ("EOY", (4, 1), (6, 15)),
+)
+
+DEADLINE_NOTICE_DAYS = 14
+
+DIGEST_WEEKDAY = 0  # Monday
+
+FLAGGED_RISK_LEVELS = ("moderate", "high")
+
+GENERATED_TYPES = ("untested", "benchmark_deadline", "digest")
+
+
+def _plural(n: int, word: str) -> str:
+    return f"{n} {word}" if n == 1 else f"{n} {word}s"
+
+
+def open_window(today: datetime.date) -> tuple[str, str, datetime.date] | None:
+    """(academic_year, time_of_year, closing date) of the window open on `today`."""
+    first_year = today.year if today.month >= 8 else today.year - 1
+    academic_year = f"{first_year}-{first_year + 1}"
+    for toy, opens, closes in BENCHMARK_WINDOWS:
+        start = datetime.date(first_year if opens[0] >= 8 else first_year + 1, *opens)
+        end = datetime.date(first_year if closes[0] >= 8 else first_year + 1, *closes)
+        if start <= today <= end:
+            return academic_year, toy, end
+    return None
+
+
+def _untested(db: Session, academic_year: str, toy: str) -> list[dict]:
+    """One row per examiner with active assigned students not yet assessed this window."""
+    tested = exists().where(
+        TestSession.student_id == user_students.c.student_id,
+        TestSession.academic_year == academic_year,
+        TestSession.time_of_year == toy,
+        TestSession.is_complete == True,
+    )
+    counts = (
+        db.query(user_students.c.user_id, func.count())
+        .join(User, User.id == user_students.c.user_id)
+        .join(Student, Student.id == user_students.c.student_id)
+        .filter(
+            User.is_active == True,
+            User.role != UserRole.PARENT,
+            Student.status == StudentStatus.ACTIVE,
+            ~tested,
+        )
+        .group_by(user_students.c.user_id)
+    )
+    return [
+        {
+            "user_id": user_id,
+            "type": "untested",
+            "title": "Students Need Assessment",
+            "message": f"You have {_plural(n, 'student')} who haven't been assessed in the {toy} window.",
+            "link": "/students",
+        }
+        for user_id, n in counts
+    ]
+
+
+def _deadlines(db: Session, toy: str, days_left: int) -> list[dict]:
+    message = (
+        f"The {toy} benchmark window closes today."
+        if days_left == 0 else
+        f"The {toy} benchmark window closes in {_plural(days_left, 'day')}."
+    )
+    recipients = db.query(User.id).filter(User.is_active == True, User.role != UserRole.PARENT)
+    return [
+        {
+            "user_id": user_id,
+            "type": "benchmark_deadline",
+            "title": "Benchmark Window Closing",
+            "message": message,
+            "link": "/assess",
+        }
+        for (user_id,) in recipients
+    ]
+
+
+def _digests(db: Session, today: datetime.date) -> list[dict]:
+    """Completions and flagged students over the seven days before `today`, across
+    each teacher's assigned students."""
+    until = datetime.datetime.combine(today, datetime.time())
+    since = until - datetime.timedelta(days=7)
+    week = (
+        db.query(user_students.c.user_id, TestSession.id, TestSession.student_id)
+        .join(TestSession, TestSession.student_id == user_students.c.student_id)
+        .join(User, User.id == user_students.c.user_id)
+        .filter(
+            User.is_active == True,
+            User.role != UserRole.PARENT,
+            TestSession.is_complete == True,
+            TestSession.completed_at >= since,
+            TestSession.completed_at < until,
+        )
+        .subquery()
+    )
+    completed = dict(db.query(week.c.user_id, func.count()).group_by(week.c.user_id))
+    flagged = dict(
+        db.query(week.c.user_id, func.count(distinct(week.c.student_id)))
+        .join(Score, Score.test_session_id == week.c.id)
+        .filter(Score.sub_target.is_(None), Score.risk_level.in_(FLAGGED_RISK_LEVELS))
+        .group_by(week.c.user_id)
+    )
+    return [
+        {
+            "user_id": user_id,
+            "type": "digest",
+            "title": "Weekly Summary",
+            "message": (
+                f"This week: {_plural(n, 'assessment')} completed, "
+                f"{_plural(flagged.get(user_id, 0), 'student')} flagged."
+            ),
+            "link": "/reports",
+        }
+        for user_id, n in completed.items()
+    ]
+
+
+def _dedupe(db: Session, rows: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Split rows into new notifications and refreshes of an unread one of the same
+    type. Applies the refreshes; returns (rows to insert, refreshed rows)."""
+    types = {r["type"] for r in rows}
+    # Keyed on title too, so a weekly summary never overwrites a compacted digest
+    unread = {
+        (user_id, ntype, title): (nid, message)
+        for user_id, ntype, title, nid, message in (
+            db.query(Notification.user_id, Notification.type, Notification.title, Notification.id, Notification.message)
+            .filter(Notification.is_read == False, Notification.type.in_(types))
+            .order_by(Notification.id)
+        )
+    }  # latest unread per (user, type, title) wins
+
+    new_rows, refreshed, messages = [], [], {}
+    for row in rows:
+        waiting = unread.get((row["user_id"], row["type"], row["title"]))
+        if waiting is None:
+            new_rows.append(row)
+        elif waiting[1] != row["message"]:
+            refreshed.append(row)
+            messages[waiting[0]] = row["message"]
+    refresh(db, messages)
+    return new_rows, refreshed
+
+
+def generate_notifications(
+    db: Session,
+    today: datetime.date | None = None,
+    digest: bool | None = None,
+) -> dict:
+    """Run every rule for `today` and commit. Returns created/refreshed counts per type."""
+    today = today or datetime.date.today()
+    if digest is None:
+        digest = today.weekday() == DIGEST_WEEKDAY
+
+    rows: list[dict] = []
+    window = open_window(today)
+    if window is not None:
+        academic_year, toy, closes = window
+        rows += _untested(db, academic_year, toy)
+        days_left = (closes - today).days
+        if days_left <= DEADLINE_NOTICE_DAYS:
+            rows += _deadlines(db, toy, days_left)
+    if digest:
+        rows += _digests(db, today)
+
+    new_rows, refreshed = _dedupe(db, rows)
+    notify_bulk(db, new_rows)
+    db.commit()
+
+    summary = {t: {"created": 0, "refreshed": 0} for t in GENERATED_TYPES}
+    for row in new_rows:
+        summary[row["type"]]["created"] += 1
+    for row in refreshed:
+        summary[row["type"]]["refreshed"] += 1
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, engine, Base
+
+    parser = argparse.ArgumentParser(description="Generate untested, deadline and digest notifications.")
+    parser.add_argument("--digest", action="store_true", help="send weekly digests regardless of the weekday")
+    parser.add_argument("--date", type=datetime.date.fromisoformat, help="run as of this date (default today)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        summary = generate_notifications(db, today=args.date, digest=args.digest or None)
+    finally:
+        db.close()
+    for ntype, counts in summary.items():
+        print(f"{ntype}: {counts['created']} created, {counts['refreshed']} refreshed")
@@ -0,0 +1,125 @@
+"""
+Notification retention — keeps the notifications table from growing forever.
+
+Run daily (e.g. from cron, after the notification engine) from the backend directory:
+
+    python -m services.notification_retention [--days 90] [--batch-size 1000]
+
+Two passes, each in bounded batches committed separately so no run holds a long
+write transaction:
+
+  compaction  a user's unread notifications of one type, once there are
+              COLLAPSE_MIN or more, are replaced by a single `digest` row that
+              quotes the latest few
+  retention   read notifications older than the retention period are deleted,
+              walking the table in id order
+
+Deletes go through `delete_notifications`, so unread counters stay exact.
+"""
+import datetime
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+from models import Notification
+from services.notifications import delete_notifications, notify_bulk
+
+RETENTION_DAYS = 90
+
+BATCH_SIZE = 1000
+
+# Unread notifications of one type a user must have before they are collapsed
+COLLAPSE_MIN = 5
+
+# Messages quoted in a collapsed digest
+DIGEST_QUOTES = 3
+
+
+def _digest_row(user_id: int, group: list) -> dict:
+    """One digest notification standing in for a user's unread group, newest first."""
+    latest = group[0]
+    quoted = " ".join(n.message for n in group[:DIGEST_QUOTES])
+    more = len(group) - DIGEST_QUOTES
+    links = {n.link for n in group}
+    return {
+        "user_id": user_id,
+        "type": "digest",
+        "title": f"{latest.title} ({len(group)})",
+        "message": quoted + (f" And {more} more." if more > 0 else ""),
+        "link": links.pop() if len(links) == 1 else None,
+    }
+
+
+def collapse_repeated(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """Collapse each user's repeated unread notifications of one type into a digest.
+    Returns the number of notifications removed."""
+    groups = (
+        db.query(Notification.user_id, Notification.type)
+        .filter(Notification.is_read == False, Notification.type != "digest")
+        .group_by(Notification.user_id, Notification.type)
+        .having(func.count() >= COLLAPSE_MIN)
+        .order_by(Notification.user_id, Notification.type)
+        .all()
+    )
+    removed = 0
+    # Commit every batch_size // COLLAPSE_MIN groups
+    start = 0
+    while start < len(groups):
+        keys = groups[start:start + max(1, batch_size // COLLAPSE_MIN)]
+        start += len(keys)
+        rows = (
+            db.query(Notification.id, Notification.user_id, Notification.type, Notification.title,
+                     Notification.message, Notification.link)
+            .filter(
+                Notification.is_read == False,
+                tuple_(Notification.user_id, Notification.type).in_([tuple(k) for k in keys]),
+            )
+            .order_by(Notification.user_id, Notification.type, Notification.id.desc())
+            .all()
+        )
+        by_group: dict[tuple, list] = {}
+        for row in rows:
+            by_group.setdefault((row.user_id, row.type), []).append(row)
+
+        removed += delete_notifications(db, [row.id for row in rows])
+        notify_bulk(db, [_digest_row(user_id, group) for (user_id, _), group in by_group.items()])
+        db.commit()
+    return removed
+
+
+def purge_read(db: Session, days: int = RETENTION_DAYS, batch_size: int = BATCH_SIZE) -> int:
+    """Delete read notifications created more than `days` ago. Returns the count."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    purged = 0
+    last_id = 0
+    while True:
+        ids = [
+            nid for (nid,) in
+            db.query(Notification.id)
+            .filter(Notification.id > last_id, Notification.is_read == True, Notification.created_at < cutoff)
+            .order_by(Notification.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            return purged
+        purged += delete_notifications(db, ids)
+        db.commit()
+        last_id = ids[-1]
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, engine, Base
+
+    parser = argparse.ArgumentParser(description="Compact and purge notifications.")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="keep read notifications this many days")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        collapsed = collapse_repeated(db, args.batch_size)
+        purged = purge_read(db, args.days, args.batch_size)
+    finally:
+        db.close()
+    print(f"Collapsed {collapsed} repeated notifications into digests.")
+    print(f"Purged {purged} read notifications older than {args.days} days.")
@@ -0,0 +1,238 @@
+"""
+Notification writes and the live events they trigger.
+
+Every insert, refresh and read goes through here so the per-user `notification_counters`
+row stays in step with the notifications table: the unread count is a primary-key
+lookup instead of a scan. A user's counter is created from a COUNT the first time
+they are seen, so existing rows need no backfill.
+
+Events are queued on the session and published to the user's channel
+(`notifications:<user_id>`) only after the transaction commits, so a stream never
+announces a notification that was rolled back:
+
+    {"event": "notification", "notification": {...}, "unread_count": N}
+    {"event": "unread_count", "unread_count": N}
+"""
+import datetime
+from sqlalchemy import bindparam, event, func, insert, select, update
+from sqlalchemy.orm import Session
+from database import SessionLocal, insert_ignore
+from models import Notification, NotificationCounter
+from services.pubsub import broker
+
+_PENDING_KEY = "pending_notification_events"
+
+# Users per IN (...) list, well under SQLite's bound-parameter limit
+CHUNK_SIZE = 5000
+
+
+def channel(user_id: int) -> str:
+    return f"notifications:{user_id}"
+
+
+def serialize(n: Notification) -> dict:
+    return {
+        "id": n.id,
+        "type": n.type,
+        "title": n.title,
+        "message": n.message,
+        "link": n.link,
+        "is_read": n.is_read,
+        "created_at": n.created_at.isoformat() if n.created_at else None,
+    }
+
+
+def _queue(db: Session, user_id: int, message: dict) -> None:
+    db.info.setdefault(_PENDING_KEY, []).append((user_id, message))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_pending(db: Session) -> None:
+    for user_id, message in db.info.pop(_PENDING_KEY, []):
+        broker.publish(channel(user_id), message)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_pending(db: Session) -> None:
+    db.info.pop(_PENDING_KEY, None)
+
+
+def _chunks(ids: list[int]):
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def _ensure_counters(db: Session, user_ids: list[int]) -> None:
+    """Create missing counter rows from the current unread rows."""
+    for chunk in _chunks(user_ids):
+        existing = set(db.scalars(select(NotificationCounter.user_id).where(NotificationCounter.user_id.in_(chunk))))
+        missing = [u for u in chunk if u not in existing]
+        if not missing:
+            continue
+        db.execute(insert_ignore(NotificationCounter.__table__), [{"user_id": u, "unread_count": 0} for u in missing])
+        unread = dict(
+            db.query(Notification.user_id, func.count())
+            .filter(Notification.user_id.in_(missing), Notification.is_read == False)
+            .group_by(Notification.user_id)
+        )
+        if unread:
+            _set_counts(db, unread)
+
+
+def _set_counts(db: Session, counts: dict[int, int]) -> None:
+    db.execute(
+        update(NotificationCounter.__table__)
+        .where(NotificationCounter.user_id == bindparam("uid"))
+        .values(unread_count=bindparam("n")),
+        [{"uid": u, "n": n} for u, n in counts.items()],
+    )
+
+
+def _add_to_counts(db: Session, deltas: dict[int, int]) -> None:
+    db.execute(
+        update(NotificationCounter.__table__)
+        .where(NotificationCounter.user_id == bindparam("uid"))
+        .values(unread_count=NotificationCounter.unread_count + bindparam("n")),
+        [{"uid": u, "n": n} for u, n in deltas.items()],
+    )
+
+
+def _counts(db: Session, user_ids: list[int]) -> dict[int, int]:
+    counts = {}
+    for chunk in _chunks(user_ids):
+        counts.update(
+            db.query(NotificationCounter.user_id, NotificationCounter.unread_count)
+            .filter(NotificationCounter.user_id.in_(chunk))
+        )
+    return counts
+
+
+def _inserted(db: Session, notifications: list) -> None:
+    """Counter and event bookkeeping for rows just inserted (after _ensure_counters)."""
+    deltas: dict[int, int] = {}
+    for n in notifications:
+        if not n.is_read:
+            deltas[n.user_id] = deltas.get(n.user_id, 0) + 1
+    if deltas:
+        _add_to_counts(db, deltas)
+    _announce(db, notifications)
+
+
+def _announce(db: Session, notifications: list) -> None:
+    """Queue a `notification` event for each row, with its owner's unread count."""
+    counts = _counts(db, list({n.user_id for n in notifications}))
+    for n in notifications:
+        _queue(db, n.user_id, {
+            "event": "notification",
+            "notification": serialize(n),
+            "unread_count": counts.get(n.user_id, 0),
+        })
+
+
+def notify(db: Session, notifications: list[Notification]) -> list[Notification]:
+    """Insert notifications, bump their recipients' unread counters and queue a
+    live event for each. The caller commits."""
+    if not notifications:
+        return notifications
+    # Counters are created from the rows that exist before this insert
+    _ensure_counters(db, list({n.user_id for n in notifications}))
+    db.add_all(notifications)
+    db.flush()
+    _inserted(db, notifications)
+    return notifications
+
+
+def notify_bulk(db: Session, rows: list[dict]) -> int:
+    """`notify` for batch jobs: rows are Notification column dicts (user_id, type,
+    title, message, link), inserted as one executemany without building ORM
+    objects. Returns the number inserted. The caller commits."""
+    if not rows:
+        return 0
+    _ensure_counters(db, list({r["user_id"] for r in rows}))
+    table = Notification.__table__
+    # Without sort_by_parameter_order, RETURNING still goes out as multi-row INSERTs
+    created_at = datetime.datetime.utcnow()
+    inserted = db.execute(
+        insert(table).returning(*table.c), [{**r, "is_read": False, "created_at": created_at} for r in rows]
+    ).all()
+    inserted.sort(key=lambda n: n.id)
+    _inserted(db, inserted)
+    return len(inserted)
+
+
+def refresh(db: Session, messages: dict[int, str]) -> None:
+    """Replace the messages of unread notifications ({id: message}) and queue a
+    `notification` event for each, so open streams update them in place. The rows
+    stay unread, so counters don't change. The caller commits."""
+    if not messages:
+        return
+    table = Notification.__table__
+    db.execute(
+        update(table).where(table.c.id == bindparam("nid")).values(message=bindparam("message")),
+        [{"nid": nid, "message": message} for nid, message in messages.items()],
+    )
+    refreshed = []
+    for chunk in _chunks(list(messages)):
+        refreshed += db.execute(select(*table.c).where(table.c.id.in_(chunk)).order_by(table.c.id)).all()
+    _ensure_counters(db, list({n.user_id for n in refreshed}))
+    _announce(db, refreshed)
+
+
+def unread_count(db: Session, user_id: int) -> int:
+    count = db.query(NotificationCounter.unread_count).filter(NotificationCounter.user_id == user_id).scalar()
+    if count is None:
+        _ensure_counters(db, [user_id])
+        db.commit()
+        count = db.query(NotificationCounter.unread_count).filter(NotificationCounter.user_id == user_id).scalar()
+    return count
+
+
+def _read_changed(db: Session, user_id: int, newly_read: int) -> None:
+    if newly_read:
+        _add_to_counts(db, {user_id: -newly_read})
+    _queue(db, user_id, {"event": "unread_count", "unread_count": _counts(db, [user_id]).get(user_id, 0)})
+
+
+def mark_read(db: Session, user_id: int, notification_id: int) -> bool:
+    """Mark one of the user's notifications read. False if it isn't theirs. The caller commits."""
+    exists = db.query(Notification.id).filter(
+        Notification.id == notification_id, Notification.user_id == user_id
+    ).first()
+    if not exists:
+        return False
+    _ensure_counters(db, [user_id])
+    newly_read = db.query(Notification).filter(
+        Notification.id == notification_id, Notification.is_read == False
+    ).update({Notification.is_read: True}, synchronize_session=False)
+    _read_changed(db, user_id, newly_read)
+    return True
+
+
+def mark_all_read(db: Session, user_id: int) -> int:
+    """Mark all of the user's notifications read; returns how many changed. The caller commits."""
+    _ensure_counters(db, [user_id])
+    newly_read = db.query(Notification).filter(
+        Notification.user_id == user_id, Notification.is_read == False
+    ).update({Notification.is_read: True}, synchronize_session=False)
+    _read_changed(db, user_id, newly_read)
+    return newly_read
+
+
+def delete_notifications(db: Session, notification_ids: list[int]) -> int:
+    """Delete notifications, taking any unread ones off their owners' counters.
+    Returns the number deleted. The caller commits."""
+    deleted = 0
+    for chunk in _chunks(notification_ids):
+        unread = dict(
+            db.query(Notification.user_id, func.count())
+            .filter(Notification.id.in_(chunk), Notification.is_read == False)
+            .group_by(Notification.user_id)
+        )
+        # Create missing counters first, so they include the rows about to go
+        _ensure_counters(db, list(unread))
+        deleted += db.query(Notification).filter(Notification.id.in_(chunk)).delete(synchronize_session=False)
+        if unread:
+            _add_to_counts(db, {u: -n for u, n in unread.items()})
+            for user_id, count in _counts(db, list(unread)).items():
+                _queue(db, user_id, {"event": "unread_count", "unread_count": count})
+    return deleted
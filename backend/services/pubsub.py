@@ -0,0 +1,202 @@
+"""
+Pub/sub for pushing live events (notifications, unread counts) to SSE streams.
+
+The broker is chosen by PUBSUB_URL:
+  - unset: InProcessBroker, which only reaches subscribers in the same worker
+  - tcp://host:port: RelayBroker, which forwards every publish to a relay that
+    echoes it to all connected workers, so `uvicorn --workers N` shares events
+
+Run the local stand-in relay alongside the workers with:
+
+    python -m services.pubsub 127.0.0.1:7001
+
+Publishers are usually sync endpoints running in the threadpool, so delivery to a
+subscriber's asyncio queue always goes through its event loop.
+"""
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+PUBSUB_URL = os.environ.get("PUBSUB_URL", "")
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# A relay client that can't take a broadcast within this long, or lets this much
+# output back up, is disconnected rather than buffered without bound; its worker
+# reconnects
+RELAY_DRAIN_SECONDS = 5.0
+RELAY_MAX_BUFFER = 1 << 20
+
+
+class Subscription:
+    """One subscriber's queue on one channel."""
+
+    def __init__(self, broker: "InProcessBroker", channel: str):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _offer(self, message: dict) -> None:
+        # A subscriber that stopped reading loses messages rather than growing forever
+        if not self.queue.full():
+            self.queue.put_nowait(message)
+
+    async def get(self, timeout: float | None = None) -> dict | None:
+        """Next message, or None if `timeout` seconds pass first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker._unsubscribe(self)
+
+
+class InProcessBroker:
+    """Channel -> subscribers fan-out within this process."""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        """Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel: str, message: dict) -> None:
+        self._deliver(channel, message)
+
+    def _deliver(self, channel: str, message: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self._unsubscribe(subscription)
+
+
+class RelayBroker(InProcessBroker):
+    """Publishes through a relay so every connected worker delivers the message.
+
+    Messages are newline-delimited JSON `{"channel": ..., "message": ...}`. A
+    background thread reads the relay's broadcast and delivers locally; if the
+    relay goes away, publishes are dropped until the reconnect succeeds."""
+
+    RECONNECT_SECONDS = 1.0
+
+    def __init__(self, host: str, port: int):
+        super().__init__()
+        self.address = (host, port)
+        self._sock: socket.socket | None = None
+        self._send_lock = threading.Lock()
+        self._connected = threading.Event()
+        threading.Thread(target=self._read_loop, name="pubsub-relay", daemon=True).start()
+        self._connected.wait(timeout=2)
+
+    def publish(self, channel: str, message: dict) -> None:
+        line = json.dumps({"channel": channel, "message": message}).encode("utf-8") + b"\n"
+        with self._send_lock:
+            if self._sock is None:
+                return
+            try:
+                self._sock.sendall(line)
+            except OSError:
+                self._sock = None
+
+    def _read_loop(self) -> None:
+        while True:
+            try:
+                sock = socket.create_connection(self.address)
+            except OSError:
+                time.sleep(self.RECONNECT_SECONDS)
+                continue
+            with self._send_lock:
+                self._sock = sock
+            self._connected.set()
+            try:
+                with sock.makefile("rb") as lines:
+                    for line in lines:
+                        envelope = json.loads(line)
+                        self._deliver(envelope["channel"], envelope["message"])
+            except (OSError, ValueError):
+                pass
+            with self._send_lock:
+                if self._sock is sock:
+                    self._sock = None
+            sock.close()
+            time.sleep(self.RECONNECT_SECONDS)
+
+
+def _create_broker() -> InProcessBroker:
+    if PUBSUB_URL.startswith("tcp://"):
+        host, _, port = PUBSUB_URL[len("tcp://"):].rpartition(":")
+        return RelayBroker(host or "127.0.0.1", int(port))
+    return InProcessBroker()
+
+
+broker = _create_broker()
+
+
+async def run_relay(host: str, port: int) -> None:
+    """Broadcast every line received from any client to all clients."""
+    clients: set[asyncio.StreamWriter] = set()
+
+    def drop(client: asyncio.StreamWriter) -> None:
+        clients.discard(client)
+        client.close()
+
+    async def drain(client: asyncio.StreamWriter) -> None:
+        try:
+            await asyncio.wait_for(client.drain(), RELAY_DRAIN_SECONDS)
+        except (asyncio.TimeoutError, ConnectionError, RuntimeError):
+            drop(client)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        clients.add(writer)
+        try:
+            while line := await reader.readline():
+                receivers = []
+                for client in list(clients):
+                    try:
+                        client.write(line)
+                    except (ConnectionError, RuntimeError):
+                        drop(client)
+                        continue
+                    if client.transport.get_write_buffer_size() > RELAY_MAX_BUFFER:
+                        drop(client)
+                    else:
+                        receivers.append(client)
+                # Wait for slow readers together, so one can't hold up the rest
+                await asyncio.gather(*(drain(client) for client in receivers))
+        finally:
+            drop(writer)
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import sys
+
+    address = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1:7001"
+    relay_host, _, relay_port = address.rpartition(":")
+    print(f"Pub/sub relay listening on {relay_host or '127.0.0.1'}:{relay_port}")
+    asyncio.run(run_relay(relay_host or "127.0.0.1", int(relay_port)))
@@ -0,0 +1,87 @@
+"""
+Per-user response cache for read-heavy, per-user answers (the assistant, the
+parent overview).
+
+Entries live in process memory, keyed on (user_id, *key), and are stamped with
+the user's data version from `user_data_versions`. Score writes and My Students
+changes bump the version of every affected teacher and parent in the same
+transaction, so each worker spots a stale entry with one primary-key lookup
+instead of recomputing the answer. The version also serves as an ETag.
+"""
+import threading
+from collections import OrderedDict
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import insert_ignore
+from models import User, UserDataVersion, user_students, parent_students
+
+MAX_ENTRIES = 4096
+
+
+class ResponseCache:
+    """Bounded LRU of (data version, response) per user and key. Sync endpoints run
+    in a thread pool, so every access to the OrderedDict holds a lock."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, key: tuple, version: int):
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end((user_id, key))
+            return entry[1]
+
+    def put(self, user_id: int, key: tuple, version: int, response) -> None:
+        with self._lock:
+            self._entries[(user_id, key)] = (version, response)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def data_version(db: Session, user_id: int) -> int:
+    """The user's current data version, creating their row on first use so later
+    bumps have something to increment."""
+    version = db.query(UserDataVersion.version).filter(UserDataVersion.user_id == user_id).scalar()
+    if version is None:
+        db.execute(insert_ignore(UserDataVersion.__table__).values(user_id=user_id, version=0))
+        db.commit()
+        version = 0
+    return version
+
+
+def bump_data_versions(db: Session, user_ids: list[int]) -> None:
+    """Invalidate cached responses for these users. The caller commits."""
+    if user_ids:
+        db.query(UserDataVersion).filter(UserDataVersion.user_id.in_(user_ids)).update(
+            {UserDataVersion.version: UserDataVersion.version + 1}, synchronize_session=False
+        )
+
+
+def bump_for_organization(db: Session, organization_id: int) -> None:
+    """Invalidate cached responses for everyone in an organization (roster imports).
+    The caller commits."""
+    members = select(User.id).where(User.organization_id == organization_id)
+    db.query(UserDataVersion).filter(UserDataVersion.user_id.in_(members)).update(
+        {UserDataVersion.version: UserDataVersion.version + 1}, synchronize_session=False
+    )
+
+
+def bump_for_students(db: Session, student_ids: list[int]) -> None:
+    """Invalidate cached responses for every teacher and parent of these students.
+    The caller commits."""
+    if student_ids:
+        linked = select(user_students.c.user_id).where(user_students.c.student_id.in_(student_ids)).union(
+            select(parent_students.c.user_id).where(parent_students.c.student_id.in_(student_ids))
+        )
+        db.query(UserDataVersion).filter(UserDataVersion.user_id.in_(linked)).update(
+            {UserDataVersion.version: UserDataVersion.version + 1}, synchronize_session=False
+        )
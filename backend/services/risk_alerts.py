@@ -0,0 +1,93 @@
+"""
+Risk-change alerts — raised when a completed session moves a student to a higher
+risk level than their previous assessment window for the same subtest.
+
+Detection runs inside the session-completion transaction and touches only that
+student's sessions for the subtest (indexed on student_id, subtest), the two
+sessions' scores (indexed on test_session_id), and the student's assigned
+teachers (indexed on student_id), so its cost follows the size of the session,
+not of the roster.
+"""
+from sqlalchemy.orm import Session
+from models import TestSession, Score, Notification, user_students
+from services.notifications import notify
+from services.scoring import get_available_subtests
+
+TOY_ORDER = {"BOY": 0, "MOY": 1, "EOY": 2}
+
+RISK_RANK = {"advanced": 0, "benchmark": 1, "moderate": 2, "high": 3}
+
+SUBTEST_NAMES = {s["id"]: s["name"] for s in get_available_subtests()}
+
+
+def _window(session: TestSession) -> tuple[str, int]:
+    return session.academic_year, TOY_ORDER.get(session.time_of_year, -1)
+
+
+def _main_risks(db: Session, session_id: int) -> dict[str, str]:
+    return dict(
+        db.query(Score.target, Score.risk_level)
+        .filter(Score.test_session_id == session_id, Score.sub_target.is_(None), Score.risk_level.isnot(None))
+        .order_by(Score.id)
+        .all()
+    )
+
+
+def _previous_window_session(db: Session, session: TestSession) -> TestSession | None:
+    """The student's latest completed session of this subtest from an earlier window."""
+    current = _window(session)
+    earlier = [
+        s for s in db.query(TestSession).filter(
+            TestSession.student_id == session.student_id,
+            TestSession.subtest == session.subtest,
+            TestSession.is_complete == True,
+            TestSession.id != session.id,
+        )
+        if _window(s) < current
+    ]
+    if not earlier:
+        return None
+    return max(earlier, key=lambda s: (_window(s), s.completed_at or s.created_at, s.id))
+
+
+def detect_risk_changes(db: Session, session: TestSession) -> list[Notification]:
+    """Queue `risk_change` notifications for the student's teachers when any main
+    target's risk level rose since the previous window. The caller commits."""
+    db.flush()
+    previous = _previous_window_session(db, session)
+    if previous is None:
+        return []
+
+    before = _main_risks(db, previous.id)
+    escalations = [
+        (target, before[target], risk_level)
+        for target, risk_level in _main_risks(db, session.id).items()
+        if target in before and RISK_RANK.get(risk_level, 0) > RISK_RANK.get(before[target], 0)
+    ]
+    if not escalations:
+        return []
+
+    teacher_ids = [
+        user_id for (user_id,) in
+        db.query(user_students.c.user_id).filter(user_students.c.student_id == session.student_id)
+    ]
+    if not teacher_ids:
+        return []
+
+    student = session.student
+    subtest = SUBTEST_NAMES.get(session.subtest, session.subtest.replace("_", " "))
+    changes = "; ".join(
+        f"{old} to {new} risk on {subtest} ({target.replace('_', ' ')})"
+        for target, old, new in escalations
+    )
+    notifications = [
+        Notification(
+            user_id=user_id,
+            type="risk_change",
+            title="Risk Level Changed",
+            message=f"{student.first_name} {student.last_name} moved from {changes}.",
+            link=f"/students/{student.id}",
+        )
+        for user_id in teacher_ids
+    ]
+    return notify(db, notifications)
@@ -0,0 +1,265 @@
+"""
+EOY risk forecasting — a small logistic-regression model trained on local history.
+
+Features are a student's BOY and MOY results per subtest_target (taken, risk tier,
+percent of max score); the label is whether their EOY results put them in Tier 2
+or 3. Training fits the model with Newton (IRLS) steps over NumPy arrays, with no
+external services, and writes the weights to RISK_MODEL_PATH. The scoring job
+reads those weights and rewrites `risk_forecasts` with each student's probability
+for their latest academic year, which /api/predictions/at-risk reads.
+
+Run from the backend directory, e.g. nightly after the snapshot job:
+
+    python -m services.risk_model            # score, training first if no weights exist
+    python -m services.risk_model --retrain  # retrain on current history, then score
+"""
+import datetime
+import json
+import os
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from models import Student, TestSession, Score, RiskForecast
+from services.tiers import TIER_MAP
+
+RISK_MODEL_PATH = os.environ.get("RISK_MODEL_PATH", "risk_model.npz")
+
+FEATURE_WINDOWS = ("BOY", "MOY")
+FEATURES_PER_WINDOW = 3  # taken, risk tier, percent of max score
+
+RIDGE = 100.0  # strong shrinkage: a district has only a few thousand student-years of history
+MAX_ITERATIONS = 25
+TOLERANCE = 1e-6
+
+
+class RiskModel:
+    """Standardized logistic regression over per-window subtest_target features."""
+
+    def __init__(self, keys: list[str], mean: np.ndarray, scale: np.ndarray, weights: np.ndarray,
+                 trained_at: str, metrics: dict):
+        self.keys = keys
+        self.mean = mean
+        self.scale = scale
+        self.weights = weights  # [bias, feature weights...]
+        self.trained_at = trained_at
+        self.metrics = metrics
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return _sigmoid(self.weights[0] + ((X - self.mean) / self.scale) @ self.weights[1:])
+
+    def save(self, path: str = RISK_MODEL_PATH) -> None:
+        # Write then rename, so a scoring run never reads a half-written file
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f, keys=np.array(self.keys), mean=self.mean, scale=self.scale, weights=self.weights,
+                trained_at=np.array(self.trained_at), metrics=np.array(json.dumps(self.metrics)),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = RISK_MODEL_PATH) -> "RiskModel | None":
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(
+                keys=[str(k) for k in data["keys"]],
+                mean=data["mean"], scale=data["scale"], weights=data["weights"],
+                trained_at=str(data["trained_at"]), metrics=json.loads(str(data["metrics"])),
+            )
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+
+def _load_history(db: Session, organization_id: int | None = None) -> dict | None:
+    """Rated main-target scores from complete sessions as columnar arrays, one entry
+    per score, with examples indexed by (student, academic_year)."""
+    q = (
+        db.query(
+            TestSession.student_id, Student.organization_id, TestSession.academic_year,
+            TestSession.time_of_year, TestSession.subtest, Score.target,
+            Score.raw_score, Score.max_score, Score.risk_level,
+        )
+        .join(Student, Student.id == TestSession.student_id)
+        .join(Score, Score.test_session_id == TestSession.id)
+        .filter(TestSession.is_complete == True, Score.sub_target.is_(None), Score.risk_level.isnot(None))
+    )
+    if organization_id is not None:
+        q = q.filter(Student.organization_id == organization_id)
+    # Session order, so a retaken window's later result wins
+    rows = q.order_by(TestSession.id, Score.id).all()
+    if not rows:
+        return None
+
+    student_id, org_id, year, toy, subtest, target, raw, max_score, risk = zip(*rows)
+    student_id = np.array(student_id)
+    years, year_code = np.unique(np.array(year), return_inverse=True)
+    pairs, example = np.unique(student_id * len(years) + year_code, return_inverse=True)
+    raw = np.array(raw, dtype=float)
+    max_score = np.array(max_score, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(max_score > 0, raw / max_score, np.nan)
+
+    return {
+        "example": example,
+        "example_student": pairs // len(years),
+        "example_year": pairs % len(years),
+        "years": years,
+        "org": np.array(org_id),
+        "toy": np.array(toy),
+        "key": np.array([f"{s}_{t}" for s, t in zip(subtest, target)]),
+        "tier": np.array([TIER_MAP.get(r, 1) for r in risk]),
+        "pct": np.nan_to_num(pct),
+    }
+
+
+def _features(cols: dict, keys: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """BOY/MOY feature matrix over every example, plus a mask of examples that
+    have at least one feature window."""
+    n_examples = len(cols["example_student"])
+    X = np.zeros((n_examples, len(keys) * len(FEATURE_WINDOWS) * FEATURES_PER_WINDOW))
+    key_index = {k: i for i, k in enumerate(keys)}
+    key = np.array([key_index.get(k, -1) for k in cols["key"]])
+
+    has_features = np.zeros(n_examples, dtype=bool)
+    for w, window in enumerate(FEATURE_WINDOWS):
+        rows = np.flatnonzero((cols["toy"] == window) & (key >= 0))
+        ex = cols["example"][rows]
+        base = (key[rows] * len(FEATURE_WINDOWS) + w) * FEATURES_PER_WINDOW
+        X[ex, base] = 1.0
+        X[ex, base + 1] = (cols["tier"][rows] - 1) / 2.0
+        X[ex, base + 2] = cols["pct"][rows]
+        has_features[ex] = True
+    return X, has_features
+
+
+def _eoy_labels(cols: dict) -> tuple[np.ndarray, np.ndarray]:
+    """(labels, labelled mask): Tier 2+ by the majority rule over EOY risk levels."""
+    n_examples = len(cols["example_student"])
+    eoy = cols["toy"] == "EOY"
+    rated = np.bincount(cols["example"][eoy], minlength=n_examples)
+    at_risk = np.bincount(cols["example"][eoy & (cols["tier"] >= 2)], minlength=n_examples)
+    return (at_risk >= rated * 0.5).astype(float), rated > 0
+
+
+def fit_logistic(X: np.ndarray, y: np.ndarray, ridge: float = RIDGE) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Ridge-penalized logistic regression by Newton's method on standardized X.
+    Returns (mean, scale, weights) with the bias first in `weights`."""
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    A = np.hstack([np.ones((len(X), 1)), (X - mean) / scale])
+
+    penalty = np.full(A.shape[1], ridge)
+    penalty[0] = 0.0  # leave the bias unpenalized
+    weights = np.zeros(A.shape[1])
+    for _ in range(MAX_ITERATIONS):
+        p = _sigmoid(A @ weights)
+        gradient = A.T @ (p - y) + penalty * weights
+        hessian = (A * (p * (1 - p))[:, None]).T @ A + np.diag(penalty)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < TOLERANCE:
+            break
+    return mean, scale, weights
+
+
+def evaluate(model: RiskModel, X: np.ndarray, y: np.ndarray) -> dict:
+    p = np.clip(model.predict(X), 1e-12, 1 - 1e-12)
+    return {
+        "examples": int(len(y)),
+        "positive_rate": round(float(y.mean()), 4),
+        "log_loss": round(float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))), 4),
+        "accuracy": round(float(np.mean((p >= 0.5) == (y == 1))), 4),
+    }
+
+
+def training_data(db: Session) -> tuple[list[str], np.ndarray, np.ndarray, np.ndarray] | None:
+    """(keys, X, y, example academic_year) for every student-year with BOY/MOY
+    results and an EOY outcome."""
+    cols = _load_history(db)
+    if cols is None:
+        return None
+    keys = sorted(set(cols["key"].tolist()))
+    X, has_features = _features(cols, keys)
+    y, labelled = _eoy_labels(cols)
+    mask = has_features & labelled
+    return keys, X[mask], y[mask], cols["years"][cols["example_year"][mask]]
+
+
+def train_model(db: Session, path: str = RISK_MODEL_PATH) -> RiskModel | None:
+    """Fit on all local history and cache the weights at `path`."""
+    data = training_data(db)
+    if data is None:
+        return None
+    keys, X, y, _ = data
+    mean, scale, weights = fit_logistic(X, y)
+    model = RiskModel(keys, mean, scale, weights, datetime.datetime.utcnow().isoformat(timespec="seconds"), {})
+    model.metrics = evaluate(model, X, y)
+    model.save(path)
+    return model
+
+
+def load_or_train(db: Session, path: str = RISK_MODEL_PATH) -> RiskModel | None:
+    return RiskModel.load(path) or train_model(db, path)
+
+
+def score_forecasts(db: Session, model: RiskModel, organization_id: int | None = None) -> int:
+    """Replace `risk_forecasts` (for one organization, or all) with probabilities for
+    each student's latest academic year. Returns the number of students scored."""
+    delete = db.query(RiskForecast)
+    if organization_id is not None:
+        delete = delete.filter(RiskForecast.organization_id == organization_id)
+    delete.delete(synchronize_session=False)
+
+    cols = _load_history(db, organization_id)
+    if cols is None:
+        db.commit()
+        return 0
+
+    n_students = int(cols["example_student"].max()) + 1
+    latest_year = np.full(n_students, -1)
+    np.maximum.at(latest_year, cols["example_student"], cols["example_year"])
+    X, has_features = _features(cols, model.keys)
+    current = has_features & (cols["example_year"] == latest_year[cols["example_student"]])
+
+    examples = np.flatnonzero(current)
+    probability = model.predict(X[examples])
+    example_org = np.zeros(len(cols["example_student"]), dtype=np.int64)
+    example_org[cols["example"]] = cols["org"]
+
+    now = datetime.datetime.utcnow()
+    rows = [
+        {
+            "student_id": int(cols["example_student"][ex]),
+            "organization_id": int(example_org[ex]),
+            "academic_year": str(cols["years"][cols["example_year"][ex]]),
+            "probability": round(float(p), 4),
+            "model_version": model.trained_at,
+            "computed_at": now,
+        }
+        for ex, p in zip(examples, probability)
+    ]
+    if rows:
+        db.execute(insert(RiskForecast), rows)
+    db.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal, engine, Base
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        model = train_model(session) if "--retrain" in sys.argv else load_or_train(session)
+        if model is None:
+            print("No assessment history to train on.")
+        else:
+            print(f"Model {model.trained_at}: {model.metrics}")
+            print(f"Scored {score_forecasts(session, model)} students.")
+    finally:
+        session.close()
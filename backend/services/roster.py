@@ -0,0 +1,303 @@
+"""
+Roster import service — streaming CSV ingestion for district SIS exports.
+
+District exports routinely run to 50-100k rows, so the file is parsed
+incrementally and written in batches:
+  - Teacher emails are resolved from a map loaded once per import
+  - Students are inserted with executemany, returning their new ids
+  - My Students links are inserted with executemany per batch
+  - Invalid rows are reported by line number and skipped, never aborting the import;
+    a batch the database rejects is retried row by row so only the bad rows drop
+
+Sync mode matches rows on (organization_id, student_id_external) instead of
+creating duplicates, and only touches students whose roster fields changed.
+Deactivating students missing from the file is opt-in, and is skipped whenever
+the file had errors: a row that failed validation still names a real student.
+"""
+import csv
+import io
+from typing import BinaryIO, Iterator
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from models import User, Student, user_students
+
+BATCH_SIZE = 1000
+
+# Canonical field -> accepted CSV header spellings
+ROSTER_COLUMNS = {
+    "first_name": ("first_name", "First Name"),
+    "last_name": ("last_name", "Last Name"),
+    "grade": ("grade", "Grade"),
+    "student_id_external": ("student_id", "Student ID"),
+    "school": ("school", "School"),
+    "district": ("district", "District"),
+    "gender": ("gender", "Gender"),
+    "teacher_email": ("teacher_email", "Teacher Email"),
+}
+
+REQUIRED_FIELDS = ("first_name", "last_name", "grade")
+
+# Student columns a roster row is authoritative for
+SYNC_FIELDS = ("first_name", "last_name", "grade", "school", "district", "gender")
+
+
+def _field(row: dict, key: str) -> str:
+    for column in ROSTER_COLUMNS[key]:
+        value = row.get(column)
+        if value:
+            return value.strip()
+    return ""
+
+
+def iter_roster_rows(stream: BinaryIO) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Yield (line_no, record, error) for each CSV data row without buffering the file.
+    `error` explains why a row is invalid; its record is still yielded so sync can
+    tell which student it was meant for."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        for line_no, row in enumerate(reader, start=2):
+            record = {key: _field(row, key) for key in ROSTER_COLUMNS}
+            for key in ("student_id_external", "school", "district", "gender"):
+                record[key] = record[key] or None
+            if not all(record[key] for key in REQUIRED_FIELDS):
+                yield line_no, record, f"Row {line_no}: missing required fields"
+                continue
+            yield line_no, record, None
+    finally:
+        # Leave the underlying upload stream open for the caller
+        text.detach()
+
+
+def _insert_batch(db: Session, students: list[dict], teacher_ids: list[int | None]) -> None:
+    new_ids = db.scalars(
+        insert(Student).returning(Student.id, sort_by_parameter_order=True),
+        students,
+    ).all()
+    links = [
+        {"user_id": teacher_id, "student_id": student_id}
+        for student_id, teacher_id in zip(new_ids, teacher_ids)
+        if teacher_id is not None
+    ]
+    if links:
+        db.execute(insert(user_students), links)
+
+
+def _insert_rows(
+    db: Session,
+    students: list[dict],
+    teacher_ids: list[int | None],
+    line_nos: list[int],
+    errors: list[str],
+) -> int:
+    """Insert a batch in a savepoint. If the database rejects it, retry each row in
+    its own savepoint and report the rows that fail. Returns the number inserted."""
+    try:
+        with db.begin_nested():
+            _insert_batch(db, students, teacher_ids)
+        return len(students)
+    except SQLAlchemyError:
+        pass
+    inserted = 0
+    for student, teacher_id, line_no in zip(students, teacher_ids, line_nos):
+        try:
+            with db.begin_nested():
+                _insert_batch(db, [student], [teacher_id])
+            inserted += 1
+        except SQLAlchemyError as exc:
+            reason = getattr(exc, "orig", None) or exc
+            errors.append(f"Row {line_no}: could not be saved ({reason})")
+    return inserted
+
+
+def import_roster(
+    db: Session,
+    stream: BinaryIO,
+    organization_id: int,
+    dry_run: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> dict:
+    """Create students from a roster CSV. With dry_run, rows are validated and
+    counted but nothing is written."""
+    teacher_map = dict(db.query(User.email, User.id).all())
+
+    valid = 0
+    created = 0
+    errors: list[str] = []
+    warnings: list[str] = []
+    students: list[dict] = []
+    teacher_ids: list[int | None] = []
+    line_nos: list[int] = []
+
+    for line_no, record, error in iter_roster_rows(stream):
+        if error:
+            errors.append(error)
+            continue
+
+        teacher_email = record.pop("teacher_email")
+        teacher_id = teacher_map.get(teacher_email) if teacher_email else None
+        if teacher_email and teacher_id is None:
+            warnings.append(f"Row {line_no}: unknown teacher_email '{teacher_email}'")
+
+        valid += 1
+        if dry_run:
+            continue
+
+        record["organization_id"] = organization_id
+        students.append(record)
+        teacher_ids.append(teacher_id)
+        line_nos.append(line_no)
+        if len(students) >= batch_size:
+            created += _insert_rows(db, students, teacher_ids, line_nos, errors)
+            students, teacher_ids, line_nos = [], [], []
+
+    if students:
+        created += _insert_rows(db, students, teacher_ids, line_nos, errors)
+    if not dry_run:
+        db.commit()
+
+    return {"created": valid if dry_run else created, "errors": errors, "warnings": warnings, "dry_run": dry_run}
+
+
+def _existing_links(db: Session, student_ids: list[int]) -> set[tuple[int, int]]:
+    links = set()
+    for start in range(0, len(student_ids), BATCH_SIZE):
+        chunk = student_ids[start:start + BATCH_SIZE]
+        rows = db.execute(
+            user_students.select().where(user_students.c.student_id.in_(chunk))
+        ).all()
+        links.update((r.user_id, r.student_id) for r in rows)
+    return links
+
+
+def sync_roster(
+    db: Session,
+    stream: BinaryIO,
+    organization_id: int,
+    dry_run: bool = False,
+    deactivate_missing: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> dict:
+    """Reconcile the organization's students with a full roster export.
+
+    Rows are matched on student_id_external. Unknown IDs are inserted, matched
+    students are updated only when a roster field differs (inactive students are
+    reactivated), and with deactivate_missing, active students missing from the
+    file are deactivated — unless any row had an error. IDs shared by several
+    existing students are reported and those students left untouched.
+    Each change set is applied in batches, one transaction per batch."""
+    teacher_map = dict(db.query(User.email, User.id).all())
+
+    # Hash index over the organization's roster: external ID -> (id, status, fields)
+    columns = [Student.id, Student.status, Student.student_id_external] + [getattr(Student, f) for f in SYNC_FIELDS]
+    index = {}
+    shared: dict[str, int] = {}
+    for row in db.query(*columns).filter(
+        Student.organization_id == organization_id,
+        Student.student_id_external.isnot(None),
+    ):
+        if row.student_id_external in index:
+            shared[row.student_id_external] = shared.get(row.student_id_external, 1) + 1
+        index[row.student_id_external] = row
+    for external_id in shared:
+        del index[external_id]
+    links = _existing_links(db, [row.id for row in index.values()])
+
+    inserts: list[dict] = []
+    insert_teachers: list[int | None] = []
+    insert_lines: list[int] = []
+    updates: list[dict] = []
+    new_links: list[dict] = []
+    seen: set[str] = set()
+    unchanged = 0
+    errors: list[str] = []
+    warnings: list[str] = []
+
+    errors.extend(
+        f"student_id '{external_id}' is shared by {count} existing students; they were not synced"
+        for external_id, count in sorted(shared.items())
+    )
+
+    for line_no, record, error in iter_roster_rows(stream):
+        external_id = record["student_id_external"]
+        duplicate = external_id in seen
+        if external_id:
+            # Marked before any validation, so a bad row never deactivates its student
+            seen.add(external_id)
+        if error:
+            errors.append(error)
+            continue
+        if not external_id:
+            errors.append(f"Row {line_no}: student_id is required for sync")
+            continue
+        if duplicate:
+            errors.append(f"Row {line_no}: duplicate student_id '{external_id}'")
+            continue
+        if external_id in shared:
+            continue
+
+        teacher_email = record.pop("teacher_email")
+        teacher_id = teacher_map.get(teacher_email) if teacher_email else None
+        if teacher_email and teacher_id is None:
+            warnings.append(f"Row {line_no}: unknown teacher_email '{teacher_email}'")
+
+        existing = index.get(external_id)
+        if existing is None:
+            record["organization_id"] = organization_id
+            inserts.append(record)
+            insert_teachers.append(teacher_id)
+            insert_lines.append(line_no)
+            continue
+
+        changes = {f: record[f] for f in SYNC_FIELDS if getattr(existing, f) != record[f]}
+        if existing.status != "active":
+            changes["status"] = "active"
+        if changes:
+            updates.append({"id": existing.id, **changes})
+        if teacher_id is not None and (teacher_id, existing.id) not in links:
+            new_links.append({"user_id": teacher_id, "student_id": existing.id})
+            links.add((teacher_id, existing.id))
+        if not changes:
+            unchanged += 1
+
+    deactivations = []
+    if deactivate_missing and errors:
+        warnings.append("Missing students were not deactivated because the file has errors")
+    elif deactivate_missing:
+        deactivations = [
+            row.id for external_id, row in index.items()
+            if external_id not in seen and row.status == "active"
+        ]
+
+    inserted = len(inserts)
+    if not dry_run:
+        inserted = 0
+        for start in range(0, len(inserts), batch_size):
+            end = start + batch_size
+            inserted += _insert_rows(db, inserts[start:end], insert_teachers[start:end], insert_lines[start:end], errors)
+            db.commit()
+        for start in range(0, len(updates), batch_size):
+            db.execute(update(Student), updates[start:start + batch_size])
+            db.commit()
+        for start in range(0, len(new_links), batch_size):
+            db.execute(insert(user_students), new_links[start:start + batch_size])
+            db.commit()
+        for start in range(0, len(deactivations), batch_size):
+            db.execute(
+                update(Student)
+                .where(Student.id.in_(deactivations[start:start + batch_size]))
+                .values(status="inactive")
+            )
+            db.commit()
+
+    return {
+        "inserted": inserted,
+        "updated": len(updates),
+        "deactivated": len(deactivations),
+        "unchanged": unchanged,
+        "links_added": len(new_links),
+        "errors": errors,
+        "warnings": warnings,
+        "dry_run": dry_run,
+    }
@@ -0,0 +1,273 @@
+"""
+Executive snapshots — nightly per-organization rollups for the executive dashboards.
+
+Run once a day (e.g. from cron) from the backend directory:
+
+    python -m services.snapshots
+
+Each run replaces the day's `org_snapshots` rows for every organization. Rows are
+partitioned by (school, grade, student status) and hold distinct-student counts,
+so the scorecard, school comparison and trends are SUMs over a handful of rows
+instead of scans over every score, and every past run remains as history.
+
+State and country views read `region_rollups`, which each organization snapshot
+updates by the difference from that organization's previous rows for the day, so
+adding or re-snapshotting one organization only touches its own state and country.
+
+Cross-organization views read the newest date in `snapshot_runs`, which the daily
+run records only once every organization is done. Dates that hold just some
+organizations — a run still in progress, or one new organization's snapshot
+built on demand — are never shown as a state, country or district total.
+"""
+import datetime
+from sqlalchemy import and_, case, distinct, func, insert, update
+from sqlalchemy.orm import Session
+from database import insert_ignore
+from models import Organization, Student, TestSession, Score, OrgSnapshot, RegionRollup, SnapshotRun
+from services.tiers import compute_tier, latest_scores_for_org
+
+RISK_COLUMNS = {
+    "advanced": "risk_advanced",
+    "benchmark": "risk_benchmark",
+    "moderate": "risk_moderate",
+    "high": "risk_high",
+}
+
+PROFICIENT_LEVELS = ("benchmark", "advanced")
+
+WINDOWS = ("BOY", "MOY", "EOY")
+
+MEASURES = (
+    "total_students", "tested_count",
+    "risk_advanced", "risk_benchmark", "risk_moderate", "risk_high",
+    "tier1_count", "tier2_count", "tier3_count",
+    "boy_scored", "boy_proficient", "moy_scored", "moy_proficient", "eoy_scored", "eoy_proficient",
+)
+
+
+def current_academic_year() -> str:
+    year = datetime.datetime.utcnow().year
+    return f"{year - 1}-{year}"
+
+
+def snapshot_organization(
+    db: Session,
+    org_id: int,
+    snapshot_date: str | None = None,
+    academic_year: str | None = None,
+) -> int:
+    """Recompute and store one organization's snapshot rows. Returns the row count."""
+    snapshot_date = snapshot_date or datetime.datetime.utcnow().date().isoformat()
+    academic_year = academic_year or current_academic_year()
+    partition = (Student.school, Student.grade, Student.status)
+
+    rows: dict = {}
+
+    def row(key: tuple) -> dict:
+        if key not in rows:
+            rows[key] = {
+                "snapshot_date": snapshot_date,
+                "academic_year": academic_year,
+                "organization_id": org_id,
+                "school": key[0],
+                "grade": key[1],
+                "status": key[2],
+                **{m: 0 for m in MEASURES},
+            }
+        return rows[key]
+
+    year_sessions = and_(
+        TestSession.student_id == Student.id,
+        TestSession.is_complete == True,
+        TestSession.academic_year == academic_year,
+    )
+
+    counts = (
+        db.query(*partition, func.count(distinct(Student.id)), func.count(distinct(TestSession.student_id)))
+        .outerjoin(TestSession, year_sessions)
+        .filter(Student.organization_id == org_id)
+        .group_by(*partition)
+    )
+    for school, grade, status, total, tested in counts:
+        r = row((school, grade, status))
+        r["total_students"] = total
+        r["tested_count"] = tested
+
+    def scored(*columns):
+        return (
+            db.query(*partition, *columns, func.count(distinct(TestSession.student_id)))
+            .join(TestSession, year_sessions)
+            .join(Score, Score.test_session_id == TestSession.id)
+            .filter(Student.organization_id == org_id, Score.risk_level.isnot(None))
+            .group_by(*partition, *columns)
+        )
+
+    for school, grade, status, level, count in scored(Score.risk_level):
+        if level in RISK_COLUMNS:
+            row((school, grade, status))[RISK_COLUMNS[level]] += count
+
+    for school, grade, status, toy, level, count in scored(TestSession.time_of_year, Score.risk_level):
+        if toy not in WINDOWS:
+            continue
+        r = row((school, grade, status))
+        r[f"{toy.lower()}_scored"] += count
+        if level in PROFICIENT_LEVELS:
+            r[f"{toy.lower()}_proficient"] += count
+
+    student_partition = {
+        sid: (school, grade, status)
+        for sid, school, grade, status in db.query(Student.id, *partition).filter(Student.organization_id == org_id)
+    }
+    for sid, scores in latest_scores_for_org(db, org_id).items():
+        key = student_partition.get(sid)
+        if key is None:
+            continue
+        tier = compute_tier([s["risk_level"] for s in scores])
+        row(key)[f"tier{tier}_count"] += 1
+
+    if not rows:
+        # An empty organization still gets a (zero) row, so a re-snapshot of the
+        # same day recognises it and doesn't count it into its region twice
+        row((None, None, None))
+
+    existing = OrgSnapshot.organization_id == org_id, OrgSnapshot.snapshot_date == snapshot_date
+    had_previous = db.query(OrgSnapshot.id).filter(*existing).first() is not None
+    previous = rollup_query(db).filter(*existing).one()
+    totals = {
+        "active_students": sum(r["total_students"] for r in rows.values() if r["status"] == "active"),
+        **{m: sum(r[m] for r in rows.values()) for m in MEASURES},
+    }
+    delta = {k: v - getattr(previous, k) for k, v in totals.items()}
+    _apply_region_delta(db, db.get(Organization, org_id), snapshot_date, delta, 0 if had_previous else 1)
+
+    db.query(OrgSnapshot).filter(*existing).delete(synchronize_session=False)
+    db.execute(insert(OrgSnapshot), list(rows.values()))
+    db.commit()
+    return len(rows)
+
+
+def _apply_region_delta(db: Session, org: Organization, snapshot_date: str, delta: dict, org_count_delta: int) -> None:
+    """Add one organization's change to its country and state rollups. The sums are
+    done by the UPDATE itself, so snapshots of neighbouring organizations running at
+    the same time can't overwrite each other's totals."""
+    regions = [("country", org.country or "US", None)]
+    if org.state:
+        regions.append(("state", org.country or "US", org.state))
+
+    table = RegionRollup.__table__
+    for level, country, state in regions:
+        updated = db.execute(
+            update(table)
+            .where(
+                table.c.level == level,
+                table.c.snapshot_date == snapshot_date,
+                table.c.country == country,
+                table.c.state == state if state else table.c.state.is_(None),
+            )
+            .values(
+                organization_count=table.c.organization_count + org_count_delta,
+                **{k: table.c[k] + v for k, v in delta.items()},
+            )
+        ).rowcount
+        if not updated:
+            db.execute(insert(table).values(
+                level=level, snapshot_date=snapshot_date, country=country, state=state,
+                organization_count=org_count_delta, **delta,
+            ))
+
+
+def run_daily_snapshots(db: Session, snapshot_date: str | None = None) -> int:
+    """Snapshot every organization, then mark the date complete. Returns the total
+    number of rows written."""
+    snapshot_date = snapshot_date or datetime.datetime.utcnow().date().isoformat()
+    written = sum(
+        snapshot_organization(db, org_id, snapshot_date)
+        for (org_id,) in db.query(Organization.id).order_by(Organization.id).all()
+    )
+    db.execute(insert_ignore(SnapshotRun.__table__).values(snapshot_date=snapshot_date))
+    db.commit()
+    return written
+
+
+def complete_snapshot_date(db: Session) -> str | None:
+    """Newest date every organization has been snapshotted for."""
+    completed = db.query(func.max(SnapshotRun.snapshot_date)).scalar()
+    if completed is None:
+        # Snapshots taken before runs were recorded were all whole-run dates
+        completed = db.query(func.max(RegionRollup.snapshot_date)).scalar()
+    return completed
+
+
+def latest_snapshot_date(db: Session, org_id: int) -> str:
+    """Date of the organization's newest snapshot, building today's if none exists yet."""
+    latest = (
+        db.query(func.max(OrgSnapshot.snapshot_date))
+        .filter(OrgSnapshot.organization_id == org_id)
+        .scalar()
+    )
+    if latest:
+        return latest
+    snapshot_organization(db, org_id)
+    return datetime.datetime.utcnow().date().isoformat()
+
+
+def rollup_query(db: Session, *group_by):
+    """SUM every snapshot measure over OrgSnapshot rows, grouped by `group_by`.
+    `active_students` counts only active students, matching the live dashboards."""
+    return db.query(
+        *group_by,
+        func.coalesce(func.sum(case((OrgSnapshot.status == "active", OrgSnapshot.total_students), else_=0)), 0).label("active_students"),
+        *[func.coalesce(func.sum(getattr(OrgSnapshot, m)), 0).label(m) for m in MEASURES],
+    )
+
+
+def proficiency_rate(r) -> float:
+    scored_total = (r.risk_advanced + r.risk_benchmark + r.risk_moderate + r.risk_high) or 1
+    return round((r.risk_benchmark + r.risk_advanced) / scored_total * 100, 1)
+
+
+def growth(r) -> float | None:
+    """Percentage-point change in proficiency from BOY to the latest later window."""
+    if not r.boy_scored:
+        return None
+    if r.eoy_scored:
+        latest = r.eoy_proficient / r.eoy_scored
+    elif r.moy_scored:
+        latest = r.moy_proficient / r.moy_scored
+    else:
+        return None
+    return round((latest - r.boy_proficient / r.boy_scored) * 100, 1)
+
+
+def scorecard_metrics(r) -> dict:
+    """Executive scorecard fields for one rollup row."""
+    total_scored = max(r.risk_advanced + r.risk_benchmark + r.risk_moderate + r.risk_high, 1)
+    return {
+        "total_students": r.active_students,
+        "tested_count": r.tested_count,
+        "proficiency_rate": proficiency_rate(r),
+        "avg_growth": growth(r),
+        "completion_rate": round(r.tested_count / max(r.active_students, 1) * 100, 1),
+        "tier_distribution": {
+            "tier1": round(round((r.risk_benchmark + r.risk_advanced) / total_scored * 100, 1)),
+            "tier2": round(round(r.risk_moderate / total_scored * 100, 1)),
+            "tier3": round(round(r.risk_high / total_scored * 100, 1)),
+        },
+        "tier_counts": {
+            "tier1": r.tier1_count,
+            "tier2": r.tier2_count,
+            "tier3": r.tier3_count,
+        },
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine, Base
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        written = run_daily_snapshots(session)
+        print(f"Wrote {written} snapshot rows.")
+    finally:
+        session.close()
@@ -0,0 +1,150 @@
+"""
+Reading streaks — consecutive days on which a student completed an assessment or
+a pathway activity.
+
+`record_activity` is called as each session or activity completes and moves the
+student's streak forward in place: a second activity the same day changes
+nothing, the next day extends the streak, and anything later starts a new one.
+The leaderboard entries are updated in the same transaction.
+
+A streak that simply stops is only noticed by the daily job, which zeroes every
+current streak whose last activity is older than yesterday:
+
+    python -m services.streaks [--date YYYY-MM-DD] [--rebuild]
+
+`--rebuild` recomputes every streak from the full activity history instead (for
+databases whose streaks predate this updater) and refills the leaderboards.
+"""
+import datetime
+from sqlalchemy import bindparam, func, insert, select, union, update
+from sqlalchemy.orm import Session
+from database import insert_ignore
+from models import ReadingStreak, TestSession, StudentPathway, PathwayActivity
+from services import leaderboards
+
+
+def _parse(day: str | None) -> datetime.date | None:
+    return datetime.date.fromisoformat(day) if day else None
+
+
+def record_activity(db: Session, student_id: int, day: datetime.date | None = None) -> ReadingStreak:
+    """Count an activity on `day` (default today, UTC) towards the student's streak.
+    The caller commits."""
+    day = day or datetime.datetime.utcnow().date()
+    db.execute(
+        insert_ignore(ReadingStreak.__table__).values(student_id=student_id, current_streak=0, longest_streak=0)
+    )
+    streak = db.query(ReadingStreak).filter(ReadingStreak.student_id == student_id).one()
+
+    last = _parse(streak.last_activity_date)
+    if last is not None and last >= day:
+        # Already counted, or a late record of an older day
+        return streak
+    streak.current_streak = (streak.current_streak or 0) + 1 if last == day - datetime.timedelta(days=1) else 1
+    streak.longest_streak = max(streak.longest_streak or 0, streak.current_streak)
+    streak.last_activity_date = day.isoformat()
+    leaderboards.update_streaks(db, {student_id: (streak.current_streak, streak.longest_streak)})
+    return streak
+
+
+def expire_streaks(db: Session, today: datetime.date | None = None) -> int:
+    """Zero the current streak of every student with no activity yesterday or today.
+    Returns the number broken. The caller commits."""
+    today = today or datetime.datetime.utcnow().date()
+    cutoff = (today - datetime.timedelta(days=1)).isoformat()
+    broken = db.execute(
+        select(ReadingStreak.student_id, ReadingStreak.longest_streak).where(
+            ReadingStreak.current_streak > 0,
+            (ReadingStreak.last_activity_date < cutoff) | ReadingStreak.last_activity_date.is_(None),
+        )
+    ).all()
+    if broken:
+        db.execute(
+            update(ReadingStreak.__table__)
+            .where(ReadingStreak.student_id == bindparam("sid"))
+            .values(current_streak=0),
+            [{"sid": sid} for sid, _ in broken],
+        )
+        leaderboards.update_streaks(db, {sid: (0, longest or 0) for sid, longest in broken})
+    return len(broken)
+
+
+def _activity_days(db: Session) -> dict[int, list[datetime.date]]:
+    """Every student's distinct activity days, oldest first."""
+    sessions = select(TestSession.student_id, func.date(TestSession.completed_at).label("day")).where(
+        TestSession.is_complete == True, TestSession.completed_at.isnot(None)
+    )
+    activities = (
+        select(StudentPathway.student_id, func.date(PathwayActivity.completed_at).label("day"))
+        .join(StudentPathway, StudentPathway.id == PathwayActivity.pathway_id)
+        .where(PathwayActivity.status == "completed", PathwayActivity.completed_at.isnot(None))
+    )
+    days = union(sessions, activities).subquery()
+    by_student: dict[int, list[datetime.date]] = {}
+    for student_id, day in db.execute(select(days.c.student_id, days.c.day).order_by(days.c.student_id, days.c.day)):
+        by_student.setdefault(student_id, []).append(datetime.date.fromisoformat(str(day)[:10]))
+    return by_student
+
+
+def rebuild_streaks(db: Session, today: datetime.date | None = None) -> int:
+    """Recompute every streak from the activity history and refill the leaderboards.
+    Returns the number of students with activity. The caller commits."""
+    today = today or datetime.datetime.utcnow().date()
+    one_day = datetime.timedelta(days=1)
+    rows = {}
+    for student_id, days in _activity_days(db).items():
+        run = longest = 0
+        previous = None
+        for day in days:
+            run = run + 1 if previous == day - one_day else 1
+            longest = max(longest, run)
+            previous = day
+        rows[student_id] = {
+            "sid": student_id,
+            "current": run if previous >= today - one_day else 0,
+            "longest": longest,
+            "last": previous.isoformat(),
+        }
+
+    table = ReadingStreak.__table__
+    existing = set(db.scalars(select(table.c.student_id)))
+    db.execute(update(table).values(current_streak=0, longest_streak=0, last_activity_date=None))
+    updates = [r for sid, r in rows.items() if sid in existing]
+    if updates:
+        db.execute(
+            update(table)
+            .where(table.c.student_id == bindparam("sid"))
+            .values(current_streak=bindparam("current"), longest_streak=bindparam("longest"),
+                    last_activity_date=bindparam("last")),
+            updates,
+        )
+    inserts = [
+        {"student_id": r["sid"], "current_streak": r["current"], "longest_streak": r["longest"],
+         "last_activity_date": r["last"]}
+        for sid, r in rows.items() if sid not in existing
+    ]
+    if inserts:
+        db.execute(insert(table), inserts)
+    leaderboards.rebuild(db)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, engine, Base
+
+    parser = argparse.ArgumentParser(description="Expire lapsed reading streaks, or rebuild them from history.")
+    parser.add_argument("--date", type=datetime.date.fromisoformat, help="run as of this date (default today, UTC)")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every streak from activity history")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            print(f"Rebuilt streaks for {rebuild_streaks(db, args.date)} students.")
+        else:
+            print(f"Expired {expire_streaks(db, args.date)} lapsed streaks.")
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,128 @@
+"""
+Student search — ranked prefix matching over first/last name and external ID.
+
+On SQLite the index is an FTS5 external-content table over `students`, kept in
+sync by triggers so roster imports, edits and deletes never need a reindex.
+Other databases fall back to prefix LIKE predicates.
+
+Queries are tokenized the same way as the index, and every token is matched as
+a prefix, so "mar gar" finds "Maria Garcia" and "STU-US-0001" finds external IDs.
+"""
+import re
+from sqlalchemy import Float, Integer, and_, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from database import begin_immediate
+from models import Student
+
+FTS_TABLE = "students_fts"
+
+_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        first_name, last_name, student_id_external,
+        content='students', content_rowid='id', prefix='1 2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON students BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, student_id_external)
+        VALUES (new.id, new.first_name, new.last_name, new.student_id_external);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON students BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, student_id_external)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.student_id_external);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF first_name, last_name, student_id_external ON students BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, student_id_external)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.student_id_external);
+        INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, student_id_external)
+        VALUES (new.id, new.first_name, new.last_name, new.student_id_external);
+    END""",
+]
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Create the FTS5 table and sync triggers if missing, backfilling existing students.
+    Safe to run from several workers starting at once: the first takes the write
+    lock and builds the index, and the rest find it there."""
+    if engine.dialect.name != "sqlite":
+        return
+    with begin_immediate(engine) as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        for ddl in _FTS_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def _tokens(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def _uses_fts(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def _fts_match(tokens: list[str]) -> str:
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def student_search_filter(db: Session, query: str):
+    """SQL predicate restricting Student rows to those matching `query`."""
+    tokens = _tokens(query)
+    if not tokens:
+        return Student.id.is_(None)
+    if _uses_fts(db):
+        matches = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match").bindparams(
+            match=_fts_match(tokens)
+        )
+        return Student.id.in_(matches)
+    return _like_filter(tokens)
+
+
+def _like_filter(tokens: list[str]):
+    return and_(*[
+        or_(
+            Student.first_name.ilike(f"{t}%"),
+            Student.last_name.ilike(f"{t}%"),
+            Student.student_id_external.ilike(f"{t}%"),
+        )
+        for t in tokens
+    ])
+
+
+def search_students(
+    db: Session,
+    query: str,
+    organization_id: int | None = None,
+    student_ids: list[int] | None = None,
+    status: str | None = None,
+    limit: int = 10,
+) -> list[Student]:
+    """Return up to `limit` students matching every token of `query` as a prefix,
+    best matches first."""
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    q = db.query(Student)
+    if organization_id is not None:
+        q = q.filter(Student.organization_id == organization_id)
+    if student_ids is not None:
+        q = q.filter(Student.id.in_(student_ids))
+    if status:
+        q = q.filter(Student.status == status)
+
+    if _uses_fts(db):
+        # bm25 weights favour last-name hits, then first name, then external ID
+        ranked = text(
+            f"SELECT rowid AS student_id, bm25({FTS_TABLE}, 2.0, 3.0, 1.0) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        ).bindparams(match=_fts_match(tokens)).columns(student_id=Integer, rank=Float).subquery("ranked")
+        q = q.join(ranked, ranked.c.student_id == Student.id).order_by(ranked.c.rank)
+    else:
+        q = q.filter(_like_filter(tokens))
+
+    return q.order_by(Student.last_name, Student.first_name, Student.id).limit(limit).all()
@@ -0,0 +1,135 @@
+"""
+MTSS tier classification shared by the MTSS dashboard and executive snapshots.
+
+Each student's tier is persisted in `student_tiers` and refreshed when one of
+their sessions completes or a completed score changes, so tier summaries are
+COUNTs and tier filters are indexed lookups instead of a recompute per page load.
+"""
+import datetime
+import json
+from sqlalchemy import and_, func, insert
+from sqlalchemy.orm import Session
+from models import Student, TestSession, Score, StudentTier
+
+TIER_MAP = {
+    "benchmark": 1,
+    "advanced": 1,
+    "moderate": 2,
+    "high": 3,
+}
+
+
+def latest_scores_for_org(db: Session, org_id: int):
+    """Return a dict mapping student_id -> list of (subtest, target, risk_level)
+    from the most recent completed test session per student+subtest."""
+    return _latest_scores(db, Student.organization_id == org_id)
+
+
+def _latest_scores(db: Session, *criteria):
+    latest_session_subq = (
+        db.query(
+            TestSession.student_id,
+            TestSession.subtest,
+            func.max(TestSession.completed_at).label("max_completed"),
+        )
+        .join(Student, Student.id == TestSession.student_id)
+        .filter(
+            *criteria,
+            TestSession.is_complete == True,
+        )
+        .group_by(TestSession.student_id, TestSession.subtest)
+        .subquery()
+    )
+
+    rows = (
+        db.query(
+            TestSession.student_id,
+            TestSession.subtest,
+            Score.target,
+            Score.risk_level,
+        )
+        .join(Score, Score.test_session_id == TestSession.id)
+        .join(
+            latest_session_subq,
+            and_(
+                TestSession.student_id == latest_session_subq.c.student_id,
+                TestSession.subtest == latest_session_subq.c.subtest,
+                TestSession.completed_at == latest_session_subq.c.max_completed,
+            ),
+        )
+        .filter(Score.risk_level.isnot(None), Score.sub_target.is_(None))
+        .all()
+    )
+
+    student_scores: dict = {}
+    for student_id, subtest, target, risk_level in rows:
+        student_scores.setdefault(student_id, []).append(
+            {"subtest": subtest, "target": target, "risk_level": risk_level}
+        )
+    return student_scores
+
+
+def compute_tier(risk_levels: list[str]) -> int:
+    """Majority-rules tier: Tier 3 if >=50% high, Tier 2 if >=50% moderate+high,
+    else Tier 1. Prevents a single high score from putting students in Tier 3."""
+    if not risk_levels:
+        return 1
+    tiers = [TIER_MAP.get(rl, 1) for rl in risk_levels]
+    n = len(tiers)
+    high_count = tiers.count(3)
+    moderate_count = tiers.count(2)
+    if high_count >= n * 0.5:
+        return 3
+    if (high_count + moderate_count) >= n * 0.5:
+        return 2
+    return 1
+
+
+def _tier_row(student_id: int, org_id: int, scores: list[dict], now: datetime.datetime) -> dict:
+    return {
+        "student_id": student_id,
+        "organization_id": org_id,
+        "tier": compute_tier([sc["risk_level"] for sc in scores]),
+        "risk_levels_json": json.dumps(scores),
+        "computed_at": now,
+    }
+
+
+def rebuild_org_tiers(db: Session, org_id: int) -> int:
+    """Recompute every student tier in the organization. Returns the number of rows."""
+    now = datetime.datetime.utcnow()
+    rows = [_tier_row(sid, org_id, scores, now) for sid, scores in latest_scores_for_org(db, org_id).items()]
+    db.query(StudentTier).filter(StudentTier.organization_id == org_id).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(StudentTier), rows)
+    db.flush()
+    return len(rows)
+
+
+def ensure_org_tiers(db: Session, org_id: int) -> None:
+    """Backfill the organization's tiers the first time they are needed."""
+    if db.query(StudentTier.id).filter(StudentTier.organization_id == org_id).first() is None:
+        rebuild_org_tiers(db, org_id)
+        db.commit()
+
+
+def refresh_student_tier(db: Session, student: Student) -> None:
+    """Recompute one student's tier from their latest sessions. The caller commits."""
+    db.flush()
+    if db.query(StudentTier.id).filter(StudentTier.organization_id == student.organization_id).first() is None:
+        rebuild_org_tiers(db, student.organization_id)
+        return
+
+    scores = _latest_scores(db, Student.id == student.id).get(student.id)
+    existing = db.query(StudentTier).filter(StudentTier.student_id == student.id).first()
+    if not scores:
+        if existing:
+            db.delete(existing)
+        return
+
+    row = _tier_row(student.id, student.organization_id, scores, datetime.datetime.utcnow())
+    if existing:
+        for k, v in row.items():
+            setattr(existing, k, v)
+    else:
+        db.add(StudentTier(**row))
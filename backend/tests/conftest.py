@@ -0,0 +1,80 @@
+"""
+Shared fixtures. The suite runs against a throwaway SQLite database: DATABASE_URL
+is pointed at a temp file before `database` is first imported, so tests never
+touch insight.db, and every table is emptied after each test.
+
+    cd backend && python -m pytest
+"""
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from auth import create_access_token
+from database import Base, SessionLocal, engine
+from main import app
+from models import Organization, User, Student
+
+
+@pytest.fixture(autouse=True)
+def _empty_tables():
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_org(db):
+    def make(name: str = "Test District") -> Organization:
+        org = Organization(name=name)
+        db.add(org)
+        db.commit()
+        return org
+    return make
+
+
+@pytest.fixture
+def make_user(db):
+    def make(org: Organization, role: str = "admin", email: str | None = None) -> User:
+        user = User(
+            email=email or f"{role}{db.query(User).count()}@org{org.id}.test", hashed_password="x",
+            first_name="Test", last_name=role.title(), role=role, organization_id=org.id,
+        )
+        db.add(user)
+        db.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def make_student(db):
+    def make(org: Organization, **fields) -> Student:
+        student = Student(**{"first_name": "Pat", "last_name": "Lee", "grade": "3", **fields}, organization_id=org.id)
+        db.add(student)
+        db.commit()
+        return student
+    return make
+
+
+@pytest.fixture
+def headers_for():
+    def headers(user: User) -> dict:
+        return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    return headers
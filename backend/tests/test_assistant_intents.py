@@ -0,0 +1,38 @@
+from routers.assistant_router import _parse_intent
+
+
+def test_group_by_prefers_risk_then_grade_then_school():
+    assert _parse_intent("Group by grade and risk") == ("group_by", "risk")
+    assert _parse_intent("group my students by school, then grade") == ("group_by", "grade")
+    assert _parse_intent("Group them by school") == ("group_by", "school")
+    assert _parse_intent("group by teacher") == ("group_by", None)
+
+
+def test_skill_follows_target_map_order_not_position():
+    assert _parse_intent("Who needs vocabulary or retell practice?") == ("students_need_skill", "retell")
+    assert _parse_intent("Which students need help with   DECODING?") == ("students_need_skill", "decoding")
+    assert _parse_intent("which students need something") == ("students_need_skill", None)
+
+
+def test_progress_and_focus():
+    assert _parse_intent("Show progress for Ana Ruiz?") == ("student_progress", "ana ruiz")
+    assert _parse_intent("progress of") == ("student_progress", None)
+    assert _parse_intent("Who should I focus on?") == ("focus", None)
+    assert _parse_intent("hello") == ("default", None)
+
+
+def test_manual_search_needs_an_explicit_lookup():
+    assert _parse_intent("What does the CUBED-3 manual say about retell scoring?") == (
+        "manual_search", "retell scoring",
+    )
+    assert _parse_intent("Search the manual for discontinue rules.") == ("manual_search", "discontinue rules")
+    assert _parse_intent("check the manual on   basal") == ("manual_search", "basal")
+    assert _parse_intent("what does the manual say?") == ("manual_search", None)
+
+
+def test_data_questions_mentioning_the_manual_keep_their_intent():
+    assert _parse_intent("Which students need fluency work per the manual cutoffs?") == (
+        "students_need_skill", "fluency",
+    )
+    assert _parse_intent("Group by risk using the manual benchmarks") == ("group_by", "risk")
+    assert _parse_intent("Show progress for Ana, manual entry") == ("student_progress", "ana, manual entry")
@@ -0,0 +1,97 @@
+import datetime
+from models import RiskForecast, Score, TestSession, user_students
+from services.at_risk import find_at_risk_students
+
+YEAR, LAST_YEAR = "2025-2026", "2024-2025"
+START = datetime.datetime(2025, 9, 1)
+
+
+def assess(db, student, examiner, toy, scores, year=YEAR, subtest="NLM_READING", day=0, complete=True):
+    """A session with main-target scores [(target, raw, risk), ...]."""
+    session = TestSession(
+        student_id=student.id, examiner_id=examiner.id, subtest=subtest, grade_at_test=student.grade,
+        academic_year=year, time_of_year=toy, is_complete=complete,
+        created_at=START + datetime.timedelta(days=day),
+    )
+    db.add(session)
+    db.flush()
+    db.add_all(Score(test_session_id=session.id, target=t, raw_score=raw, risk_level=risk) for t, raw, risk in scores)
+    # Sub-target scores never count towards a trajectory
+    db.add(Score(test_session_id=session.id, target=scores[0][0], sub_target="FACTUAL", raw_score=0, risk_level="high"))
+    db.commit()
+    return session
+
+
+def test_at_risk_factors_scores_and_order(db, make_org, make_user, make_student):
+    org = make_org()
+    teacher = make_user(org, role="examiner")
+    names = ["Unassessed", "Escalated", "Stable", "Dropped", "Benchmark", "Tied"]
+    students = {n: make_student(org, first_name=n, last_name="Kid") for n in names}
+    db.execute(user_students.insert(), [{"user_id": teacher.id, "student_id": s.id} for s in students.values()])
+    db.commit()
+
+    # Dropped 50% and escalated to high; a second subtest is high at its only point
+    s = students["Escalated"]
+    assess(db, s, teacher, "BOY", [("NLM_RETELL", 20, "benchmark")], day=0)
+    assess(db, s, teacher, "BOY", [("PA_SEG", 3, "high")], subtest="DDM_PA", day=1)
+    assess(db, s, teacher, "MOY", [("NLM_RETELL", 10, "high")], day=100)
+    db.add(RiskForecast(student_id=s.id, organization_id=org.id, academic_year=YEAR, probability=0.85,
+                        model_version="test"))
+
+    # Fell sharply last year but is steady this year; an incomplete session doesn't count
+    s = students["Stable"]
+    assess(db, s, teacher, "BOY", [("NLM_RETELL", 30, "benchmark")], year=LAST_YEAR, day=-300)
+    assess(db, s, teacher, "EOY", [("NLM_RETELL", 5, "high")], year=LAST_YEAR, day=-100)
+    assess(db, s, teacher, "BOY", [("NLM_RETELL", 20, "benchmark")], day=0)
+    assess(db, s, teacher, "MOY", [("NLM_RETELL", 19, "benchmark")], day=100)
+    assess(db, s, teacher, "EOY", [("NLM_RETELL", 1, "high")], day=200, complete=False)
+
+    # Exactly the 20% threshold, staying moderate
+    s = students["Dropped"]
+    assess(db, s, teacher, "BOY", [("NLM_RETELL", 20, "moderate")], day=0)
+    assess(db, s, teacher, "MOY", [("NLM_RETELL", 16, "moderate")], day=100)
+
+    # Declining but currently at benchmark by majority
+    s = students["Benchmark"]
+    assess(db, s, teacher, "BOY", [("NLM_RETELL", 20, "benchmark"), ("NLM_QUESTIONS", 10, "benchmark")], day=0)
+    assess(db, s, teacher, "MOY", [("NLM_RETELL", 12, "moderate"), ("NLM_QUESTIONS", 10, "benchmark"),
+                                   ("DECODING_FLUENCY", 40, "benchmark")], day=100)
+
+    # Same probability as Escalated and Dropped: ties keep My Students order
+    s = students["Tied"]
+    assess(db, s, teacher, "MOY", [("NLM_RETELL", 30, "benchmark")], day=0)
+    assess(db, s, teacher, "EOY", [("NLM_RETELL", 10, "high")], day=100)
+    db.commit()
+
+    results = find_at_risk_students(db, teacher.id)
+
+    summary = [(r["student_name"], r["probability"], r["current_risk"], r["contributing_factors"]) for r in results]
+    assert summary == [
+        ("Kid, Escalated", "high", "high", [
+            # Within a time of year, series are listed by subtest name
+            "High risk on DDM PA PA SEG",
+            "Declining NLM READING NLM RETELL scores",
+            "Risk escalated to high on NLM READING NLM RETELL",
+            "Forecast 85% likely to be at risk at EOY",
+        ]),
+        ("Kid, Dropped", "high", "moderate", ["Declining NLM READING NLM RETELL scores"]),
+        ("Kid, Tied", "high", "high", [
+            "Declining NLM READING NLM RETELL scores",
+            "Risk escalated to high on NLM READING NLM RETELL",
+        ]),
+        ("Kid, Unassessed", "medium", "unknown", ["No recent assessment"]),
+        ("Kid, Benchmark", "medium", "benchmark", ["Declining NLM READING NLM RETELL scores"]),
+    ]
+    escalated = results[0]
+    assert escalated["eoy_risk_probability"] == 0.85
+    assert escalated["latest_scores"] == {"NLM_READING_NLM_RETELL": {"raw_score": 10.0, "risk_level": "high"}}
+    assert results[4]["latest_scores"] == {
+        "NLM_READING_NLM_RETELL": {"raw_score": 12.0, "risk_level": "moderate"},
+        "NLM_READING_NLM_QUESTIONS": {"raw_score": 10.0, "risk_level": "benchmark"},
+        "NLM_READING_DECODING_FLUENCY": {"raw_score": 40.0, "risk_level": "benchmark"},
+    }
+    assert not any(r["on_watchlist"] for r in results)
+
+
+def test_no_students_no_results(db, make_org, make_user):
+    assert find_at_risk_students(db, make_user(make_org()).id) == []
@@ -0,0 +1,131 @@
+import datetime
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from models import Badge, ReadingStreak, Score, Student, StudentBadge, TestSession
+from services.badges import BADGE_CRITERIA, award_badges
+
+START = datetime.datetime(2025, 9, 1)
+
+
+@pytest.fixture
+def badges(db):
+    rows = [Badge(name=criteria.replace("_", " ").title(), criteria=criteria) for criteria in BADGE_CRITERIA]
+    db.add_all(rows)
+    db.commit()
+    return {b.criteria: b.id for b in rows}
+
+
+def assess(db, student, examiner, scores, day=0, complete=True):
+    """A session with scores [(raw, max, risk), ...], completed `day` days in."""
+    session = TestSession(
+        student_id=student.id, examiner_id=examiner.id, subtest="NLM_READING", grade_at_test=student.grade,
+        academic_year="2025-2026", time_of_year="BOY", is_complete=complete,
+        completed_at=START + datetime.timedelta(days=day) if complete else None,
+    )
+    db.add(session)
+    db.flush()
+    db.add_all(
+        Score(test_session_id=session.id, target="NLM_RETELL", raw_score=raw, max_score=top, risk_level=risk)
+        for raw, top, risk in scores
+    )
+    db.commit()
+
+
+def award(db, *students) -> dict[int, set[str]]:
+    awarded = award_badges(db, select(Student.id).where(Student.id.in_([s.id for s in students])))
+    db.commit()
+    return {sid: {b.criteria for b in new} for sid, new in awarded.items()}
+
+
+def test_assessment_counts_use_completed_sessions_only(db, badges, make_org, make_user, make_student):
+    org = make_org()
+    examiner = make_user(org, role="examiner")
+    student = make_student(org)
+    for day in range(4):
+        assess(db, student, examiner, [(5, 10, "moderate")], day=day)
+    assess(db, student, examiner, [(5, 10, "moderate")], complete=False)
+
+    assert award(db, student) == {student.id: {"first_assessment"}}
+
+    assess(db, student, examiner, [(5, 10, "moderate")], day=10)
+    assert award(db, student) == {student.id: {"five_assessments"}}
+
+
+def test_perfect_score_counts_incomplete_sessions_but_not_zero_max(db, badges, make_org, make_user, make_student):
+    org = make_org()
+    examiner = make_user(org, role="examiner")
+    perfect, zero_max = make_student(org), make_student(org)
+    assess(db, perfect, examiner, [(10, 10, "benchmark")], complete=False)
+    assess(db, zero_max, examiner, [(0, 0, "benchmark"), (3, None, "benchmark")], complete=False)
+
+    assert award(db, perfect, zero_max) == {perfect.id: {"perfect_score"}}
+
+
+def test_risk_reducer_compares_first_and_last_completed_sessions(db, badges, make_org, make_user, make_student):
+    org = make_org()
+    examiner = make_user(org, role="examiner")
+    reducer, incomplete_last, reversed_order = make_student(org), make_student(org), make_student(org)
+
+    assess(db, reducer, examiner, [(2, 10, "high"), (6, 10, "moderate")], day=0)
+    assess(db, reducer, examiner, [(5, 10, "moderate")], day=5)
+    assess(db, reducer, examiner, [(6, 10, "moderate"), (8, 10, "benchmark")], day=9)
+
+    # The benchmark session was never completed, so the last completed one is still high
+    assess(db, incomplete_last, examiner, [(2, 10, "high")], day=0)
+    assess(db, incomplete_last, examiner, [(3, 10, "high")], day=5)
+    assess(db, incomplete_last, examiner, [(8, 10, "benchmark")], complete=False)
+
+    # Inserted benchmark-first but completed high-first: completion time decides
+    assess(db, reversed_order, examiner, [(8, 10, "advanced")], day=9)
+    assess(db, reversed_order, examiner, [(2, 10, "high")], day=1)
+
+    awarded = award(db, reducer, incomplete_last, reversed_order)
+
+    assert "risk_reducer" in awarded[reducer.id]
+    assert "risk_reducer" not in awarded[incomplete_last.id]
+    assert "risk_reducer" in awarded[reversed_order.id]
+
+
+def test_streak_badge(db, badges, make_org, make_student):
+    org = make_org()
+    seven, six = make_student(org), make_student(org)
+    db.add_all([ReadingStreak(student_id=seven.id, current_streak=7, longest_streak=7),
+                ReadingStreak(student_id=six.id, current_streak=6, longest_streak=9)])
+    db.commit()
+
+    assert award(db, seven, six) == {seven.id: {"streak_7"}}
+
+
+def test_awarding_again_is_a_no_op(db, badges, make_org, make_user, make_student):
+    org = make_org()
+    examiner = make_user(org, role="examiner")
+    student = make_student(org)
+    assess(db, student, examiner, [(10, 10, "benchmark")], day=0)
+
+    assert award(db, student) == {student.id: {"first_assessment", "perfect_score"}}
+    assert award(db, student) == {}
+    assert db.query(StudentBadge).filter(StudentBadge.student_id == student.id).count() == 2
+
+
+def test_award_skips_pairs_written_concurrently(db, badges, make_org, make_user, make_student, monkeypatch):
+    org = make_org()
+    examiner = make_user(org, role="examiner")
+    student = make_student(org)
+    assess(db, student, examiner, [(5, 10, "moderate")], day=0)
+
+    # Another worker awards the badge after this one read the earned pairs
+    real = BADGE_CRITERIA["first_assessment"]
+
+    def awarded_elsewhere(stats):
+        db.execute(StudentBadge.__table__.insert().values(student_id=student.id, badge_id=badges["first_assessment"]))
+        return real(stats)
+
+    monkeypatch.setitem(BADGE_CRITERIA, "first_assessment", awarded_elsewhere)
+    award(db, student)
+
+    assert db.query(StudentBadge).filter(StudentBadge.student_id == student.id).count() == 1
+    db.add(StudentBadge(student_id=student.id, badge_id=badges["first_assessment"]))
+    with pytest.raises(IntegrityError):
+        db.flush()
+    db.rollback()
@@ -0,0 +1,56 @@
+import datetime
+from models import Notification
+from services import notifications
+from services.notification_retention import COLLAPSE_MIN, collapse_repeated, purge_read
+
+
+def add(db, user, count: int, type: str = "untested", **fields) -> list[Notification]:
+    rows = notifications.notify(db, [
+        Notification(user_id=user.id, type=type, title=f"{type} {n}", message=f"Message {n}.", **fields)
+        for n in range(count)
+    ])
+    db.commit()
+    return rows
+
+
+def test_repeated_unread_notifications_collapse_into_one_digest(db, make_org, make_user):
+    user = make_user(make_org())
+    add(db, user, COLLAPSE_MIN + 2)
+    add(db, user, COLLAPSE_MIN - 1, type="benchmark_deadline")
+
+    removed = collapse_repeated(db)
+
+    assert removed == COLLAPSE_MIN + 2
+    remaining = db.query(Notification).filter(Notification.user_id == user.id).all()
+    digests = [n for n in remaining if n.type == "digest"]
+    assert len(digests) == 1
+    assert digests[0].title == f"untested {COLLAPSE_MIN + 1} ({COLLAPSE_MIN + 2})"
+    assert "And 4 more." in digests[0].message
+    assert sum(n.type == "benchmark_deadline" for n in remaining) == COLLAPSE_MIN - 1
+    # The counter follows the rows, not a recount
+    assert notifications.unread_count(db, user.id) == len(remaining) == COLLAPSE_MIN
+
+
+def test_collapse_leaves_read_notifications_and_other_users(db, make_org, make_user):
+    org = make_org()
+    user, other = make_user(org), make_user(org)
+    add(db, user, COLLAPSE_MIN, is_read=True)
+    add(db, other, COLLAPSE_MIN - 1)
+
+    assert collapse_repeated(db) == 0
+    assert db.query(Notification).count() == 2 * COLLAPSE_MIN - 1
+
+
+def test_purge_deletes_only_old_read_notifications(db, make_org, make_user):
+    user = make_user(make_org())
+    old = datetime.datetime.utcnow() - datetime.timedelta(days=120)
+    old_read = add(db, user, 3, is_read=True, created_at=old)
+    old_unread = add(db, user, 1, type="license", created_at=old)
+    recent_read = add(db, user, 1, type="completion", is_read=True)
+
+    purged = purge_read(db, days=90, batch_size=2)
+
+    assert purged == len(old_read)
+    left = {n.id for n in db.query(Notification)}
+    assert left == {n.id for n in old_unread + recent_read}
+    assert notifications.unread_count(db, user.id) == 1
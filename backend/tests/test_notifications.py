@@ -0,0 +1,56 @@
+import pytest
+from models import Notification
+from services import notifications
+from services.notification_engine import _dedupe
+
+
+@pytest.fixture
+def published(monkeypatch) -> list[tuple[str, dict]]:
+    sent = []
+    monkeypatch.setattr(notifications.broker, "publish", lambda channel, message: sent.append((channel, message)))
+    return sent
+
+
+def row(user, message="2 students untested.", type="untested", title="Students untested"):
+    return {"user_id": user.id, "type": type, "title": title, "message": message, "link": "/students"}
+
+
+def test_bulk_insert_announces_exactly_the_new_rows(db, make_org, make_user, published):
+    org = make_org()
+    user, other = make_user(org), make_user(org)
+    notifications.notify(db, [Notification(user_id=user.id, type="license", title="Seats", message="Low.")])
+    db.commit()
+    published.clear()
+
+    assert notifications.notify_bulk(db, [row(user), row(other), row(user, type="digest", title="Weekly")]) == 3
+    db.commit()
+
+    new = db.query(Notification).filter(Notification.type != "license").order_by(Notification.id).all()
+    assert [(channel, m["notification"]["id"], m["unread_count"]) for channel, m in published] == [
+        (notifications.channel(new[0].user_id), new[0].id, 3),
+        (notifications.channel(new[1].user_id), new[1].id, 1),
+        (notifications.channel(new[2].user_id), new[2].id, 3),
+    ]
+    assert notifications.unread_count(db, user.id) == 3
+
+
+def test_refresh_rewrites_the_waiting_notification_and_announces_it(db, make_org, make_user, published):
+    org = make_org()
+    user, other = make_user(org), make_user(org)
+    notifications.notify_bulk(db, [row(user), row(other)])
+    db.commit()
+    waiting = db.query(Notification).filter(Notification.user_id == user.id).one()
+    published.clear()
+
+    new_rows, refreshed = _dedupe(db, [row(user, "5 students untested."), row(other), row(user, type="digest")])
+    db.commit()
+
+    assert new_rows == [row(user, type="digest")]
+    assert refreshed == [row(user, "5 students untested.")]
+    db.refresh(waiting)
+    assert waiting.message == "5 students untested." and not waiting.is_read
+    assert [(channel, m["event"], m["notification"]["id"], m["notification"]["message"], m["unread_count"])
+            for channel, m in published] == [
+        (notifications.channel(user.id), "notification", waiting.id, "5 students untested.", 1),
+    ]
+    assert notifications.unread_count(db, user.id) == 1
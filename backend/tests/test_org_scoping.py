@@ -0,0 +1,72 @@
+from models import Group, group_students, user_students
+
+
+def test_my_students_ignores_other_organizations(db, client, make_org, make_user, make_student, headers_for):
+    org, other = make_org("Ours"), make_org("Theirs")
+    teacher = make_user(org, role="examiner")
+    ours = make_student(org)
+    theirs = make_student(other)
+
+    response = client.post("/api/students/add-to-my-students", json=[ours.id, theirs.id], headers=headers_for(teacher))
+
+    assert response.json() == {"added": 1}
+    linked = {sid for (sid,) in db.query(user_students.c.student_id).filter(user_students.c.user_id == teacher.id)}
+    assert linked == {ours.id}
+
+
+def test_group_add_ignores_other_organizations(db, client, make_org, make_user, make_student, headers_for):
+    org, other = make_org("Ours"), make_org("Theirs")
+    teacher = make_user(org, role="examiner")
+    group = Group(name="Reading", owner_id=teacher.id)
+    db.add(group)
+    db.commit()
+    ours = make_student(org)
+    theirs = make_student(other)
+
+    response = client.post(
+        f"/api/students/groups/{group.id}/add-students", json=[ours.id, theirs.id], headers=headers_for(teacher)
+    )
+
+    assert response.status_code == 200
+    members = {sid for (sid,) in db.query(group_students.c.student_id).filter(group_students.c.group_id == group.id)}
+    assert members == {ours.id}
+
+
+def test_bulk_tier_history_by_student_ids(client, make_org, make_user, make_student, headers_for):
+    org, other = make_org("Ours"), make_org("Theirs")
+    headers = headers_for(make_user(org))
+    ours = make_student(org)
+    theirs = make_student(other)
+
+    response = client.get(
+        "/api/mtss/tier-history", params={"student_ids": [ours.id, theirs.id]}, headers=headers
+    )
+
+    assert [s["student_id"] for s in response.json()] == [ours.id]
+
+
+def test_bulk_tier_history_by_group_drops_foreign_members(db, client, make_org, make_user, make_student, headers_for):
+    org, other = make_org("Ours"), make_org("Theirs")
+    teacher = make_user(org)
+    group = Group(name="Mixed", owner_id=teacher.id)
+    db.add(group)
+    db.commit()
+    ours = make_student(org)
+    theirs = make_student(other)
+    # Memberships written before group adds were scoped
+    db.execute(group_students.insert(), [
+        {"group_id": group.id, "student_id": ours.id},
+        {"group_id": group.id, "student_id": theirs.id},
+    ])
+    db.commit()
+
+    response = client.get("/api/mtss/tier-history", params={"group_id": group.id}, headers=headers_for(teacher))
+
+    assert [s["student_id"] for s in response.json()] == [ours.id]
+
+
+def test_single_tier_history_hides_other_organizations(client, make_org, make_user, make_student, headers_for):
+    headers = headers_for(make_user(make_org("Ours")))
+    theirs = make_student(make_org("Theirs"))
+
+    assert client.get(f"/api/mtss/tier-history/{theirs.id}", headers=headers).status_code == 404
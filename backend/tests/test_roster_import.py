@@ -0,0 +1,76 @@
+import io
+import pytest
+from sqlalchemy import text
+from database import engine
+from models import Student, user_students
+from services.roster import import_roster
+
+HEADER = "first_name,last_name,grade,student_id,teacher_email\n"
+
+
+def roster(*rows: str) -> io.BytesIO:
+    return io.BytesIO((HEADER + "".join(f"{r}\n" for r in rows)).encode())
+
+
+@pytest.fixture
+def reject_first_name():
+    """Make the database itself refuse students named REJECT, as a constraint would."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TRIGGER reject_student BEFORE INSERT ON students "
+            "WHEN NEW.first_name = 'REJECT' BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        ))
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER reject_student"))
+
+
+def test_dry_run_validates_without_writing(db, make_org):
+    org = make_org()
+
+    result = import_roster(db, roster("Ana,Ruiz,K,A1,", "Bo,,2,B2,"), org.id, dry_run=True)
+
+    assert result["dry_run"] and result["created"] == 1
+    assert result["errors"] == ["Row 3: missing required fields"]
+    assert db.query(Student).count() == 0
+
+
+def test_invalid_rows_reported_and_valid_rows_created(db, make_org):
+    org = make_org()
+
+    result = import_roster(db, roster("Ana,Ruiz,K,A1,", ",Lee,3,B2,", "Cy,Ono,1,C3,"), org.id)
+
+    assert result["created"] == 2
+    assert result["errors"] == ["Row 3: missing required fields"]
+    names = {s.first_name for s in db.query(Student).filter(Student.organization_id == org.id)}
+    assert names == {"Ana", "Cy"}
+
+
+def test_teachers_linked_and_unknown_emails_warned(db, make_org, make_user):
+    org = make_org()
+    teacher = make_user(org, role="examiner", email="teacher@school.test")
+
+    result = import_roster(db, roster("Ana,Ruiz,K,A1,teacher@school.test", "Bo,Kim,2,B2,nobody@school.test"), org.id)
+
+    assert result["created"] == 2 and not result["errors"]
+    assert result["warnings"] == ["Row 3: unknown teacher_email 'nobody@school.test'"]
+    linked = db.query(Student.first_name).join(user_students, user_students.c.student_id == Student.id).filter(
+        user_students.c.user_id == teacher.id
+    ).all()
+    assert linked == [("Ana",)]
+
+
+def test_rejected_row_does_not_sink_its_batch(db, make_org, make_user, reject_first_name):
+    org = make_org()
+    teacher = make_user(org, role="examiner", email="teacher@school.test")
+    rows = [f"First{n},Last{n},3,S{n},teacher@school.test" for n in range(5)]
+    rows[2] = "REJECT,Last2,3,S2,teacher@school.test"
+
+    result = import_roster(db, roster(*rows), org.id, batch_size=3)
+
+    # Line 4 is the third data row; the rest of its batch and the next batch commit
+    assert result["created"] == 4
+    assert len(result["errors"]) == 1 and result["errors"][0].startswith("Row 4: could not be saved")
+    stored = {s.first_name for s in db.query(Student).filter(Student.organization_id == org.id)}
+    assert stored == {"First0", "First1", "First3", "First4"}
+    assert db.query(user_students).filter(user_students.c.user_id == teacher.id).count() == 4
@@ -0,0 +1,81 @@
+import io
+from models import Student, StudentStatus
+from services.roster import sync_roster
+
+HEADER = "first_name,last_name,grade,student_id\n"
+
+
+def roster(*rows: str) -> io.BytesIO:
+    return io.BytesIO((HEADER + "".join(f"{r}\n" for r in rows)).encode())
+
+
+def status(db, student: Student) -> str:
+    db.refresh(student)
+    return student.status
+
+
+def test_missing_students_kept_unless_deactivation_requested(db, make_org, make_student):
+    org = make_org()
+    kept = make_student(org, student_id_external="A1")
+    missing = make_student(org, student_id_external="B2")
+
+    result = sync_roster(db, roster("Pat,Lee,3,A1"), org.id)
+    assert result["deactivated"] == 0
+    assert status(db, missing) == StudentStatus.ACTIVE
+
+    result = sync_roster(db, roster("Pat,Lee,3,A1"), org.id, deactivate_missing=True)
+    assert result["deactivated"] == 1
+    assert status(db, missing) == StudentStatus.INACTIVE
+    assert status(db, kept) == StudentStatus.ACTIVE
+
+
+def test_errors_block_deactivation(db, make_org, make_student):
+    org = make_org()
+    invalid_row = make_student(org, student_id_external="A1")
+    missing = make_student(org, student_id_external="B2")
+
+    # A1's row has no grade: it must neither count as missing nor let B2 go
+    result = sync_roster(db, roster("Pat,Lee,,A1"), org.id, deactivate_missing=True)
+
+    assert result["errors"]
+    assert result["deactivated"] == 0
+    assert any("not deactivated" in w for w in result["warnings"])
+    assert status(db, invalid_row) == StudentStatus.ACTIVE
+    assert status(db, missing) == StudentStatus.ACTIVE
+
+
+def test_dry_run_changes_nothing(db, make_org, make_student):
+    org = make_org()
+    missing = make_student(org, student_id_external="B2")
+
+    result = sync_roster(db, roster("New,Kid,K,C3"), org.id, dry_run=True, deactivate_missing=True)
+
+    assert result["inserted"] == 1 and result["deactivated"] == 1
+    assert status(db, missing) == StudentStatus.ACTIVE
+    assert db.query(Student).filter(Student.student_id_external == "C3").count() == 0
+
+
+def test_shared_external_ids_reported_and_left_alone(db, make_org, make_student):
+    org = make_org()
+    first = make_student(org, student_id_external="A1", grade="2")
+    second = make_student(org, student_id_external="A1", grade="2")
+
+    result = sync_roster(db, roster("Pat,Lee,3,A1"), org.id)
+
+    assert any("'A1' is shared by 2 existing students" in e for e in result["errors"])
+    assert result["updated"] == 0 and result["inserted"] == 0
+    db.refresh(first)
+    db.refresh(second)
+    assert first.grade == second.grade == "2"
+
+
+def test_sync_requires_admin(client, make_org, make_user, headers_for):
+    examiner = make_user(make_org(), role="examiner")
+
+    response = client.post(
+        "/api/students/bulk-import?mode=sync",
+        files={"file": ("roster.csv", roster("Pat,Lee,3,A1").getvalue(), "text/csv")},
+        headers=headers_for(examiner),
+    )
+
+    assert response.status_code == 403
@@ -0,0 +1,62 @@
+from database import SessionLocal
+from models import Organization, RegionRollup, Student
+from services.snapshots import _apply_region_delta, run_daily_snapshots, snapshot_organization
+
+DATE = "2026-03-02"
+
+
+def regions(db) -> dict:
+    return {
+        (r.level, r.state): (r.organization_count, r.total_students, r.active_students)
+        for r in db.query(RegionRollup).filter(RegionRollup.snapshot_date == DATE).populate_existing()
+    }
+
+
+def district(db, name, state, students):
+    org = Organization(name=name, state=state)
+    db.add(org)
+    db.commit()
+    for _ in range(students):
+        db.add(org_student(org))
+    db.commit()
+    return org
+
+
+def org_student(org, **fields):
+    return Student(first_name="Pat", last_name="Lee", grade="3", organization_id=org.id, **fields)
+
+
+def test_region_rollups_add_each_organizations_change(db):
+    north = district(db, "North", "TX", 2)
+    district(db, "South", "TX", 3)
+    district(db, "West", "CA", 1)
+
+    run_daily_snapshots(db, DATE)
+    assert regions(db) == {("country", None): (3, 6, 6), ("state", "TX"): (2, 5, 5), ("state", "CA"): (1, 1, 1)}
+
+    db.add(org_student(north))
+    db.add(org_student(north, status="inactive"))
+    db.commit()
+    snapshot_organization(db, north.id, DATE)
+    assert regions(db) == {("country", None): (3, 8, 7), ("state", "TX"): (2, 7, 6), ("state", "CA"): (1, 1, 1)}
+
+
+def test_region_delta_adds_to_totals_changed_since_they_were_read(db):
+    north = district(db, "North", "TX", 2)
+    south = district(db, "South", "TX", 3)
+    run_daily_snapshots(db, DATE)
+    # This snapshot has read the rollups (and holds them) but hasn't written yet
+    read = db.query(RegionRollup).all()  # noqa: F841
+
+    # Another worker re-snapshots South and commits in the meantime
+    db_other = SessionLocal()
+    try:
+        db_other.add(org_student(south))
+        db_other.commit()
+        snapshot_organization(db_other, south.id, DATE)
+    finally:
+        db_other.close()
+
+    _apply_region_delta(db, north, DATE, {"total_students": 1, "active_students": 1}, 0)
+    db.commit()
+    assert regions(db)[("state", "TX")] == (2, 7, 7)
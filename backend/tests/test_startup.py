@@ -0,0 +1,73 @@
+import threading
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from database import engine
+from models import Group, LeaderboardEntry, ReadingStreak, Student, group_students
+from services.leaderboards import ensure_leaderboards, group_scope, school_scope
+from services.student_search import FTS_TABLE, ensure_search_index, student_search_filter
+
+WORKERS = 4
+
+
+def start_together(step) -> list[Exception]:
+    """Run `step(engine)` from several threads at once, as workers booting together
+    would, and return whatever they raised."""
+    barrier = threading.Barrier(WORKERS)
+    errors = []
+
+    def worker():
+        barrier.wait()
+        try:
+            step(engine)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(WORKERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def test_search_index_built_once_by_concurrent_starts(db, make_org, make_student):
+    org = make_org()
+    make_student(org, first_name="Maria", last_name="Garcia")
+    make_student(org, first_name="Marco", last_name="Polo")
+    with engine.begin() as conn:
+        for trigger in ("ai", "ad", "au"):
+            conn.execute(text(f"DROP TRIGGER {FTS_TABLE}_{trigger}"))
+        conn.execute(text(f"DROP TABLE {FTS_TABLE}"))
+
+    assert start_together(ensure_search_index) == []
+
+    found = db.query(Student.first_name).filter(student_search_filter(db, "mar")).order_by(Student.first_name).all()
+    assert found == [("Marco",), ("Maria",)]
+    assert db.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar() == 2
+    make_student(org, first_name="Mark", last_name="Twain")
+    assert db.query(Student).filter(student_search_filter(db, "mark tw")).count() == 1
+
+
+def test_leaderboards_filled_once_by_concurrent_starts(db, make_org, make_user, make_student):
+    org = make_org()
+    group = Group(name="Reading", owner_id=make_user(org).id)
+    db.add(group)
+    db.commit()
+    reader, other = make_student(org, school="Oak"), make_student(org, school="Oak")
+    db.add(ReadingStreak(student_id=reader.id, current_streak=4, longest_streak=9))
+    db.execute(group_students.insert().values(group_id=group.id, student_id=reader.id))
+    db.commit()
+
+    assert start_together(ensure_leaderboards) == []
+
+    entries = db.query(LeaderboardEntry.scope, LeaderboardEntry.student_id, LeaderboardEntry.current_streak)
+    assert sorted(entries.all()) == sorted([
+        (group_scope(group.id), reader.id, 4),
+        (school_scope(org.id, "Oak"), reader.id, 4),
+        (school_scope(org.id, "Oak"), other.id, 0),
+    ])
+    db.add(LeaderboardEntry(scope=group_scope(group.id), student_id=reader.id))
+    with pytest.raises(IntegrityError):
+        db.flush()
+    db.rollback()
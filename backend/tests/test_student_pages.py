@@ -0,0 +1,55 @@
+from models import Student
+
+NAMES = ["Young", "Adams", "Lee", "Lee", "Brown", "Zhou", "Lee"]
+
+
+def test_cursor_pages_cover_every_student_once_in_order(db, client, make_org, make_user, make_student, headers_for):
+    org = make_org()
+    headers = headers_for(make_user(org))
+    for name in NAMES:
+        make_student(org, last_name=name)
+    expected = [s.id for s in db.query(Student).order_by(Student.last_name, Student.id)]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/students/all", params=params, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["X-Total-Count"] == str(len(NAMES))
+        page = response.json()
+        assert len(page) <= 3
+        seen.extend(s["id"] for s in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+
+def test_without_limit_everything_comes_back(client, make_org, make_user, make_student, headers_for):
+    org = make_org()
+    headers = headers_for(make_user(org))
+    for name in NAMES:
+        make_student(org, last_name=name)
+
+    response = client.get("/api/students/all", headers=headers)
+
+    assert len(response.json()) == len(NAMES)
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_sparse_fields(client, make_org, make_user, make_student, headers_for):
+    org = make_org()
+    headers = headers_for(make_user(org))
+    make_student(org, first_name="Ana", last_name="Ruiz", grade="K", school="North")
+
+    response = client.get("/api/students/all", params={"fields": "first_name,grade", "limit": 10}, headers=headers)
+
+    assert response.json() == [{"first_name": "Ana", "grade": "K"}]
+
+
+def test_unknown_field_and_bad_cursor_are_rejected(client, make_org, make_user, headers_for):
+    headers = headers_for(make_user(make_org()))
+
+    assert client.get("/api/students/all", params={"fields": "first_name,password"}, headers=headers).status_code == 422
+    assert client.get("/api/students/all", params={"cursor": "not-a-cursor", "limit": 5}, headers=headers).status_code == 422
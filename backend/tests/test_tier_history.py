@@ -0,0 +1,32 @@
+from models import Score, TestSession
+
+
+def assess(db, student, examiner, year, toy, risks, complete=True):
+    session = TestSession(
+        student_id=student.id, examiner_id=examiner.id, subtest="NLM_READING", grade_at_test=student.grade,
+        academic_year=year, time_of_year=toy, is_complete=complete,
+    )
+    db.add(session)
+    db.flush()
+    db.add_all(Score(test_session_id=session.id, target="NLM_RETELL", raw_score=5, risk_level=r) for r in risks)
+    db.commit()
+
+
+def test_windows_without_rated_scores_are_tier_1(db, client, make_org, make_user, make_student, headers_for):
+    org = make_org()
+    examiner = make_user(org, role="examiner")
+    student = make_student(org)
+    assess(db, student, examiner, "2025-2026", "MOY", ["high", "high", "benchmark"])
+    assess(db, student, examiner, "2025-2026", "BOY", [])
+    assess(db, student, examiner, "2024-2025", "EOY", [None, ""])
+    assess(db, student, examiner, "2025-2026", "EOY", ["high"], complete=False)
+
+    response = client.get(f"/api/mtss/tier-history/{student.id}", headers=headers_for(examiner))
+
+    assert response.json() == [
+        {"period": "2024-2025 EOY", "tier": 1},
+        {"period": "2025-2026 BOY", "tier": 1},
+        {"period": "2025-2026 MOY", "tier": 3},
+    ]
+    bulk = client.get("/api/mtss/tier-history", params={"student_ids": [student.id]}, headers=headers_for(examiner))
+    assert bulk.json()[0]["history"] == response.json()
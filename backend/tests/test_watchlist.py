@@ -0,0 +1,26 @@
+from models import student_watchlist
+
+
+def test_watchlist_toggles_own_students(client, make_org, make_user, make_student, headers_for):
+    org = make_org()
+    headers = headers_for(make_user(org, role="examiner"))
+    student = make_student(org, first_name="Ana", last_name="Ruiz")
+
+    assert client.post(f"/api/predictions/{student.id}/watchlist", headers=headers).json()["on_watchlist"] is True
+    assert [s["student_name"] for s in client.get("/api/predictions/watchlist", headers=headers).json()] == ["Ruiz, Ana"]
+    assert client.post(f"/api/predictions/{student.id}/watchlist", headers=headers).json()["on_watchlist"] is False
+    assert client.get("/api/predictions/watchlist", headers=headers).json() == []
+
+
+def test_watchlist_hides_other_organizations(db, client, make_org, make_user, make_student, headers_for):
+    teacher = make_user(make_org("Ours"), role="examiner")
+    headers = headers_for(teacher)
+    theirs = make_student(make_org("Theirs"), first_name="Cy", last_name="Ono")
+
+    assert client.post(f"/api/predictions/{theirs.id}/watchlist", headers=headers).status_code == 404
+    assert db.query(student_watchlist).count() == 0
+
+    # Entries written before the toggle was scoped still don't leak
+    db.execute(student_watchlist.insert().values(user_id=teacher.id, student_id=theirs.id))
+    db.commit()
+    assert client.get("/api/predictions/watchlist", headers=headers).json() == []
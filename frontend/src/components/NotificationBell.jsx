@@ -13,6 +13,8 @@ const TYPE_ICONS = {
   success: CheckCircle,
 };
 
+const PAGE_SIZE = 50;
+
 function relativeTime(dateStr) {
   const now = Date.now();
   const then = new Date(dateStr).getTime();
@@ -33,6 +35,7 @@ export default function NotificationBell() {
   const [open, setOpen] = useState(false);
   const [notifications, setNotifications] = useState([]);
   const [unreadCount, setUnreadCount] = useState(0);
+  const [hasOlder, setHasOlder] = useState(false);
   const panelRef = useRef(null);
   const btnRef = useRef(null);
   const [panelPos, setPanelPos] = useState({ top: 0, left: 0 });
@@ -47,10 +50,14 @@ export default function NotificationBell() {
     }
   }, []);
 
-  const fetchNotifications = async () => {
+  const fetchNotifications = async (beforeId) => {
     try {
-      const data = await api.getNotifications();
-      setNotifications(Array.isArray(data) ? data : data.items ?? []);
+      const params = { limit: PAGE_SIZE };
+      if (beforeId) params.before_id = beforeId;
+      const data = await api.getNotifications(params);
+      const page = Array.isArray(data) ? data : data.items ?? [];
+      setNotifications(prev => (beforeId ? [...prev, ...page] : page));
+      setHasOlder(page.length === PAGE_SIZE);
     } catch {
       /* silent */
     }
@@ -66,9 +73,46 @@ export default function NotificationBell() {
   };
 
   useEffect(() => {
-    fetchUnreadCount();
-    const interval = setInterval(fetchUnreadCount, 30000);
-    return () => clearInterval(interval);
+    // Pushed by the server; fall back to a one-off fetch where EventSource is unavailable
+    if (typeof EventSource === 'undefined') {
+      fetchUnreadCount();
+      return undefined;
+    }
+    // Each stream needs a fresh single-use ticket, so reconnect by hand rather than
+    // letting EventSource retry with the spent one
+    let source = null;
+    let retry = null;
+    let closed = false;
+    const reconnect = () => {
+      if (source) source.close();
+      if (!closed) retry = setTimeout(connect, 5000);
+    };
+    const connect = async () => {
+      let ticket;
+      try {
+        ({ ticket } = await api.getStreamTicket());
+      } catch {
+        reconnect();
+        return;
+      }
+      if (closed) return;
+      source = new EventSource(api.notificationStreamUrl(ticket));
+      source.addEventListener('unread_count', (e) => {
+        setUnreadCount(JSON.parse(e.data).unread_count);
+      });
+      source.addEventListener('notification', (e) => {
+        const data = JSON.parse(e.data);
+        setUnreadCount(data.unread_count);
+        setNotifications(prev => [data.notification, ...prev.filter(n => n.id !== data.notification.id)]);
+      });
+      source.onerror = reconnect;
+    };
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
   }, []);
 
   useEffect(() => {
@@ -192,6 +236,14 @@ export default function NotificationBell() {
                 );
               })
             )}
+            {hasOlder && (
+              <button
+                onClick={() => fetchNotifications(notifications[notifications.length - 1]?.id)}
+                className="w-full py-2 text-xs text-blue-600 hover:text-blue-800 font-medium"
+              >
+                Load older
+              </button>
+            )}
           </div>
         </div>
       )}
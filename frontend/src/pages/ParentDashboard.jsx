@@ -58,8 +58,10 @@ export default function ParentDashboard() {
   const [showSelector, setShowSelector] = useState(false);
 
   useEffect(() => {
-    api.getMyChildren()
-      .then(kids => {
+    // One request covers every child; switching children needs no further calls
+    api.getParentOverview()
+      .then(overview => {
+        const kids = (overview?.children || []).map(child => ({ ...child, id: child.student_id }));
         setChildren(kids);
         if (kids.length > 0) setSelectedChild(kids[0]);
       })
@@ -69,17 +71,8 @@ export default function ParentDashboard() {
 
   useEffect(() => {
     if (!selectedChild) return;
-    setProgress(null);
-    setActivities([]);
-    Promise.all([
-      api.getChildProgress(selectedChild.id),
-      api.getChildActivities(selectedChild.id),
-    ])
-      .then(([prog, acts]) => {
-        setProgress(prog);
-        setActivities(acts);
-      })
-      .catch(() => {});
+    setProgress(selectedChild);
+    setActivities(selectedChild.activities || []);
   }, [selectedChild]);
 
   if (loading) {
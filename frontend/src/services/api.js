@@ -146,6 +146,8 @@ export const api = {
   markNotificationRead: (id) => request(`/notifications/${id}/read`, { method: 'POST' }),
   markAllNotificationsRead: () => request('/notifications/mark-all-read', { method: 'POST' }),
   getUnreadCount: () => request('/notifications/unread-count'),
+  getStreamTicket: () => request('/notifications/stream-ticket', { method: 'POST' }),
+  notificationStreamUrl: (ticket) => `${BASE}/notifications/stream?ticket=${encodeURIComponent(ticket)}`,
 
   // MTSS
   tierSummary: () => request('/mtss/tier-summary'),
@@ -211,6 +213,10 @@ export const api = {
   getStudentStreak: (studentId) => request(`/gamification/student/${studentId}/streak`),
   getStudentProfile: (studentId) => request(`/gamification/student/${studentId}/profile`),
   checkBadges: (studentId) => request(`/gamification/student/${studentId}/check-badges`, { method: 'POST' }),
+  getLeaderboard: (params = {}) => {
+    const qs = new URLSearchParams(params).toString();
+    return request(`/gamification/leaderboard${qs ? `?${qs}` : ''}`);
+  },
 
   // SEL
   createSELScreening: (data) => request('/sel/screenings', { method: 'POST', body: JSON.stringify(data) }),
@@ -227,6 +233,7 @@ export const api = {
 
   // Parent Portal
   getMyChildren: () => request('/parent/my-children'),
+  getParentOverview: () => request('/parent/overview'),
   getChildProgress: (studentId) => request(`/parent/child/${studentId}/progress`),
   getChildActivities: (studentId) => request(`/parent/child/${studentId}/activities`),
 